@@ -0,0 +1,154 @@
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+from anomalies import find_anomalies
+from categorize import categorize_descriptions, default_category_rules
+from category_rules import CategoryRules, RuleFile
+from columnar import as_categorical, distinct_values, is_analyzed, iter_ndjson, map_categories
+from flow_diagram import calculate_category_flows
+from forecast import compare_budget, forecast_spending
+from normalization_cache import DEFAULT_MAX_ENTRIES, NormalizationCache, normalize_with_cache
+from normalize_company import resolve_companies
+from recurring import find_recurring
+from report import company_spending, render_report
+from rollups import Rollups
+from total_flows import calculate_total_flows
+
+REQUIRED_COLUMNS = ('Date', 'Amount', 'Description')
+
+
+class AnalysisResult(NamedTuple):
+    """Everything Analyzer.analyze works out, ready to inspect or render."""
+    start_date: str
+    end_date: str
+    months: float
+    # The transactions with Normalized_Description, Company and Category added
+    transactions: pd.DataFrame
+    # Company, Total_Amount (signed) and Transaction_Count per company
+    spending: pd.DataFrame
+    # (deposits, withdrawals), both positive
+    total_flows: Tuple[float, float]
+    # Category, Total_Amount and Transaction_Count of outflows per category
+    category_flows: pd.DataFrame
+    rollups: Optional[Rollups] = None
+    recurring: Optional[pd.DataFrame] = None
+    anomalies: Optional[pd.DataFrame] = None
+    forecast: Optional[pd.DataFrame] = None
+    budget: Optional[pd.DataFrame] = None
+
+
+class Analyzer:
+    """The analysis behind script.py as a reusable object, safe to share between threads.
+
+    Category rules are compiled once, when the analyzer is made, and every
+    call reads them through a single attribute, so reload_rules can swap in
+    an edited rule file while analyses run.  analyze works on its own copy
+    of the frame it is given and never prints; render turns a result into a
+    text, HTML, JSON or NDJSON report.  With ``cache_path``, normalization
+    goes through one NormalizationCache for all threads, behind a lock, so
+    concurrent analyses of new descriptions take turns at that step.
+    Fuzzy matching on ``workers`` > 1 processes forks from the calling
+    thread; keep the default of 1 when many threads share the analyzer.
+    """
+
+    def __init__(self, rules_path: Optional[str] = None, cache_path: Optional[str] = None,
+                 workers: int = 1, cache_size: int = DEFAULT_MAX_ENTRIES):
+        self.workers = workers
+        self._rule_file = RuleFile(rules_path) if rules_path else None
+        self.rules: CategoryRules = (self._rule_file.rules if self._rule_file is not None
+                                     else default_category_rules())
+        self.cache = NormalizationCache(cache_path, max_entries=cache_size) if cache_path else None
+        self._lock = threading.Lock()
+
+    def reload_rules(self) -> bool:
+        """Pick up edits to the rule file; returns True if the rules changed."""
+        if self._rule_file is None:
+            return False
+        with self._lock:
+            changed = self._rule_file.reload()
+            self.rules = self._rule_file.rules
+        return changed
+
+    def resolve(self, descriptions: List[str]) -> Dict[str, Tuple[str, str]]:
+        """Map distinct raw descriptions to (normalized name, company)."""
+        if self.cache is None:
+            return resolve_companies(descriptions, workers=self.workers, verbose=False)
+        with self._lock:
+            return normalize_with_cache(descriptions, self.cache, workers=self.workers, verbose=False)
+
+    def analyze(self, df: pd.DataFrame, rollup: Optional[str] = None, recurring: bool = False,
+                anomalies: bool = False, forecast: Optional[int] = None, forecast_method: str = 'smoothing',
+                budget: Optional[Dict[str, float]] = None) -> AnalysisResult:
+        """Normalize, categorize and total a frame of transactions without changing it.
+
+        ``rollup`` ('day', 'week', 'month' or 'quarter'), ``recurring``,
+        ``anomalies``, ``forecast`` (months ahead) and ``budget`` (name ->
+        monthly amount) add the same optional analyses as the command line.
+        Raises ValueError for a frame without Date, Amount and Description
+        columns or without rows.
+        """
+        rules = self.rules
+        # Columns are added to and replaced on this copy only; with
+        # copy-on-write the caller's data is shared, not duplicated
+        df = df.rename(columns=str.strip)
+        missing = set(REQUIRED_COLUMNS) - set(df.columns)
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(sorted(missing))}")
+        if df.empty:
+            raise ValueError("No transactions to analyze")
+        if not pd.api.types.is_numeric_dtype(df['Amount']):
+            df['Amount'] = pd.to_numeric(df['Amount'])
+        if not pd.api.types.is_datetime64_any_dtype(df['Date']):
+            df['Date'] = pd.to_datetime(df['Date'])
+
+        if not is_analyzed(df):
+            df['Description'] = as_categorical(df['Description'])
+            resolved = self.resolve(distinct_values(df['Description']))
+            df['Normalized_Description'] = map_categories(
+                df['Description'], {raw: names[0] for raw, names in resolved.items()}, 'Normalized_Description')
+            df['Company'] = map_categories(
+                df['Description'], {raw: names[1] for raw, names in resolved.items()}, 'Company')
+        if 'Category' not in df.columns:
+            df['Category'] = categorize_descriptions(df['Description'], rules)
+
+        rollups = Rollups(df, rollup) if rollup else None
+        projections = comparison = None
+        if forecast or budget:
+            projections = forecast_spending(df, forecast or 1, forecast_method, rollups)
+            if budget:
+                comparison = compare_budget(projections, budget)
+
+        start, end = df['Date'].min(), df['Date'].max()
+        return AnalysisResult(
+            start_date=start.strftime('%Y-%m-%d'),
+            end_date=end.strftime('%Y-%m-%d'),
+            months=(end - start).days / 30.44,
+            transactions=df,
+            spending=company_spending(df),
+            total_flows=calculate_total_flows(df),
+            category_flows=calculate_category_flows(df),
+            rollups=rollups,
+            recurring=find_recurring(df) if recurring else None,
+            anomalies=find_anomalies(df) if anomalies else None,
+            forecast=projections if forecast else None,
+            budget=comparison,
+        )
+
+    def render(self, result: AnalysisResult, output_format: str = 'text', limit: Optional[int] = 40,
+               title: str = 'Transaction Analysis') -> str:
+        """Render a result as the command line would, listing the ``limit`` largest companies."""
+        if output_format == 'ndjson':
+            return "".join(iter_ndjson(result.transactions))
+        return render_report(result.spending, result.start_date, result.end_date, result.months,
+                             output_format, result.total_flows, result.category_flows, title,
+                             limit=limit, rollups=result.rollups, recurring=result.recurring,
+                             anomalies=result.anomalies, forecast=result.forecast, budget=result.budget,
+                             rules=self.rules, verbose=False)
+
+    def close(self) -> None:
+        """Close the normalization cache, if any."""
+        if self.cache is not None:
+            with self._lock:
+                self.cache.close()
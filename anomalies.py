@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+
+from columnar import as_categorical
+
+COLUMNS = ['Date', 'Company', 'Description', 'Charge', 'Kind', 'Detail']
+
+
+def _sort_order(*keys: np.ndarray) -> np.ndarray:
+    """Row order sorting by non-negative integer ``keys``, most significant first.
+
+    When the keys fit in 63 bits together they are packed into one int64 and
+    sorted once, which is several times faster than np.lexsort.
+    """
+    bits = [max(int(key.max()), 1).bit_length() for key in keys]
+    if sum(bits) > 63:
+        return np.lexsort(keys[::-1])
+    packed = np.zeros(len(keys[0]), dtype=np.int64)
+    for key, width in zip(keys, bits):
+        packed = (packed << width) | key.astype(np.int64)
+    return np.argsort(packed)
+
+
+def _group_starts(sorted_codes: np.ndarray) -> np.ndarray:
+    """For rows sorted by ``sorted_codes``, the position of the first row of each row's group."""
+    breaks = np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]
+    starts = np.flatnonzero(breaks)
+    return starts[np.cumsum(breaks) - 1]
+
+
+def find_anomalies(df: pd.DataFrame, duplicate_days: int = 3, history: int = 20,
+                   min_history: int = 10, sigmas: float = 3.5, min_ratio: float = 2.0) -> pd.DataFrame:
+    """Flag duplicate charges and charges far above a merchant's usual amounts.
+
+    A duplicate is a withdrawal with the same company and amount as another
+    one at most ``duplicate_days`` earlier: sorted by (company, amount,
+    date), that is just the previous row.  A charge is unusual when, on a
+    log scale, it sits more than ``sigmas`` standard deviations (and at
+    least ``min_ratio`` times) above the mean of the company's previous
+    ``history`` charges.  Those rolling statistics come from prefix sums
+    over the rows sorted by (company, date), so both checks are a couple of
+    sorts plus linear passes, with memory proportional to the rows.
+    """
+    amounts = df['Amount'].to_numpy(dtype=np.float64)
+    # Withdrawals without a company or date belong to no merchant's history
+    rows = np.flatnonzero((amounts < 0) & df['Company'].notna().to_numpy() & df['Date'].notna().to_numpy())
+    if not len(rows):
+        return pd.DataFrame(columns=COLUMNS)
+    companies = as_categorical(df['Company'])
+    company = companies.cat.codes.to_numpy()[rows]
+    charges = -amounts[rows]
+    days = df['Date'].to_numpy(dtype='datetime64[D]').astype(np.int64)[rows]
+    days = (days - days.min()).astype(np.int32)
+
+    # Duplicates: the previous row in (company, amount, date) order
+    cents = np.rint(charges * 100).astype(np.int64)
+    order = _sort_order(company, cents, days)
+    cents = cents[order]
+    same = company[order]
+    same = np.r_[False, (same[1:] == same[:-1]) & (cents[1:] == cents[:-1])]
+    del cents
+    gap = np.r_[0, np.diff(days[order])]
+    duplicate = np.flatnonzero(same & (gap <= duplicate_days))
+    del same
+    duplicate_rows = order[duplicate]
+    duplicate_gap = gap[duplicate]
+    duplicate_of = order[duplicate - 1]
+    del order, gap
+
+    # Unusual amounts: rolling mean and deviation of the previous ``history``
+    # charges of the same company, from prefix sums of centered log amounts
+    order = _sort_order(company, days)
+    sorted_company = company[order]
+    centered = np.log(charges[order])
+    centre = (np.bincount(sorted_company, weights=centered)
+              / np.maximum(np.bincount(sorted_company), 1))
+    centered -= centre[sorted_company]
+    sums = np.r_[0.0, np.cumsum(centered)]
+    squares = np.r_[0.0, np.cumsum(np.square(centered))]
+    position = np.arange(len(order), dtype=np.int64)
+    start = np.maximum(_group_starts(sorted_company), position - history)
+    count = position - start
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (sums[:-1] - sums[start]) / count
+        # Sample deviation; a handful of charges understates the spread otherwise
+        deviation = np.sqrt(np.maximum((squares[:-1] - squares[start] - count * mean ** 2) / (count - 1), 0.0))
+    del sums, squares, start
+    limit = mean + np.maximum(sigmas * deviation, np.log(min_ratio))
+    unusual = np.flatnonzero((count >= min_history) & (centered > limit))
+    unusual_rows = order[unusual]
+    usual_limit = np.exp(limit[unusual] + centre[sorted_company[unusual]])
+
+    dates = df['Date'].to_numpy()[rows]
+    flagged = np.r_[duplicate_rows, unusual_rows]
+    detail = ([f"{gap} day{'s' if gap != 1 else ''} after an identical charge on {pd.Timestamp(date):%Y-%m-%d}"
+               for gap, date in zip(duplicate_gap, dates[duplicate_of])]
+              + [f"usually under ${limit:,.2f}" for limit in usual_limit])
+    result = pd.DataFrame({
+        'Date': dates[flagged],
+        'Company': companies.cat.categories[company[flagged]],
+        'Description': df['Description'].iloc[rows[flagged]].to_numpy(),
+        'Charge': charges[flagged],
+        'Kind': ['duplicate'] * len(duplicate_rows) + ['unusual'] * len(unusual_rows),
+        'Detail': detail,
+    })
+    return result.sort_values('Date', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def render_anomalies(anomalies: pd.DataFrame, output_format: str = 'text', limit: int = 50):
+    """Render flagged charges (the ``limit`` most recent for text/HTML) as text, HTML or a JSON-ready list."""
+    if output_format == 'json':
+        return [
+            {
+                'date': row.Date.strftime('%Y-%m-%d'),
+                'company': row.Company,
+                'description': row.Description,
+                'charge': round(float(row.Charge), 2),
+                'kind': row.Kind,
+                'detail': row.Detail,
+            }
+            for row in anomalies.itertuples(index=False)
+        ]
+
+    duplicates = int((anomalies['Kind'] == 'duplicate').sum())
+    title = (f"Possible Duplicate and Unusual Charges ({duplicates} duplicate, "
+             f"{len(anomalies) - duplicates} unusual)")
+    if anomalies.empty:
+        message = "No duplicate or unusual charges found."
+        if output_format == 'html':
+            from html_template import HTMLTemplate
+            return HTMLTemplate().create_card(f"<p>{message}</p>", title)
+        return f"{title}:\n{message}"
+
+    shown = anomalies.head(limit)
+    if len(anomalies) > limit:
+        title += f", {limit} most recent shown"
+    dates = shown['Date'].dt.strftime('%Y-%m-%d')
+    if output_format == 'html':
+        from html_template import HTMLTemplate
+        template = HTMLTemplate()
+        headers = ['Date', 'Company', 'Description', 'Charge', 'Flag', 'Detail']
+        rows = (
+            [date, company, description, f'${charge:,.2f}', kind.capitalize(), detail]
+            for date, company, description, charge, kind, detail in zip(
+                dates, shown['Company'], shown['Description'], shown['Charge'], shown['Kind'],
+                shown['Detail'])
+        )
+        return template.create_card(
+            f'<div class="overflow-x-auto">{template.create_table(headers, rows)}</div>', title)
+
+    return f"{title}:\n" + shown.assign(Date=dates).to_string(
+        index=False, float_format=lambda x: '${:,.2f}'.format(x))
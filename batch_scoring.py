@@ -0,0 +1,30 @@
+import numpy as np
+from typing import Sequence
+
+# thefuzz's fuzz.ratio is rapidfuzz's ratio rounded to an int. Scoring through
+# rapidfuzz directly lets a whole batch run in one C++ call, and rounding the
+# float64 scores half-to-even reproduces the exact integers thefuzz returns.
+# rapidfuzz is imported on the first score, so runs that never fuzzy-match
+# (analyzed or cached input, --help) don't load it.
+
+
+def ratio_scores(query: str, choices: Sequence[str]) -> np.ndarray:
+    """Score one query against many choices, identical to fuzz.ratio per pair."""
+    if not len(choices):
+        return np.zeros(0, dtype=np.int64)
+    from rapidfuzz import fuzz as rapid_fuzz, process
+    scores = process.cdist([query], choices, scorer=rapid_fuzz.ratio, dtype=np.float64)
+    return np.rint(scores[0]).astype(np.int64)
+
+
+def best_match_index(query: str, choices: Sequence[str], threshold: int = 85) -> int:
+    """Return the index of the first highest-scoring choice at or above ``threshold``.
+
+    Ties go to the earliest choice, like a linear scan that only replaces its
+    best match on a strictly higher score.  Returns -1 when nothing qualifies.
+    """
+    scores = ratio_scores(query, choices)
+    if not len(scores):
+        return -1
+    best = int(np.argmax(scores))
+    return best if scores[best] > 0 and scores[best] >= threshold else -1
@@ -0,0 +1,901 @@
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from thefuzz import fuzz
+
+from categories import TRANSACTION_CATEGORIES
+from category_rules import RuleFile
+from keyword_automaton import KeywordAutomaton
+from normalize_company import (build_company_groups, canonical_index, clean_descriptions,
+                               group_similar_companies, normalize_company_with_fuzzy, resolve_companies,
+                               should_exact_match)
+from batch_scoring import best_match_index
+from similarity_index import SimilarityIndex, group_similar_names
+
+MERCHANTS = [
+    'WALMART', 'STARBUCKS', 'NETFLIX', 'DOORDASH', 'INSTACART', 'HOME DEPOT',
+    'AMAZON', 'TARGET', 'SHELL OIL', 'EXXONMOBIL', 'CHEVRON', 'WALGREENS',
+    'MCDONALDS', 'BURGER KING', 'SPOTIFY', 'UBER TRIP', 'SAMS CLUB', 'HEB',
+    'GRUBHUB', 'BEST BUY', 'LOWES', 'DOLLAR TREE', 'PANERA BREAD', 'HULU',
+]
+CITIES = [
+    'AUSTIN TX', 'DALLAS TX', 'HOUSTON TX', 'BENTONVILLE AR', 'SEATTLE WA',
+    'NEW YORK NY', 'CHICAGO IL', 'DENVER CO', 'PORTLAND OR', 'MIAMI FL',
+]
+SYLLABLES = [
+    'AL', 'BEN', 'COR', 'DA', 'EL', 'FOR', 'GRA', 'HAR', 'IN', 'JO', 'KAL',
+    'LO', 'MAR', 'NOR', 'OX', 'PAL', 'QUI', 'RO', 'SAN', 'TE', 'UL', 'VAN',
+    'WIN', 'XE', 'YOR', 'ZU',
+]
+SUFFIXES = ['', ' MARKET', ' CAFE', ' GRILL', ' STORE', ' SERVICES', ' LLC', ' INC', ' SHOP']
+
+
+def _typo(name: str, rng: random.Random) -> str:
+    """Introduce a single small typo, like the variants seen in bank feeds."""
+    if len(name) < 4:
+        return name
+    pos = rng.randrange(1, len(name) - 1)
+    kind = rng.random()
+    if kind < 0.4:
+        return name[:pos] + name[pos + 1:]
+    if kind < 0.7:
+        return name[:pos] + name[pos + 1] + name[pos] + name[pos + 2:]
+    return name[:pos] + rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ ') + name[pos:]
+
+
+def generate_merchant_names(count: int, seed: int = 0) -> List[str]:
+    """Generate ``count`` distinct cleaned merchant names with fuzzy variants."""
+    rng = random.Random(seed)
+    names = []
+    seen = set()
+    while len(names) < count:
+        if rng.random() < 0.2:
+            base = rng.choice(MERCHANTS)
+        else:
+            base = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+            base += rng.choice(SUFFIXES)
+        if rng.random() < 0.5:
+            base += ' ' + rng.choice(CITIES)
+        # Most merchants show up in a handful of slightly different spellings
+        for _ in range(rng.randint(1, 4)):
+            name = _typo(base, rng) if rng.random() < 0.6 else base
+            if name not in seen:
+                seen.add(name)
+                names.append(name)
+    # Feeds don't list variants of one merchant next to each other
+    names = names[:count]
+    rng.shuffle(names)
+    return names
+
+
+# Raw description templates in the shapes seen in bank exports
+DESCRIPTION_TEMPLATES = [
+    '{merchant} #{store}',
+    '{merchant} {store} {city}',
+    '{merchant}.COM {phone} {number} SW {street} ST {city}, {state}, US',
+    'SQ *{merchant} {city}',
+    'TST* {merchant} {store}',
+    '{merchant} F{store}',
+    '{merchant} {zip}',
+    '{merchant} ONLINE PMT',
+    '{merchant} WWW.{merchant}.COM',
+    'ZELLE TO {person} {long_number}',
+    'INTERNET TRANSFER TO SAVINGS {long_number}',
+    # The Walmart variants from normalize_company.test_normalizer
+    'WALMART.COM {phone} {number} SW {street} ST BENTONVILLE, AR, US',
+    'WALMART 800 BENTONVILLE',
+    'WAL-MART #{store}',
+    'WM SUPERCENTER #{store}',
+]
+PEOPLE = ['JOHN SMITH', 'MARIA GARCIA', 'WEI CHEN', 'AISHA KHAN', 'SAM LEE']
+STATES = ['TX', 'AR', 'WA', 'NY', 'IL', 'CO', 'OR', 'FL']
+
+
+def generate_descriptions(count: int, distinct: int = 50000, seed: int = 0) -> List[str]:
+    """Generate ``count`` raw descriptions drawn from ``distinct`` unique ones.
+
+    Real exports repeat the same few thousand descriptions over and over, so
+    rows are sampled with a skew towards the more common descriptions.
+    """
+    rng = random.Random(seed)
+    merchants = generate_merchant_names(max(distinct // 10, 1), seed)
+    pool = []
+    for _ in range(distinct):
+        template = rng.choice(DESCRIPTION_TEMPLATES)
+        pool.append(template.format(
+            merchant=rng.choice(merchants).split(' ')[0],
+            store=rng.randint(1, 9999),
+            city=rng.choice(CITIES).rsplit(' ', 1)[0],
+            phone=f'{rng.randint(200, 999)}-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}',
+            number=rng.randint(1, 999),
+            street=rng.randint(1, 99),
+            state=rng.choice(STATES),
+            zip=f'{rng.randint(10000, 99999)}',
+            person=rng.choice(PEOPLE),
+            long_number=rng.randint(10 ** 9, 10 ** 10),
+        ))
+    weights = [1 / (rank + 1) for rank in range(distinct)]
+    return rng.choices(pool, weights=weights, k=count)
+
+
+def legacy_initial_clean(name: str) -> str:
+    """The original per-call initial_clean, kept for comparison."""
+    if not name:
+        return ""
+    if any(keyword in name.upper() for keyword in ['ZELLE', 'INTERNET TRANSFER', 'TRANSFER TO']):
+        return name.upper().strip()
+    result = name.upper().strip()
+    patterns_to_remove = [
+        r'\s+\d{6,}', r'#\d+', r'F\d{4,}', r'\*[A-Z0-9]+', r'\s+PMT\s*$',
+        r'\s+RETRY\s+PYMT\s*$', r'ACH\s+PMT\s*$', r'AUTO\s+PYMT\s*$',
+        r'\s+MOBILE\s+PMT\s*$', r'\s+ONLINE\s+PMT\s*$', r'\b\d{3}-\d{3}-\d{4}\b',
+        r'\b\d{1,3}\s*[A-Z\s]+ST[A-Z\s]*\b',
+        r'\s+\d{1,5}\s+[A-Z\s]+(?:STREET|ST|AVENUE|AVE|ROAD|RD|DRIVE|DR|LANE|LN|BLVD|PARKWAY|PKY|HWY)\b',
+        r'(?<=\s)\d{5}(?:-\d{4})?(?=\s|$)', r'WWW\.[A-Z0-9.-]+\.[A-Z]{2,}',
+        r'\.COM/?[A-Z]*\s*$', r',\s*[A-Z]{2},\s*US[A]?$', r',\s*[A-Z]{2}\s*$',
+    ]
+    for pattern in patterns_to_remove:
+        result = re.sub(pattern, '', result)
+    result = ' '.join(result.split())
+    return result.strip('* ')
+
+
+def benchmark_cleaning(rows: int, distinct: int = 50000):
+    """Time column-wise cleaning against calling the original per row."""
+    print(f"\nDescription cleaning ({rows:,} rows, {distinct:,} distinct)")
+    descriptions = pd.Series(generate_descriptions(rows, distinct))
+
+    start = time.perf_counter()
+    expected = descriptions.map(legacy_initial_clean)
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cleaned = clean_descriptions(descriptions)
+    compiled = time.perf_counter() - start
+
+    same = 'yes' if cleaned.equals(expected) else 'NO'
+    print(f"{'Per row (s)':>12} {'Per distinct (s)':>17} {'Speedup':>8}  Match")
+    print(f"{legacy:>12.2f} {compiled:>17.2f} {legacy / compiled:>7.1f}x  {same}")
+
+
+def generate_category_table(keywords: int, seed: int = 0):
+    """Extend TRANSACTION_CATEGORIES with synthetic keywords up to ``keywords`` total."""
+    rng = random.Random(seed)
+    table = {category: list(words) for category, words in TRANSACTION_CATEGORIES.items()}
+    categories = list(table)
+    total = sum(len(words) for words in table.values())
+    for name in generate_merchant_names(max(keywords - total, 0), seed + 1):
+        table[rng.choice(categories)].append(name.split(' ')[0])
+    return table
+
+
+def legacy_categorize(description: str, table) -> str:
+    """The original keyword loop from categorize_transaction, kept for comparison."""
+    description = description.upper()
+    for category, keywords in table.items():
+        if any(keyword in description for keyword in keywords):
+            return category
+    return 'Other'
+
+
+def benchmark_categorizing(rows: int, keyword_counts: List[int], distinct: int = 50000):
+    """Time the automaton (per distinct description) against the keyword loop (per row)."""
+    print(f"\nCategorizing ({rows:,} rows, {distinct:,} distinct)")
+    print(f"{'Keywords':>10} {'Loop (s)':>10} {'Compile (s)':>12} {'Automaton (s)':>14}  Match")
+    descriptions = generate_descriptions(rows, distinct)
+    for count in keyword_counts:
+        table = generate_category_table(count)
+
+        start = time.perf_counter()
+        expected = [legacy_categorize(description, table) for description in descriptions]
+        legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        automaton = KeywordAutomaton(table.items())
+        compile_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        codes, uniques = pd.factorize(pd.Series(descriptions))
+        labels = [automaton.label(description.upper(), 'Other') for description in uniques]
+        categorized = [labels[code] for code in codes]
+        matched = time.perf_counter() - start
+
+        same = 'yes' if categorized == expected else 'NO'
+        print(f"{count:>10,} {legacy:>10.2f} {compile_time:>12.3f} {matched:>14.2f}  {same}")
+
+
+def benchmark_rules(rows: int, keyword_counts: List[int], distinct: int = 50000):
+    """Time loading a rule file cold, from the compiled-rule cache and on a no-op reload,
+    and matching with it against the keyword loop."""
+    print(f"\nCategory rule files ({rows:,} rows, {distinct:,} distinct)")
+    print(f"{'Keywords':>10} {'Cold (s)':>9} {'Cached (s)':>11} {'Reload (ms)':>12} "
+          f"{'Loop (s)':>9} {'Rules (s)':>10}  Match")
+    descriptions = generate_descriptions(rows, distinct)
+    with tempfile.TemporaryDirectory() as directory:
+        for count in keyword_counts:
+            table = generate_category_table(count)
+            path = os.path.join(directory, f'rules_{count}.json')
+            with open(path, 'w') as f:
+                json.dump(table, f)
+            cache_dir = os.path.join(directory, f'cache_{count}')
+
+            start = time.perf_counter()
+            rule_file = RuleFile(path, cache_dir)
+            cold = time.perf_counter() - start
+
+            start = time.perf_counter()
+            rule_file = RuleFile(path, cache_dir)
+            cached = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for _ in range(1000):
+                rule_file.reload()
+            reload_ms = time.perf_counter() - start
+
+            start = time.perf_counter()
+            expected = [legacy_categorize(description, table) for description in descriptions]
+            legacy = time.perf_counter() - start
+
+            start = time.perf_counter()
+            codes, uniques = pd.factorize(pd.Series(descriptions))
+            labels = [rule_file.rules.label(description.upper(), 'Other') for description in uniques]
+            categorized = [labels[code] for code in codes]
+            matched = time.perf_counter() - start
+
+            same = 'yes' if categorized == expected else 'NO'
+            print(f"{count:>10,} {cold:>9.3f} {cached:>11.3f} {reload_ms:>12.3f} "
+                  f"{legacy:>9.2f} {matched:>10.2f}  {same}")
+
+
+def legacy_group_similar_names(names: List[str], threshold: int = 85):
+    """The original all-pairs grouping loop, kept for comparison."""
+    groups = {}
+    processed = set()
+    for name in names:
+        if name in processed:
+            continue
+        group = [name]
+        processed.add(name)
+        for other in names:
+            if other not in processed and fuzz.ratio(name, other) > threshold:
+                group.append(other)
+                processed.add(other)
+        groups[name] = group
+    return groups
+
+
+def benchmark_grouping(sizes: List[int], legacy_limit: int = 5000, workers: int = 1):
+    """Time indexed grouping against the all-pairs loop at several sizes."""
+    print(f"\nFuzzy grouping ({workers} worker{'s' if workers > 1 else ''})")
+    print(f"{'Names':>10} {'Indexed (s)':>12} {'All-pairs (s)':>14} {'Groups':>8}  Match")
+    for size in sizes:
+        names = generate_merchant_names(size)
+
+        start = time.perf_counter()
+        groups = group_similar_names(names, workers=workers)
+        indexed = time.perf_counter() - start
+
+        legacy = '-'
+        same = '-'
+        if size <= legacy_limit:
+            start = time.perf_counter()
+            expected = legacy_group_similar_names(names)
+            legacy = f'{time.perf_counter() - start:.2f}'
+            same = 'yes' if expected == groups else 'NO'
+
+        print(f"{size:>10,} {indexed:>12.2f} {legacy:>14} {len(groups):>8,}  {same}")
+
+
+def benchmark_matching(sizes: List[int], queries: int = 5000, threshold: int = 85):
+    """Time SimilarityIndex.best_match against scanning every known name per lookup."""
+    print(f"\nBest-match lookups ({queries:,} queries, threshold {threshold})")
+    print(f"{'Names':>10} {'Build (s)':>10} {'Scan (s)':>9} {'Index (s)':>10} {'Speedup':>8}  Match")
+    rng = random.Random(1)
+    for size in sizes:
+        known = generate_merchant_names(size)
+        # Mostly misspelled known names, plus merchants the index has never seen
+        lookups = [_typo(rng.choice(known), rng) for _ in range(queries * 3 // 4)]
+        lookups += generate_merchant_names(queries - len(lookups), seed=size + 1)
+
+        start = time.perf_counter()
+        index = SimilarityIndex(known, min_ratio=threshold)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        found = [index.best_match(name) for name in lookups]
+        indexed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        expected = [best_match_index(name, known, threshold) for name in lookups]
+        scan = time.perf_counter() - start
+
+        same = 'yes' if found == [known[best] if best >= 0 else None for best in expected] else 'NO'
+        print(f"{size:>10,} {build:>10.2f} {scan:>9.2f} {indexed:>10.2f} {scan / indexed:>7.1f}x  {same}")
+
+
+def legacy_resolve_companies(descriptions: List[str], workers: int = 1):
+    """The two-pass pipeline (group, normalize every description, regroup) on today's helpers.
+
+    Only a timing reference: it shares the grouping code with resolve_companies.
+    tests/test_normalization.py checks against a verbatim copy of the original code.
+    """
+    company_groups = build_company_groups(descriptions, workers=workers)
+    index = canonical_index(company_groups)
+    normalized = {desc: normalize_company_with_fuzzy(desc, company_groups, index) for desc in descriptions}
+    groups = group_similar_companies(list(dict.fromkeys(normalized.values())), workers)
+    company_mapping = {}
+    for main_name, variations in groups.items():
+        for variation in variations:
+            company_mapping[variation] = variation if should_exact_match(variation) else main_name
+    return {desc: (name, company_mapping[name]) for desc, name in normalized.items()}
+
+
+def benchmark_normalization(distinct: int = 50000, sample: str = None, workers: int = 1):
+    """Time resolve_companies against the two-pass pipeline and check they agree.
+
+    With ``sample`` the distinct descriptions of that CSV are used instead of
+    generated ones.
+    """
+    if sample:
+        descriptions = pd.read_csv(sample, skipinitialspace=True)['Description'].unique().tolist()
+        source = sample
+    else:
+        descriptions = list(dict.fromkeys(generate_descriptions(distinct * 2, distinct)))
+        source = 'generated'
+    print(f"\nCompany normalization ({len(descriptions):,} distinct descriptions, {source})")
+
+    start = time.perf_counter()
+    expected = legacy_resolve_companies(descriptions, workers)
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    resolved = resolve_companies(descriptions, workers)
+    unified = time.perf_counter() - start
+
+    mismatches = sum(resolved[desc] != expected[desc] for desc in descriptions)
+    companies = len({company for _, company in resolved.values()})
+    print(f"{'Two-pass (s)':>12} {'Unified (s)':>12} {'Speedup':>8} {'Companies':>10}  Mismatches")
+    print(f"{legacy:>12.2f} {unified:>12.2f} {legacy / unified:>7.1f}x {companies:>10,}  {mismatches:,}")
+    return mismatches
+
+
+DEPOSIT_DESCRIPTIONS = [
+    'PAYROLL DEPOSIT ACME CORP', 'ZELLE FROM {person}', 'MOBILE DEPOSIT', 'INTEREST PAYMENT',
+]
+
+
+def generate_transactions(rows: int, distinct: Optional[int] = None, seed: int = 0) -> pd.DataFrame:
+    """Generate an export of ``rows`` dated transactions over two years.
+
+    Spending rows draw from ``distinct`` raw descriptions (a quarter of the
+    rows, capped at 50k, by default); about one row in twelve is a deposit.
+    Dates are strings, as read from a CSV.
+    """
+    if distinct is None:
+        distinct = max(min(rows // 4, 50000), 1)
+    rng = np.random.default_rng(seed)
+    descriptions = np.array(generate_descriptions(rows, distinct, seed), dtype=object)
+
+    amounts = np.round(rng.lognormal(3.5, 1.0, rows), 2)
+    deposits = rng.random(rows) < 0.08
+    amounts = np.where(deposits, np.round(amounts * 20, 2), -amounts)
+    people = random.Random(seed)
+    descriptions[deposits] = [people.choice(DEPOSIT_DESCRIPTIONS).format(person=people.choice(PEOPLE))
+                              for _ in range(int(deposits.sum()))]
+
+    days = np.sort(rng.integers(0, 731, rows))
+    dates = pd.Timestamp('2022-01-01') + pd.to_timedelta(days, unit='D')
+    return pd.DataFrame({'Date': dates.strftime('%Y-%m-%d'), 'Amount': amounts, 'Description': descriptions})
+
+
+def _profile_pipeline(rows: int, seed: int, workers: int) -> Dict:
+    """Run the whole HTML pipeline on a generated CSV under a stage profiler."""
+    # Imported here so each size runs in a fresh process with its own peak RSS
+    from profiling import stage, start_profiling, stop_profiling
+    from script import analyze_transactions
+
+    frame = generate_transactions(rows, seed=seed)
+    distinct = frame['Description'].nunique()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'transactions.csv')
+        frame.to_csv(path, index=False)
+        del frame
+
+        profiler = start_profiling()
+        with redirect_stdout(io.StringIO()):
+            with stage('load') as record:
+                df = pd.read_csv(path)
+                record['rows'] = len(df)
+            analyze_transactions(df, 'html', workers=workers)
+        stop_profiling()
+
+    report = profiler.report()
+    del report['command']
+    return {'rows': rows, 'distinct': distinct, **report}
+
+
+def benchmark_pipeline(sizes: List[int], workers: int = 1, seed: int = 0,
+                       baseline_out: Optional[str] = None, compare: Optional[str] = None):
+    """Profile every pipeline stage at several sizes and save the results as a baseline."""
+    print(f"\nFull pipeline, HTML output ({workers} worker{'s' if workers > 1 else ''})")
+    print(f"{'Rows':>10} {'Distinct':>9} {'Wall (s)':>9} {'CPU (s)':>9} {'Peak RSS (MiB)':>15}")
+    runs = []
+    # Fresh interpreters for each size, without progress bars
+    os.environ['TQDM_DISABLE'] = '1'
+    context = multiprocessing.get_context('spawn')
+    for size in sizes:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            run = executor.submit(_profile_pipeline, size, seed, workers).result()
+        runs.append(run)
+        peak = '-' if run['peak_rss_mb'] is None else f"{run['peak_rss_mb']:,.1f}"
+        print(f"{size:>10,} {run['distinct']:>9,} {run['total_wall_s']:>9.2f} "
+              f"{run['total_cpu_s']:>9.2f} {peak:>15}")
+        for record in run['stages']:
+            name = '  ' * (record['depth'] + 1) + record['stage']
+            print(f"{name:<32} {record['wall_s']:>9.3f}")
+
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'workers': workers,
+        'seed': seed,
+        'runs': runs,
+    }
+    if baseline_out:
+        with open(baseline_out, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {baseline_out}")
+    if compare:
+        with open(compare) as f:
+            compare_baselines(json.load(f), results)
+    return results
+
+
+def compare_baselines(old: Dict, new: Dict):
+    """Print per-stage wall time and peak RSS changes between two pipeline runs."""
+    print(f"\nCompared with baseline from {old['created']}")
+    print(f"{'Rows':>10} {'Stage':<26} {'Old (s)':>9} {'New (s)':>9} {'Change':>8} {'Old RSS':>9} {'New RSS':>9}")
+    old_runs = {run['rows']: run for run in old['runs']}
+    for run in new['runs']:
+        previous = old_runs.get(run['rows'])
+        if previous is None:
+            continue
+        before = {record['stage']: record for record in previous['stages']}
+        totals = {'stage': 'total', 'wall_s': run['total_wall_s'], 'peak_rss_mb': run['peak_rss_mb']}
+        old_totals = {'stage': 'total', 'wall_s': previous['total_wall_s'],
+                      'peak_rss_mb': previous['peak_rss_mb']}
+        for record, earlier in [(r, before.get(r['stage'])) for r in run['stages']] + [(totals, old_totals)]:
+            if earlier is None:
+                continue
+            change = (record['wall_s'] / earlier['wall_s'] - 1) * 100 if earlier['wall_s'] else 0.0
+            old_rss = earlier.get('peak_rss_mb')
+            new_rss = record.get('peak_rss_mb')
+            print(f"{run['rows']:>10,} {record['stage']:<26} {earlier['wall_s']:>9.3f} {record['wall_s']:>9.3f} "
+                  f"{change:>+7.1f}% {'-' if old_rss is None else f'{old_rss:,.0f}':>9} "
+                  f"{'-' if new_rss is None else f'{new_rss:,.0f}':>9}")
+
+
+def legacy_ndjson(df: pd.DataFrame) -> str:
+    """Per-row serialization through iterrows and json.dumps, kept for comparison."""
+    lines = []
+    for _, row in df.iterrows():
+        lines.append(json.dumps({
+            'date': row['Date'].strftime('%Y-%m-%d'),
+            'amount': round(float(row['Amount']), 2),
+            'description': row['Description'],
+            'normalized_description': row['Normalized_Description'],
+            'company': row['Company'],
+            'category': row['Category'],
+        }, ensure_ascii=False))
+    return '\n'.join(lines) + '\n'
+
+
+def benchmark_serialization(rows: int = 1000000, companies: int = 50000, legacy_limit: int = 100000):
+    """Time NDJSON rows and JSON reports against the HTML report, as rows and MB per second."""
+    from columnar import iter_ndjson
+    from report import render_report
+    print(f"\nSerialization ({rows:,} transactions, {companies:,}-company reports)")
+    frame = generate_transactions(rows)
+    frame['Date'] = pd.to_datetime(frame['Date'])
+    frame['Description'] = frame['Description'].astype('category')
+    frame['Normalized_Description'] = frame['Company'] = frame['Description']
+    categories = list(TRANSACTION_CATEGORIES) + ['Other']
+    codes = np.random.default_rng(0).integers(0, len(categories), rows)
+    frame['Category'] = pd.Categorical.from_codes(codes, categories)
+
+    spending = generate_spending(companies)
+    category_flows = pd.DataFrame({'Category': ['Shopping', 'Food & Dining'],
+                                   'Total_Amount': [1200.0, 800.0], 'Transaction_Count': [12, 30]})
+
+    def report(output_format, sink=None):
+        with redirect_stdout(io.StringIO()):
+            return render_report(spending.copy(), '2022-01-01', '2024-01-01', 24.0, output_format,
+                                 (5000.0, 2000.0), category_flows, sink=sink, limit=None)
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name, count, write in [
+            ('HTML report', companies, lambda f: report('html', f)),
+            ('JSON report', companies, lambda f: f.write(report('json'))),
+            ('NDJSON rows', rows, lambda f: f.writelines(iter_ndjson(frame))),
+            ('NDJSON, iterrows', min(rows, legacy_limit),
+             lambda f: f.write(legacy_ndjson(frame.head(legacy_limit)))),
+        ]:
+            path = os.path.join(directory, 'output')
+            start = time.perf_counter()
+            with open(path, 'w') as f:
+                write(f)
+            seconds = time.perf_counter() - start
+            results.append((name, count, seconds, os.path.getsize(path)))
+
+    print(f"{'Output':<18} {'Rows':>10} {'Time (s)':>9} {'Rows/s':>11} {'MB/s':>7}")
+    for name, count, seconds, size in results:
+        print(f"{name:<18} {count:>10,} {seconds:>9.3f} {count / seconds:>11,.0f} "
+              f"{size / seconds / 1e6:>7.1f}")
+
+
+def _import_times(module: str) -> List[tuple]:
+    """(cumulative ms, name) of the modules ``module`` imports directly, from python -X importtime."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, check=True)
+    times = []
+    for line in result.stderr.splitlines():
+        parts = line.split('|')
+        # Nesting shows as indentation; two spaces is a direct import of ``module``
+        if len(parts) == 3 and re.match(r' {3}\S', parts[2]):
+            times.append((int(parts[1]) / 1000, parts[2].strip()))
+    return sorted(times, reverse=True)
+
+
+def benchmark_startup(rows: int = 500, runs: int = 10, top: int = 8):
+    """Time cold starts of the CLI: bare imports, then whole runs on a small file."""
+    print(f"\nStartup (median of {runs} fresh processes, {rows:,}-row file)")
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'script.py')
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'transactions.csv')
+        generate_transactions(rows).to_csv(path, index=False)
+        commands = {
+            'python (no imports)': [sys.executable, '-c', 'pass'],
+            'import pandas': [sys.executable, '-c', 'import pandas'],
+            'import script': [sys.executable, '-c', 'import script'],
+            'script.py --help': [sys.executable, script, '--help'],
+            'script.py (text)': [sys.executable, script, path],
+            'script.py (html)': [sys.executable, script, path, '--format', 'html',
+                                 '--output', os.path.join(directory, 'report.html')],
+        }
+        print(f"{'Command':<22} {'Median (s)':>11} {'Min (s)':>9}")
+        for name, command in commands.items():
+            times = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True,
+                               cwd=os.path.dirname(script))
+                times.append(time.perf_counter() - start)
+            print(f"{name:<22} {statistics.median(times):>11.3f} {min(times):>9.3f}")
+
+    print(f"\nSlowest imports of script.py (cumulative, one cold run)")
+    for milliseconds, module in _import_times('script')[:top]:
+        print(f"{module:<28} {milliseconds:>8.1f} ms")
+
+
+def generate_spending(companies: int, seed: int = 0) -> pd.DataFrame:
+    """Generate per-company totals shaped like the aggregate render_report receives."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Company': generate_merchant_names(companies, seed),
+        'Total_Amount': -np.round(rng.lognormal(6, 1.5, companies), 2),
+        'Transaction_Count': rng.integers(1, 500, companies),
+    })
+
+
+def legacy_render_table(spending: pd.DataFrame, months: float) -> str:
+    """The original report table: iterrows, += concatenation, full document per section."""
+    from html_template import HTMLTemplate
+    template = HTMLTemplate()
+    spending = spending.copy()
+    spending['Total_Amount'] = abs(spending['Total_Amount'])
+    spending['Monthly_Average'] = spending['Total_Amount'] / months
+    spending['Yearly_Average'] = spending['Total_Amount'] / (months / 12)
+    spending = spending.sort_values('Total_Amount', ascending=False)
+    rows = []
+    for _, row in spending.iterrows():
+        rows.append([row['Company'], f'${row["Total_Amount"]:,.2f}', f'${row["Monthly_Average"]:,.2f}',
+                     f'${row["Yearly_Average"]:,.2f}', str(row["Transaction_Count"])])
+    rows_html = ""
+    for row in rows:
+        cells = "".join([f"<td>{cell}</td>" for cell in row])
+        rows_html += f"<tr>{cells}</tr>"
+    table = f'<table class="table"><tbody>{rows_html}</tbody></table>'
+    # The flow diagram used to be a document of its own, inlined CSS and all
+    inner = template.render('<div class="card"></div>')
+    return template.render(template.create_card(table, 'All Companies') + inner)
+
+
+def _measure(function):
+    """Run ``function`` twice: timed, then under tracemalloc. Returns (result, seconds, peak MiB)."""
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = function()
+    peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def benchmark_html(companies: int = 50000):
+    """Time rendering an all-companies HTML report as a string and streamed to a file."""
+    from report import render_report
+    print(f"\nHTML report ({companies:,} table rows)")
+    spending = generate_spending(companies)
+    category_flows = pd.DataFrame({'Category': ['Shopping', 'Food & Dining'],
+                                   'Total_Amount': [1200.0, 800.0], 'Transaction_Count': [12, 30]})
+
+    def render(sink=None):
+        with redirect_stdout(io.StringIO()):
+            return render_report(spending.copy(), '2022-01-01', '2024-01-01', 24.0, 'html',
+                                 (5000.0, 2000.0), category_flows, sink=sink, limit=None)
+
+    legacy, legacy_time, legacy_peak = _measure(lambda: legacy_render_table(spending, 24.0))
+    joined, joined_time, joined_peak = _measure(render)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'report.html')
+        def stream():
+            with open(path, 'w') as sink:
+                render(sink)
+        _, streamed_time, streamed_peak = _measure(stream)
+        streamed_size = os.path.getsize(path)
+
+    print(f"{'Renderer':<22} {'Time (s)':>9} {'Peak MiB':>9} {'Size (KiB)':>11} {'Documents':>10}")
+    for name, seconds, peak, size, documents in [
+        ('Original (+=)', legacy_time, legacy_peak, len(legacy.encode()), legacy.count('<!DOCTYPE')),
+        ('Sections, as string', joined_time, joined_peak, len(joined.encode()), joined.count('<!DOCTYPE')),
+        ('Sections, to file', streamed_time, streamed_peak, streamed_size, 1),
+    ]:
+        print(f"{name:<22} {seconds:>9.3f} {peak:>9.1f} {size / 1024:>11,.0f} {documents:>10}")
+
+
+def legacy_text_table(spending: pd.DataFrame, months: float, limit: Optional[int]) -> str:
+    """The original text table: a full sort, then to_string with a per-value float format."""
+    spending = spending.copy()
+    spending['Total_Amount'] = abs(spending['Total_Amount'])
+    spending['Monthly_Average'] = spending['Total_Amount'] / months
+    spending['Yearly_Average'] = spending['Total_Amount'] / (months / 12)
+    spending = spending.sort_values('Total_Amount', ascending=False, kind='stable')
+    if limit is not None:
+        spending = spending.head(limit)
+    return spending.to_string(float_format=lambda x: '${:,.2f}'.format(x) if isinstance(x, float) else x)
+
+
+def benchmark_top(companies: int = 300000, top: int = 40):
+    """Time listing the top and all companies: full sort and to_string/iterrows versus
+    partial selection and column-wise formatting."""
+    from report import render_report
+    print(f"\nCompany table ({companies:,} companies)")
+    spending = generate_spending(companies)
+    category_flows = pd.DataFrame({'Category': ['Shopping'], 'Total_Amount': [1200.0],
+                                   'Transaction_Count': [12]})
+
+    def render(output_format, limit):
+        with redirect_stdout(io.StringIO()):
+            return render_report(spending.copy(), '2022-01-01', '2024-01-01', 24.0, output_format,
+                                 (5000.0, 2000.0), category_flows, limit=limit)
+
+    print(f"{'Report':<12} {'Original (s)':>13} {'Now (s)':>9} {'Speedup':>8} {'Same':>5}")
+    for name, legacy, current, same in [
+        (f'text, {top}', lambda: legacy_text_table(spending, 24.0, top), lambda: render('text', top), True),
+        ('text, all', lambda: legacy_text_table(spending, 24.0, None), lambda: render('text', None), True),
+        ('html, all', lambda: legacy_render_table(spending, 24.0), lambda: render('html', None), False),
+    ]:
+        start = time.perf_counter()
+        expected = legacy()
+        legacy_time = time.perf_counter() - start
+        start = time.perf_counter()
+        result = current()
+        current_time = time.perf_counter() - start
+        matches = ('yes' if result == expected else 'NO') if same else '-'
+        print(f"{name:<12} {legacy_time:>13.3f} {current_time:>9.3f} {legacy_time / current_time:>7.1f}x "
+              f"{matches:>5}")
+
+
+def benchmark_concurrency(rows: int = 5000, requests: int = 32, thread_counts: List[int] = (1, 2, 4, 8),
+                          output_format: str = 'html', seed: int = 0):
+    """Stress one shared Analyzer from several threads and measure request throughput.
+
+    Requests cycle through four different exports.  Every report must equal
+    the one rendered on a single thread and no input frame may change,
+    otherwise the stage fails.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from analyzer import Analyzer
+    print(f"\nShared Analyzer, {requests} requests of {rows:,} rows ({output_format} reports)")
+    frames = [generate_transactions(rows, seed=seed + offset) for offset in range(4)]
+    originals = [frame.copy() for frame in frames]
+    analyzer = Analyzer()
+
+    def serve(frame):
+        return analyzer.render(analyzer.analyze(frame, recurring=True, anomalies=True), output_format)
+
+    expected = [serve(frame) for frame in frames]
+    print(f"{'Threads':>7} {'Wall (s)':>9} {'Requests/s':>11} {'Mismatches':>11}")
+    failures = 0
+    for threads in thread_counts:
+        jobs = [frames[i % len(frames)] for i in range(requests)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            reports = list(executor.map(serve, jobs))
+        elapsed = time.perf_counter() - start
+        mismatches = sum(report != expected[i % len(frames)] for i, report in enumerate(reports))
+        failures += mismatches
+        print(f"{threads:>7} {elapsed:>9.2f} {requests / elapsed:>11.1f} {mismatches:>11}")
+    changed = sum(not frame.equals(original) for frame, original in zip(frames, originals))
+    if changed:
+        print(f"{changed} input frames were modified")
+    return failures + changed
+
+
+def legacy_smoothing_forecast(series: List[float], horizon: int) -> List[float]:
+    """Damped Holt smoothing of one series at a time, searching the same weights in Python."""
+    from forecast import ALPHAS, BETAS, DAMPING
+    best = None
+    for alpha in ALPHAS:
+        for beta in BETAS:
+            level, trend, error = series[0], 0.0, 0.0
+            for actual in series[1:]:
+                predicted = level + DAMPING * trend
+                error += (actual - predicted) ** 2
+                new_level = alpha * actual + (1 - alpha) * predicted
+                trend = beta * (new_level - level) + (1 - beta) * DAMPING * trend
+                level = new_level
+            if best is None or error < best[0]:
+                best = (error, level, trend)
+    _, level, trend = best
+    ahead, damping = [], 0.0
+    for step in range(1, horizon + 1):
+        damping += DAMPING ** step
+        ahead.append(level + damping * trend)
+    return ahead
+
+
+def benchmark_forecast(series_counts: List[int], months: int = 36, horizon: int = 3,
+                       legacy_limit: int = 2000, rows: int = 1000000, seed: int = 0):
+    """Time fitting many monthly series at once against one at a time, then a whole forecast."""
+    from forecast import forecast_spending, smoothing_forecast, trend_forecast
+    print(f"\nForecasting {months} months of history, {horizon} ahead")
+    print(f"{'Series':>9} {'Smoothing (s)':>14} {'Trend (s)':>10} {'Per series (s)':>15} {'Same':>5}")
+    rng = np.random.default_rng(seed)
+    for count in series_counts:
+        base = rng.lognormal(5, 1.5, count)
+        history = np.maximum(base * (1 + 0.01 * np.arange(months)[:, None])
+                             + rng.normal(0, 0.2, (months, count)) * base, 0)
+        start = time.perf_counter()
+        projected = smoothing_forecast(history, horizon)
+        smoothing_time = time.perf_counter() - start
+        start = time.perf_counter()
+        trend_forecast(history, horizon)
+        trend_time = time.perf_counter() - start
+        legacy_time, same = '-', '-'
+        if count <= legacy_limit:
+            start = time.perf_counter()
+            legacy = [legacy_smoothing_forecast(column.tolist(), horizon) for column in history.T]
+            legacy_time = f"{time.perf_counter() - start:.3f}"
+            same = 'yes' if np.allclose(np.array(legacy).T, projected) else 'NO'
+        print(f"{count:>9,} {smoothing_time:>14.3f} {trend_time:>10.3f} {legacy_time:>15} {same:>5}")
+
+    df = generate_transactions(rows, seed=seed)
+    df['Date'] = pd.to_datetime(df['Date'])
+    with redirect_stdout(io.StringIO()):
+        from analyzer import Analyzer
+        analyzed = Analyzer().analyze(df).transactions
+    start = time.perf_counter()
+    forecast = forecast_spending(analyzed, horizon)
+    print(f"forecast_spending on {rows:,} rows: {len(forecast):,} categories and companies in "
+          f"{time.perf_counter() - start:.3f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark transaction analyzer stages')
+    parser.add_argument('--stages', nargs='+', choices=['grouping', 'matching', 'cleaning', 'categorizing', 'rules', 'normalization', 'pipeline',
+                                 'html', 'serialization', 'startup', 'top', 'concurrency', 'forecast'],
+                        default=['grouping', 'matching', 'cleaning', 'categorizing', 'rules', 'normalization',
+                                 'pipeline', 'html', 'serialization', 'startup', 'top', 'concurrency',
+                                 'forecast'],
+                        help='Stages to benchmark (default: all)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='Numbers of unique names to benchmark (default: 1k, 10k, 100k)')
+    parser.add_argument('--legacy-limit', type=int, default=5000,
+                        help='Largest size to also run the all-pairs loop on (default: 5000)')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1],
+                        help='Worker counts to benchmark fuzzy matching with (default: 1)')
+
+    parser.add_argument('--queries', type=int, default=5000,
+                        help='Lookups per size for the best-match benchmark (default: 5000)')
+
+    parser.add_argument('--rows', type=int, default=1000000,
+                        help='Rows of raw descriptions for the cleaning benchmark (default: 1M)')
+    parser.add_argument('--keywords', type=int, nargs='+', default=[150, 1000, 5000],
+                        help='Category keyword table sizes to benchmark (default: 150, 1k, 5k)')
+    parser.add_argument('--distinct', type=int, default=20000,
+                        help='Size of the generated description pool for the normalization benchmark (default: 20k)')
+    parser.add_argument('--sample', help='CSV whose descriptions to check normalization against (optional)')
+    parser.add_argument('--pipeline-rows', type=int, nargs='+', default=[10000, 100000, 1000000],
+                        help='Transaction counts to profile the full pipeline at (default: 10k, 100k, 1M)')
+    parser.add_argument('--baseline-out',
+                        help='JSON file to write pipeline results to (optional)')
+    parser.add_argument('--compare', help='Earlier pipeline results to compare against (optional)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for generated transactions (default: 0)')
+    parser.add_argument('--serialize-rows', type=int, default=1000000,
+                        help='Transactions written as NDJSON in the serialization benchmark (default: 1M)')
+    parser.add_argument('--startup-rows', type=int, default=500,
+                        help='Rows in the small file the startup benchmark runs on (default: 500)')
+    parser.add_argument('--runs', type=int, default=10,
+                        help='Fresh processes per command in the startup benchmark (default: 10)')
+    parser.add_argument('--table-rows', type=int, default=50000,
+                        help='Companies in the HTML report benchmark table (default: 50k)')
+    parser.add_argument('--top-companies', type=int, default=300000,
+                        help='Companies in the top-N table benchmark (default: 300k)')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help='Thread counts sharing one Analyzer in the concurrency benchmark (default: 1 2 4 8)')
+    parser.add_argument('--requests', type=int, default=32,
+                        help='Requests per thread count in the concurrency benchmark (default: 32)')
+    parser.add_argument('--request-rows', type=int, default=5000,
+                        help='Transactions per request in the concurrency benchmark (default: 5,000)')
+    parser.add_argument('--series', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='Monthly series fitted at once in the forecast benchmark (default: 1k, 10k, 100k)')
+    parser.add_argument('--forecast-rows', type=int, default=1000000,
+                        help='Transactions for the whole-forecast timing (default: 1M)')
+
+    args = parser.parse_args()
+    if 'grouping' in args.stages:
+        for workers in args.workers:
+            benchmark_grouping(args.sizes, args.legacy_limit, workers)
+    if 'matching' in args.stages:
+        benchmark_matching(args.sizes, args.queries)
+    if 'cleaning' in args.stages:
+        benchmark_cleaning(args.rows)
+    if 'categorizing' in args.stages:
+        benchmark_categorizing(args.rows, args.keywords)
+    if 'rules' in args.stages:
+        benchmark_rules(args.rows, args.keywords)
+    if 'normalization' in args.stages:
+        mismatches = benchmark_normalization(args.distinct, args.sample, args.workers[0])
+        if mismatches:
+            raise SystemExit("resolve_companies disagrees with the original pipeline")
+    if 'pipeline' in args.stages:
+        benchmark_pipeline(args.pipeline_rows, args.workers[0], args.seed, args.baseline_out, args.compare)
+    if 'html' in args.stages:
+        benchmark_html(args.table_rows)
+    if 'serialization' in args.stages:
+        benchmark_serialization(args.serialize_rows, args.table_rows, args.legacy_limit)
+    if 'startup' in args.stages:
+        benchmark_startup(args.startup_rows, args.runs)
+    if 'top' in args.stages:
+        benchmark_top(args.top_companies)
+    if 'concurrency' in args.stages:
+        if benchmark_concurrency(args.request_rows, args.requests, args.threads, seed=args.seed):
+            raise SystemExit("Concurrent analyses disagree with single-threaded ones")
+    if 'forecast' in args.stages:
+        benchmark_forecast(args.series, legacy_limit=args.legacy_limit, rows=args.forecast_rows, seed=args.seed)
+
+if __name__ == "__main__":
+    main()
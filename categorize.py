@@ -1,11 +1,59 @@
+from typing import Optional
+
+import pandas as pd
 from categories import TRANSACTION_CATEGORIES
+from category_rules import CategoryRules, RuleFile
+from columnar import as_categorical, map_categories
+from keyword_automaton import KeywordAutomaton
+from profiling import stage
+
+# The built-in rules, compiled on first use, and the rule file replacing them (if any)
+_default_rules = None
+_rule_file = None
+
+def use_category_rules(path: Optional[str], cache_dir: Optional[str] = None) -> None:
+    """Categorize with the rules in a JSON, YAML or CSV file, or the built-in ones if ``path`` is None."""
+    global _rule_file
+    _rule_file = RuleFile(path, cache_dir) if path else None
+
+def default_category_rules() -> CategoryRules:
+    """The built-in category rules, compiled once per process."""
+    global _default_rules
+    if _default_rules is None:
+        _default_rules = CategoryRules(TRANSACTION_CATEGORIES.items())
+    return _default_rules
+
+def get_category_rules() -> CategoryRules:
+    """The category rules in use, without checking the rule file for changes."""
+    if _rule_file is not None:
+        return _rule_file.rules
+    return default_category_rules()
+
+def reload_category_rules() -> CategoryRules:
+    """The category rules in use, picking up any edit to the rule file first."""
+    if _rule_file is not None:
+        _rule_file.reload()
+    return get_category_rules()
+
+def get_category_automaton() -> KeywordAutomaton:
+    """The keyword automaton of the category rules in use (compiled once per rule set)."""
+    return get_category_rules().automaton
 
 def categorize_transaction(description: str) -> str:
     """Categorize a transaction based on its description."""
-    description = description.upper()
+    return get_category_rules().label(description.upper(), 'Other')
+
+def categorize_descriptions(descriptions, rules: Optional[CategoryRules] = None) -> pd.Series:
+    """Categorize a whole column, matching each distinct description once.
     
-    for category, keywords in TRANSACTION_CATEGORIES.items():
-        if any(keyword in description for keyword in keywords):
-            return category
-            
-    return 'Other'
\ No newline at end of file
+    The result is categorical, sharing the row codes of the descriptions.
+    Without ``rules`` the rules in use are taken, checking the rule file
+    (if any) for changes once per call.
+    """
+    descriptions = as_categorical(descriptions)
+    uniques = descriptions.cat.categories
+    if rules is None:
+        rules = reload_category_rules()
+    with stage('categorize_transaction', rows=len(descriptions), unique=len(uniques)):
+        categories = {description: rules.label(description.upper(), 'Other') for description in uniques}
+    return map_categories(descriptions, categories, name='Category')
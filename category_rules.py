@@ -0,0 +1,195 @@
+import csv
+import hashlib
+import inspect
+import io
+import json
+import os
+import sys
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import keyword_automaton
+from keyword_automaton import KeywordAutomaton
+
+RULE_FORMATS = {'.json': 'json', '.yaml': 'yaml', '.yml': 'yaml', '.csv': 'csv'}
+
+
+def compiler_version() -> str:
+    """Fingerprint this module and KeywordAutomaton so compiled rule caches expire with them."""
+    digest = hashlib.sha256()
+    for module in (keyword_automaton, sys.modules[__name__]):
+        digest.update(inspect.getsource(module).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def default_cache_dir() -> str:
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'transaction_analyzer', 'rules')
+
+
+def _entries(data) -> Iterable[Tuple[str, List[str], int]]:
+    """Yield (category, keywords, priority) from parsed JSON/YAML."""
+    if isinstance(data, dict):
+        data = [
+            dict(value, category=category) if isinstance(value, dict)
+            else {'category': category, 'keywords': value}
+            for category, value in data.items()
+        ]
+    if not isinstance(data, list):
+        raise ValueError("Category rules must be a mapping of category to keywords or a list of rules")
+    for rule in data:
+        if not isinstance(rule, dict) or 'category' not in rule or 'keywords' not in rule:
+            raise ValueError(f"Each category rule needs a category and keywords: {rule!r}")
+        keywords = rule['keywords']
+        if isinstance(keywords, str):
+            keywords = [keywords]
+        if not isinstance(keywords, list):
+            raise ValueError(f"Keywords of {rule['category']} must be a list: {keywords!r}")
+        yield str(rule['category']), [str(keyword) for keyword in keywords], int(rule.get('priority', 0))
+
+
+def parse_rules(text: str, file_format: str) -> List[Tuple[str, List[str]]]:
+    """Parse category rules into ``(category, keywords)`` pairs in matching order.
+
+    JSON and YAML hold either ``{category: [keywords]}`` or a list of
+    ``{category, keywords, priority}``; CSV has ``category,keyword`` columns
+    and an optional ``priority`` column, one keyword per row.  Rules with a
+    higher priority are tried first (the default is 0) and ties keep file
+    order.  Keywords are upper-cased, as descriptions are before matching.
+    """
+    if file_format == 'json':
+        entries = list(_entries(json.loads(text)))
+    elif file_format == 'yaml':
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("YAML category rules need PyYAML: pip install pyyaml") from None
+        try:
+            data = yaml.safe_load(text)
+        except yaml.YAMLError as error:
+            raise ValueError(f"Invalid YAML: {error}") from None
+        entries = list(_entries(data))
+    elif file_format == 'csv':
+        # One rule per (category, priority), in order of first appearance
+        grouped: Dict[Tuple[str, int], List[str]] = {}
+        for row in csv.DictReader(io.StringIO(text)):
+            row = {name.strip().lower(): (value or '').strip() for name, value in row.items() if name}
+            if not row.get('category') or not row.get('keyword'):
+                raise ValueError(f"Each CSV category rule needs a category and a keyword: {row!r}")
+            key = (row['category'], int(row.get('priority') or 0))
+            grouped.setdefault(key, []).append(row['keyword'])
+        entries = [(category, keywords, priority) for (category, priority), keywords in grouped.items()]
+    else:
+        raise ValueError(f"Unknown category rule format: {file_format}")
+
+    entries.sort(key=lambda entry: -entry[2])
+    return [(category, [keyword.upper() for keyword in keywords]) for category, keywords, _ in entries]
+
+
+class CategoryRules:
+    """Category keyword rules compiled for matching, plus their tooltip text."""
+
+    def __init__(self, rules: Iterable[Tuple[str, Iterable[str]]],
+                 automaton: Optional[KeywordAutomaton] = None):
+        self.rules = [(category, list(keywords)) for category, keywords in rules]
+        self.automaton = automaton or KeywordAutomaton(self.rules)
+        # Joined once here rather than on every report render
+        keywords: Dict[str, List[str]] = {}
+        for category, words in self.rules:
+            keywords.setdefault(category, []).extend(words)
+        self.tooltips = {category: ', '.join(words) for category, words in keywords.items()}
+
+    def label(self, description: str, default: str = 'Other') -> str:
+        """Return the category of an upper-cased description."""
+        return self.automaton.label(description, default)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The rules and compiled automaton as plain data, ready for JSON."""
+        return {'rules': self.rules, 'automaton': self.automaton.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'CategoryRules':
+        """Rebuild rules from ``to_dict`` output; raises ValueError if it is malformed."""
+        try:
+            rules = [(str(category), [str(keyword) for keyword in keywords])
+                     for category, keywords in data['rules']]
+            automaton = KeywordAutomaton.from_dict(data['automaton'])
+        except (KeyError, TypeError, AttributeError) as error:
+            raise ValueError(f"Malformed compiled rules: {error!r}") from None
+        if automaton.labels != [category for category, _ in rules]:
+            raise ValueError("Compiled rules do not match their automaton")
+        return cls(rules, automaton)
+
+
+class RuleFile:
+    """Category rules loaded from a JSON, YAML or CSV file and kept current.
+
+    Compiled rules are saved as JSON in ``cache_dir`` under a hash of the
+    file's contents (and of the compiler), so a process seeing a rule file
+    again skips compiling it.  Only plain data is cached, never objects, so
+    a tampered or stale cache file can at worst be rejected and recompiled.
+    ``reload`` is cheap to call often: it only re-reads the file when its
+    size or modification time changed, and only swaps in new rules when
+    the contents did.
+    """
+
+    def __init__(self, path: str, cache_dir: Optional[str] = None):
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in RULE_FORMATS:
+            raise ValueError(f"Category rules must be JSON, YAML or CSV, not {path}")
+        self.path = path
+        self.format = RULE_FORMATS[extension]
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.digest: Optional[str] = None
+        self.rules: Optional[CategoryRules] = None
+        self._stamp = None
+        self.reload()
+
+    def _cache_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, f'{digest}.json')
+
+    def _load_cached(self, digest: str) -> Optional[CategoryRules]:
+        try:
+            with open(self._cache_path(digest), encoding='utf-8') as f:
+                return CategoryRules.from_dict(json.load(f))
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, digest: str, rules: CategoryRules) -> None:
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write then rename, so concurrent processes never read half a file
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(rules.to_dict(), f, separators=(',', ':'))
+            os.replace(temp_path, self._cache_path(digest))
+        except OSError:
+            pass  # the cache is only an optimization
+
+    def reload(self) -> bool:
+        """Pick up changes to the rule file; returns True if the rules changed."""
+        stat = os.stat(self.path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._stamp:
+            return False
+        with open(self.path, 'rb') as f:
+            content = f.read()
+        digest = hashlib.sha256(content + compiler_version().encode('utf-8')).hexdigest()
+        if digest == self.digest:
+            self._stamp = stamp
+            return False
+
+        rules = self._load_cached(digest)
+        if rules is None:
+            try:
+                rules = CategoryRules(parse_rules(content.decode('utf-8-sig'), self.format))
+            except ValueError as error:
+                if self.rules is None:
+                    raise
+                # Keep serving the last good rules until the file is fixed
+                self._stamp = stamp
+                print(f"Ignoring invalid category rules in {self.path}: {error}", file=sys.stderr)
+                return False
+            self._store(digest, rules)
+        self.rules, self.digest, self._stamp = rules, digest, stamp
+        return True
@@ -0,0 +1,154 @@
+import json
+import os
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Columns of a fully analyzed frame, and the low-cardinality ones stored as
+# categoricals (dictionary encoded on disk, so they round-trip as category).
+ANALYZED_COLUMNS = ['Date', 'Amount', 'Description', 'Normalized_Description', 'Company', 'Category']
+CATEGORICAL_COLUMNS = ['Normalized_Description', 'Company', 'Category']
+
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+ARROW_EXTENSIONS = ('.arrow', '.feather', '.ipc')
+INPUT_EXTENSIONS = ('.csv',) + PARQUET_EXTENSIONS + ARROW_EXTENSIONS
+
+
+def columnar_format(path: str) -> Optional[str]:
+    """Return 'parquet' or 'arrow' for columnar files, None for anything else (CSV)."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in PARQUET_EXTENSIONS:
+        return 'parquet'
+    if extension in ARROW_EXTENSIONS:
+        return 'arrow'
+    return None
+
+
+def require_pyarrow() -> None:
+    """Raise a helpful ImportError if pyarrow is missing."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError("Parquet/Arrow files need pyarrow: pip install pyarrow") from None
+
+
+def read_transactions(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Read a CSV, Parquet or Arrow file of transactions.
+
+    Columnar files are memory-mapped and keep their stored dtypes, so dates,
+    amounts and categoricals need no parsing.
+    """
+    file_format = columnar_format(path)
+    if file_format is None:
+        # Descriptions repeat a lot, so parse them straight into a categorical
+        header = pd.read_csv(path, nrows=0).columns
+        dtypes = {column: 'category' for column in header if column.strip() == 'Description'}
+        return pd.read_csv(path, usecols=columns, dtype=dtypes)
+
+    require_pyarrow()
+    if file_format == 'parquet':
+        return pd.read_parquet(path, columns=columns, memory_map=True)
+
+    from pyarrow import feather
+    return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+
+def iter_columnar_chunks(path: str, columns: List[str], chunksize: int) -> Iterator[pd.DataFrame]:
+    """Yield ``columns`` of a Parquet or Arrow file in record batches of ``chunksize`` rows."""
+    require_pyarrow()
+    if columnar_format(path) == 'parquet':
+        from pyarrow import parquet
+        batches = parquet.ParquetFile(path, memory_map=True).iter_batches(
+            batch_size=chunksize, columns=columns)
+    else:
+        from pyarrow import feather
+        batches = feather.read_table(path, columns=columns, memory_map=True).to_batches(chunksize)
+    for batch in batches:
+        yield batch.to_pandas()
+
+
+def as_categorical(values) -> pd.Series:
+    """Return ``values`` as a categorical Series: codes into a table of distinct values."""
+    values = pd.Series(values)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.remove_unused_categories()
+    return values.astype('category')
+
+
+def distinct_values(values: pd.Series) -> List[str]:
+    """Distinct values of a categorical Series in order of first appearance."""
+    codes = values.cat.codes.to_numpy()
+    return values.cat.categories[pd.unique(codes[codes >= 0])].tolist()
+
+
+def map_categories(values: pd.Series, mapping: Dict[str, str], name: Optional[str] = None) -> pd.Series:
+    """Map each distinct value of a categorical Series once and broadcast through its codes.
+
+    The result is categorical too, with sorted categories so grouping by it
+    orders groups like grouping the plain strings would.
+    """
+    codes, uniques = pd.factorize(values.cat.categories.map(mapping), sort=True)
+    row_codes = values.cat.codes.to_numpy()
+    row_codes = np.where(row_codes >= 0, codes[row_codes], -1)
+    return pd.Series(pd.Categorical.from_codes(row_codes, uniques), index=values.index,
+                     name=values.name if name is None else name)
+
+
+def is_analyzed(df: pd.DataFrame) -> bool:
+    """True if ``df`` already carries the normalized and categorized columns."""
+    return all(column in df.columns for column in ANALYZED_COLUMNS)
+
+
+def write_analyzed(df: pd.DataFrame, path: str) -> None:
+    """Save the analyzed columns to a Parquet or Arrow file for later runs.
+
+    Arrow files are written uncompressed so they can be memory-mapped
+    without decoding; Parquet is smaller but has to be decompressed.
+    """
+    file_format = columnar_format(path)
+    if file_format is None:
+        raise ValueError(f"Analyzed frames are saved as Parquet or Arrow, not {path}")
+    require_pyarrow()
+
+    frame = df[ANALYZED_COLUMNS].astype({column: 'category' for column in CATEGORICAL_COLUMNS})
+    frame = frame.reset_index(drop=True)
+    if file_format == 'parquet':
+        frame.to_parquet(path, index=False)
+    else:
+        frame.to_feather(path, compression='uncompressed')
+
+
+def _json_values(values: pd.Series) -> "tuple[np.ndarray, np.ndarray]":
+    """JSON text of each distinct value (plus null for missing ones) and every row's code into it."""
+    values = as_categorical(values)
+    table = [json.dumps(value, ensure_ascii=False) for value in values.cat.categories] + ['null']
+    # Missing values have code -1, which picks the trailing null
+    return np.array(table, dtype=object), values.cat.codes.to_numpy()
+
+
+def iter_ndjson(df: pd.DataFrame, chunksize: int = 100000) -> Iterator[str]:
+    """Yield the analyzed columns as newline-delimited JSON, ``chunksize`` rows at a time.
+
+    Keys are the lower-cased column names, dates are YYYY-MM-DD and amounts
+    are rounded to cents.  String columns are JSON-encoded once per distinct
+    value and looked up by code, so each row is just one f-string, and only
+    one chunk of text exists at a time.
+    """
+    strings = [_json_values(df[column]) for column in ANALYZED_COLUMNS[2:]]
+    dates = df['Date'].to_numpy(dtype='datetime64[D]')
+    amounts = df['Amount'].to_numpy(dtype=np.float64)
+    for start in range(0, len(df), chunksize):
+        stop = start + chunksize
+        days = [f'"{day}"' if day != 'NaT' else 'null' for day in dates[start:stop].astype(str).tolist()]
+        cents = np.round(amounts[start:stop], 2)
+        cents[~np.isfinite(cents)] = np.nan
+        money = ['null' if amount != amount else repr(amount) for amount in cents.tolist()]
+        description, normalized, company, category = (table[codes[start:stop]].tolist()
+                                                       for table, codes in strings)
+        yield "".join([
+            f'{{"date":{day},"amount":{amount},"description":{raw},"normalized_description":{name},'
+            f'"company":{company_name},"category":{category_name}}}\n'
+            for day, amount, raw, name, company_name, category_name in zip(
+                days, money, description, normalized, company, category)
+        ])
@@ -1,40 +1,55 @@
-from html_template import HTMLTemplate
-from categories import TRANSACTION_CATEGORIES
-from categorize import categorize_transaction
-import os
+from categorize import categorize_descriptions, get_category_rules
 
-def generate_flow_diagram(df, output_format='html'):
-    """Generate a modern HTML/CSS spending visualization with keyword tooltips."""
-    # Add category column
-    df['Category'] = df['Description'].apply(categorize_transaction)
+def calculate_category_flows(df):
+    """Add a Category column (unless present) and total the outflow of each category."""
+    if 'Category' not in df.columns:
+        df['Category'] = categorize_descriptions(df['Description'])
     
-    # Calculate total outflow by category
-    category_flows = df[df['Amount'] < 0].groupby('Category').agg({
+    category_flows = df[df['Amount'] < 0].groupby('Category', observed=True).agg({
         'Amount': ['sum', 'count']
     }).reset_index()
     
     category_flows.columns = ['Category', 'Total_Amount', 'Transaction_Count']
     category_flows['Total_Amount'] = abs(category_flows['Total_Amount'])
+    return category_flows
+
+def generate_flow_diagram(df, output_format='html'):
+    """Generate a modern HTML/CSS spending visualization with keyword tooltips.
+    
+    The HTML is a section to place inside HTMLTemplate.render, like the
+    money flows card from get_total_flows.
+    """
+    return render_flow_diagram(calculate_category_flows(df), output_format)
+
+def render_flow_diagram(category_flows, output_format='html', rules=None):
+    """Render precomputed category outflows (Category, Total_Amount, Transaction_Count).
+    
+    Tooltips list the keywords of ``rules``, by default the category rules in use.
+    """
     category_flows = category_flows.sort_values('Total_Amount', ascending=False)
     
     if output_format == 'html':
+        from html_template import HTMLTemplate
         template = HTMLTemplate()
         total_amount = category_flows['Total_Amount'].sum()
         max_amount = category_flows['Total_Amount'].max()
         
         # Format data for bar chart
         categories = []
+        tooltips = (rules if rules is not None else get_category_rules()).tooltips
         colors = ['violet', 'blue', 'cyan', 'emerald', 'lime', 'amber', 'red']
         
-        for idx, row in category_flows.iterrows():
+        # Zipped columns rather than iterrows, which boxes every row into a Series
+        for idx, category, amount, count in zip(
+                category_flows.index, category_flows['Category'].tolist(),
+                category_flows['Total_Amount'].tolist(), category_flows['Transaction_Count'].tolist()):
             color = colors[idx % len(colors)]
-            keywords = TRANSACTION_CATEGORIES.get(row['Category'], ['Other'])
             categories.append({
-                'name': row['Category'],
-                'amount': row['Total_Amount'],
-                'count': row['Transaction_Count'],
-                'percentage': (row['Total_Amount'] / max_amount) * 100,
-                'keywords': ', '.join(keywords)
+                'name': category,
+                'amount': amount,
+                'count': count,
+                'percentage': (amount / max_amount) * 100,
+                'keywords': tooltips.get(category, 'Other')
             })
         
         # Generate visualization content
@@ -42,15 +57,14 @@ def generate_flow_diagram(df, output_format='html'):
         total_spent = f'<div class="text-lg text-center text-secondary mb-8">Total Spending: ${total_amount:,.2f}</div>'
         bar_chart = template.create_bar_chart(categories)
         
-        content = f"""
+        # A section for the report's document, not a document of its own
+        return f"""
             {header}
             {total_spent}
             <div class="card">
                 {bar_chart}
             </div>
         """
-        
-        return template.render(content)
     else:
         return category_flows.to_string()
 
@@ -0,0 +1,233 @@
+import csv
+import io
+import json
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from category_rules import RULE_FORMATS
+from rollups import Rollups
+
+# Smoothing weights tried for every series; the pair with the smallest
+# one-step-ahead error on the history is kept, per series
+ALPHAS = np.array([0.1, 0.2, 0.3, 0.5, 0.7, 0.9])
+BETAS = np.array([0.0, 0.05, 0.1, 0.2, 0.3])
+# Trends fade by this factor each month ahead, so one steep stretch isn't projected forever
+DAMPING = 0.9
+FORECAST_COMPANIES = 10
+# forecast_spending's leading columns; the projected months follow them
+SERIES_COLUMNS = ['Kind', 'Name', 'Average', 'Last_Month']
+
+
+def smoothing_forecast(history: np.ndarray, horizon: int) -> np.ndarray:
+    """Project ``horizon`` periods of each column of ``history`` (periods x series).
+
+    Damped Holt (level and trend) exponential smoothing.  Every smoothing
+    pair is run for every series at once: the state is a (pairs x series)
+    array stepped once per period, so the Python loop is as long as the
+    history, however many series there are.
+    """
+    alpha, beta = (grid.reshape(-1, 1) for grid in np.meshgrid(ALPHAS, BETAS, indexing='ij'))
+    level = np.repeat(history[:1], len(alpha), axis=0)
+    trend = np.zeros_like(level)
+    error = np.zeros_like(level)
+    for actual in history[1:]:
+        predicted = level + DAMPING * trend
+        error += np.square(actual - predicted)
+        new_level = alpha * actual + (1 - alpha) * predicted
+        trend = beta * (new_level - level) + (1 - beta) * DAMPING * trend
+        level = new_level
+    best = error.argmin(axis=0)
+    series = np.arange(history.shape[1])
+    steps = np.cumsum(DAMPING ** np.arange(1, horizon + 1))
+    return level[best, series] + steps[:, None] * trend[best, series]
+
+
+def trend_forecast(history: np.ndarray, horizon: int) -> np.ndarray:
+    """Project each column of ``history`` along its least-squares line, all columns in one product."""
+    periods = len(history)
+    centered = np.arange(periods) - (periods - 1) / 2
+    mean = history.mean(axis=0)
+    slope = centered @ (history - mean) / max(centered @ centered, 1)
+    ahead = np.arange(periods, periods + horizon) - (periods - 1) / 2
+    return mean + ahead[:, None] * slope
+
+
+METHODS = {'smoothing': smoothing_forecast, 'trend': trend_forecast}
+
+
+def _full_months(periods: pd.PeriodIndex, start: pd.Timestamp, end: pd.Timestamp) -> slice:
+    """The months of ``periods`` the data covers completely (all of them if fewer than two)."""
+    first = 1 if start.normalize() > periods[0].start_time else 0
+    last = len(periods) - 1 if end.normalize() < periods[-1].end_time.normalize() else len(periods)
+    return slice(first, last) if last - first >= 2 else slice(0, len(periods))
+
+
+def forecast_spending(df: pd.DataFrame, horizon: int = 3, method: str = 'smoothing',
+                      rollups: Optional[Rollups] = None) -> pd.DataFrame:
+    """Project monthly outflows of every category and company ``horizon`` months ahead.
+
+    Outflows are summed per month from the same sparse cells as --rollup
+    (``rollups`` is reused if it is monthly), months the data only partly
+    covers are left out of the fit, and all series are fitted together
+    with ``method`` ('smoothing' or 'trend').  Returns one row per
+    category and company: Kind, Name, the monthly Average and Last_Month
+    fitted on, then one column per projected month, largest first.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown forecast method: {method}")
+    if rollups is None or rollups.period != 'month':
+        rollups = Rollups(df, 'month')
+    tables = {'category': rollups.categories_by_period(), 'company': rollups.companies_by_period(spent=True)}
+    fitted = _full_months(rollups.periods, df['Date'].min(), df['Date'].max())
+    future = pd.period_range(rollups.periods[fitted.stop - 1] + 1, periods=horizon).astype(str)
+
+    history = np.hstack([table.to_numpy()[fitted] for table in tables.values()])
+    projected = np.maximum(METHODS[method](history, horizon), 0.0)
+    result = pd.DataFrame({
+        'Kind': np.repeat(list(tables), [table.shape[1] for table in tables.values()]),
+        'Name': np.concatenate([table.columns.to_numpy(dtype=object) for table in tables.values()]),
+        'Average': history.mean(axis=0),
+        'Last_Month': history[-1],
+    })
+    result[list(future)] = projected.T
+    result = result[(history > 0).any(axis=0)]
+    return result.sort_values(['Kind', future[0]], ascending=[True, False], kind='stable').reset_index(drop=True)
+
+
+def forecast_months(forecast: pd.DataFrame) -> List[str]:
+    """The projected month columns of a forecast_spending table, in order."""
+    return [column for column in forecast.columns if column not in SERIES_COLUMNS]
+
+
+def load_budget(path: str) -> Dict[str, float]:
+    """Read monthly budgets by category (or company) from a JSON, YAML or CSV file.
+
+    JSON and YAML hold ``{name: amount}``; CSV has ``category`` and
+    ``budget`` columns.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in RULE_FORMATS:
+        raise ValueError(f"Budgets must be JSON, YAML or CSV, not {path}")
+    with open(path, encoding='utf-8-sig') as f:
+        text = f.read()
+    file_format = RULE_FORMATS[extension]
+    if file_format == 'csv':
+        rows = [{name.strip().lower(): (value or '').strip() for name, value in row.items() if name}
+                for row in csv.DictReader(io.StringIO(text))]
+        if any(not row.get('category') or not row.get('budget') for row in rows):
+            raise ValueError("Each budget row needs a category and a budget")
+        data = {row['category']: row['budget'] for row in rows}
+    elif file_format == 'yaml':
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("YAML budgets need PyYAML: pip install pyyaml") from None
+        try:
+            data = yaml.safe_load(text)
+        except yaml.YAMLError as error:
+            raise ValueError(f"Invalid YAML: {error}") from None
+    else:
+        data = json.loads(text)
+    if not isinstance(data, dict):
+        raise ValueError("A budget must map each category to a monthly amount")
+    try:
+        return {str(name): float(amount) for name, amount in data.items()}
+    except (TypeError, ValueError):
+        raise ValueError("Budget amounts must be numbers") from None
+
+
+def compare_budget(forecast: pd.DataFrame, budget: Dict[str, float]) -> pd.DataFrame:
+    """Set each budget against the spending it covers: a category, else a company of that name.
+
+    Projected is the first forecast month; Remaining is what the budget
+    leaves after it, negative when the month is projected to go over.
+    """
+    future = forecast_months(forecast)[0]
+    rows = forecast.drop_duplicates('Name').set_index('Name')
+    actual = rows.reindex(list(budget))[['Average', 'Last_Month', future]].fillna(0.0)
+    result = pd.DataFrame({
+        'Name': list(budget),
+        'Budget': list(budget.values()),
+        'Average': actual['Average'].to_numpy(),
+        'Last_Month': actual['Last_Month'].to_numpy(),
+        'Projected': actual[future].to_numpy(),
+    })
+    result['Remaining'] = result['Budget'] - result['Projected']
+    result['Status'] = np.where(result['Remaining'] < 0, 'Over', 'Under')
+    return result
+
+
+def render_forecast(forecast: pd.DataFrame, output_format: str = 'text',
+                    companies: int = FORECAST_COMPANIES):
+    """Render projections for every category and the ``companies`` largest companies."""
+    future = forecast_months(forecast)
+    shown = pd.concat([forecast[forecast['Kind'] == 'category'],
+                       forecast[forecast['Kind'] == 'company'].head(companies)])
+    if output_format == 'json':
+        return {
+            'months': future,
+            'series': [
+                {
+                    'kind': kind,
+                    'name': name,
+                    'average': round(average, 2),
+                    'last_month': round(last, 2),
+                    'forecast': [round(value, 2) for value in values],
+                }
+                for kind, name, average, last, values in zip(
+                    shown['Kind'].tolist(), shown['Name'].tolist(), shown['Average'].tolist(),
+                    shown['Last_Month'].tolist(), shown[future].to_numpy().tolist())
+            ],
+        }
+
+    title = f"Spending Forecast, {future[0]} to {future[-1]}"
+    if output_format == 'html':
+        from html_template import HTMLTemplate
+        template = HTMLTemplate()
+        headers = ['Category / Company', 'Monthly Average', 'Last Month'] + future
+        rows = (
+            [name] + [f'${value:,.2f}' for value in values]
+            for name, values in zip(shown['Name'], shown[['Average', 'Last_Month'] + future].to_numpy())
+        )
+        return template.create_card(
+            f'<div class="overflow-x-auto">{template.create_table(headers, rows)}</div>', title)
+    return f"{title}:\n" + shown.to_string(index=False, float_format=lambda x: '${:,.2f}'.format(x))
+
+
+def render_budget(comparison: pd.DataFrame, output_format: str = 'text'):
+    """Render a compare_budget table as text, an HTML card or a JSON-ready list."""
+    if output_format == 'json':
+        return [
+            {
+                'name': name,
+                'budget': round(budget, 2),
+                'average': round(average, 2),
+                'last_month': round(last, 2),
+                'projected': round(projected, 2),
+                'remaining': round(remaining, 2),
+                'status': status.lower(),
+            }
+            for name, budget, average, last, projected, remaining, status in zip(
+                *(comparison[column].tolist() for column in comparison.columns))
+        ]
+
+    over = int((comparison['Status'] == 'Over').sum())
+    title = f"Budget vs. Actual ({over} of {len(comparison)} projected over)"
+    if output_format == 'html':
+        from html_template import HTMLTemplate
+        template = HTMLTemplate()
+        headers = ['Budget For', 'Budget', 'Monthly Average', 'Last Month', 'Projected', 'Remaining',
+                   'Status']
+        rows = (
+            [name] + [f'${value:,.2f}' for value in values] + [status]
+            for name, values, status in zip(
+                comparison['Name'],
+                comparison[['Budget', 'Average', 'Last_Month', 'Projected', 'Remaining']].to_numpy(),
+                comparison['Status'])
+        )
+        return template.create_card(
+            f'<div class="overflow-x-auto">{template.create_table(headers, rows)}</div>', title)
+    return f"{title}:\n" + comparison.to_string(index=False, float_format=lambda x: '${:,.2f}'.format(x))
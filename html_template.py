@@ -1,20 +1,37 @@
-from typing import List, Dict, Union, Optional
+import os
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Union
+
+# The stylesheet ships next to this module; it is read once per process
+CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'styles.css')
+_css = None
 
 class HTMLTemplate:
     def __init__(self):
         self.css = self._load_css()
     
     def _load_css(self) -> str:
-        """Load CSS file or return empty styles if not found."""
-        try:
-            with open('styles.css', 'r') as f:
-                return f.read()
-        except FileNotFoundError:
-            return "/* CSS not found */"
+        """Load CSS file (once per process) or return empty styles if not found."""
+        global _css
+        if _css is None:
+            try:
+                with open(CSS_PATH, 'r') as f:
+                    _css = f.read()
+            except FileNotFoundError:
+                _css = "/* CSS not found */"
+        return _css
     
     def render(self, content: str, title: str = "Transaction Analysis") -> str:
         """Render the complete HTML document."""
-        return f"""
+        return "".join(self.iter_document([content], title))
+    
+    def iter_document(self, sections: Iterable[Union[str, Iterable[str]]],
+                      title: str = "Transaction Analysis") -> Iterator[str]:
+        """Yield the complete HTML document piece by piece, with the CSS inlined once.
+        
+        Each section is either a string or an iterable of strings, such as
+        iter_table, so large sections are never built as one string.
+        """
+        yield f"""
         <!DOCTYPE html>
         <html>
         <head>
@@ -25,41 +42,71 @@ class HTMLTemplate:
         </head>
         <body>
             <div class="container">
-                {content}
+                """
+        for section in sections:
+            if isinstance(section, str):
+                yield section
+            else:
+                yield from section
+        yield """
             </div>
         </body>
         </html>
         """
     
+    def write_document(self, sink: TextIO, sections: Iterable[Union[str, Iterable[str]]],
+                       title: str = "Transaction Analysis") -> None:
+        """Write the document to a file-like ``sink`` as it is generated."""
+        for piece in self.iter_document(sections, title):
+            sink.write(piece)
+    
     def create_card(self, content: str, title: Optional[str] = None) -> str:
         """Create a card component with optional title."""
+        return "".join(self.iter_card([content], title))
+    
+    def iter_card(self, content: Iterable[str], title: Optional[str] = None) -> Iterator[str]:
+        """Yield a card component around content that is itself yielded in pieces."""
         header = f'<h2 class="text-xl font-semibold mb-4">{title}</h2>' if title else ""
-        return f"""
+        yield f"""
         <div class="card">
             {header}
-            {content}
+            """
+        yield from content
+        yield """
         </div>
         """
     
-    def create_table(self, headers: List[str], rows: List[List[str]]) -> str:
+    def create_table(self, headers: List[str], rows: Iterable[List[str]]) -> str:
         """Create a formatted table."""
+        return "".join(self.iter_table(headers, rows))
+    
+    def iter_table(self, headers: List[str], rows: Iterable[List[str]]) -> Iterator[str]:
+        """Yield a formatted table one row at a time; ``rows`` may be a generator."""
         header_html = "".join([f"<th>{header}</th>" for header in headers])
-        rows_html = ""
-        for row in rows:
-            cells = "".join([f"<td>{cell}</td>" for cell in row])
-            rows_html += f"<tr>{cells}</tr>"
-        
-        return f"""
+        yield f"""
         <table class="table">
             <thead>
                 <tr>{header_html}</tr>
             </thead>
             <tbody>
-                {rows_html}
+                """
+        for row in rows:
+            cells = "".join([f"<td>{cell}</td>" for cell in row])
+            yield f"<tr>{cells}</tr>"
+        yield """
             </tbody>
         </table>
         """
     
+    def create_pager(self, page: int, pages: int, href: Callable[[int], str]) -> str:
+        """Create links to the first, previous, next and last of ``pages``, ``href`` giving each page's URL."""
+        links = []
+        for target, label in ((1, 'First'), (page - 1, 'Previous'), (page + 1, 'Next'), (pages, 'Last')):
+            links.append(f'<a href="{href(target)}">{label}</a>' if 1 <= target <= pages and target != page
+                         else label)
+        links.insert(2, f'<span class="font-semibold">Page {page} of {pages}</span>')
+        return f'<p class="text-center text-sm mb-4">{" &middot; ".join(links)}</p>'
+    
     def create_bar_chart(self, categories: List[Dict[str, Union[str, float, int]]]) -> str:
         """Create a bar chart visualization.
         
@@ -72,22 +119,22 @@ class HTMLTemplate:
                 - keywords: str (optional)
         """
         colors = ['violet', 'blue', 'cyan', 'emerald', 'lime', 'amber', 'red']
-        charts_html = ""
+        charts = []
         
         for idx, cat in enumerate(categories):
             color = colors[idx % len(colors)]
-            charts_html += f"""
+            charts.append(f"""
             <div class="category">
                 <div class="category-header">
                     <span class="category-name">{cat['name']}</span>
                     <span class="category-amount">${cat['amount']:,.2f}</span>
                 </div>
                 <div class="bar-container">
-                    <div class="bar bg-gradient-{color}" style="width: {cat['percentage']}%"></div>
+                    <div class="bar bg-gradient-{color}" style="width: {cat['percentage']:.2f}%"></div>
                 </div>
                 <div class="text-sm text-secondary mb-1">{cat['count']} transactions</div>
                 {f'<div class="tooltip">Keywords: {cat["keywords"]}</div>' if 'keywords' in cat else ''}
             </div>
-            """
+            """)
         
-        return charts_html
\ No newline at end of file
+        return "".join(charts)
\ No newline at end of file
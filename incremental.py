@@ -0,0 +1,99 @@
+import sqlite3
+from typing import Iterable, Iterator, Optional
+
+import pandas as pd
+
+from streaming import DescriptionTotals
+
+
+class AnalysisState:
+    """SQLite file holding running per-description totals between runs.
+
+    Each distinct description keeps its amount, count, deposit and
+    withdrawal totals, so company spending, money flows and category flows
+    can all be rebuilt without re-reading history, even when a new
+    description joins an existing company.  The latest transaction date
+    seen is the watermark: later runs only fold in rows after it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS state (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS description_totals (
+                description TEXT PRIMARY KEY,
+                total_amount REAL NOT NULL,
+                transaction_count INTEGER NOT NULL,
+                deposits REAL NOT NULL,
+                withdrawals REAL NOT NULL,
+                withdrawal_count INTEGER NOT NULL
+            );
+        """)
+
+    def _get(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value: str) -> None:
+        self.conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, value))
+
+    @property
+    def watermark(self) -> Optional[pd.Timestamp]:
+        """Latest transaction date already folded into the state."""
+        value = self._get('end_date')
+        return pd.Timestamp(value) if value is not None else None
+
+    def new_rows(self, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """Drop rows on or before the watermark from each chunk."""
+        watermark = self.watermark
+        for chunk in chunks:
+            yield chunk if watermark is None else chunk[chunk['Date'] > watermark]
+
+    def update(self, new: DescriptionTotals) -> None:
+        """Add the totals of new rows and move the watermark forward."""
+        if not new.rows:
+            return
+        rows = new.totals.reset_index()
+        rows = rows.astype({'Transaction_Count': 'int64', 'Withdrawal_Count': 'int64'})
+        self.conn.executemany(
+            "INSERT INTO description_totals VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (description) DO UPDATE SET "
+            "total_amount = total_amount + excluded.total_amount, "
+            "transaction_count = transaction_count + excluded.transaction_count, "
+            "deposits = deposits + excluded.deposits, "
+            "withdrawals = withdrawals + excluded.withdrawals, "
+            "withdrawal_count = withdrawal_count + excluded.withdrawal_count",
+            rows.itertuples(index=False, name=None),
+        )
+
+        start = self._get('start_date')
+        start_date = new.start_date if start is None else min(pd.Timestamp(start), new.start_date)
+        end = self.watermark
+        end_date = new.end_date if end is None else max(end, new.end_date)
+        self._set('start_date', start_date.isoformat())
+        self._set('end_date', end_date.isoformat())
+        self._set('rows', str(int(self._get('rows') or 0) + new.rows))
+        self.conn.commit()
+
+    def load(self) -> DescriptionTotals:
+        """Return everything folded in so far, in order of first appearance."""
+        totals = DescriptionTotals()
+        frame = pd.read_sql_query(
+            "SELECT * FROM description_totals ORDER BY rowid", self.conn, index_col='description')
+        if frame.empty:
+            return totals
+        frame.columns = DescriptionTotals.COLUMNS
+        frame.index.name = 'Description'
+        totals.totals = frame
+        totals.start_date = pd.Timestamp(self._get('start_date'))
+        totals.end_date = self.watermark
+        totals.rows = int(self._get('rows'))
+        return totals
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
@@ -0,0 +1,112 @@
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+NO_MATCH = -1
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton answering "which rule has a keyword in this text?".
+
+    Rules are ``(label, keywords)`` pairs in priority order.  A single pass
+    over the text finds every keyword occurrence at once, so the cost per
+    text no longer grows with the number of keywords; the result is the
+    highest-priority rule with any keyword in the text, exactly like testing
+    each rule's keywords in order with ``in``.
+    """
+
+    def __init__(self, rules: Iterable[Tuple[str, Iterable[str]]]):
+        self.labels: List[str] = []
+        # Per state: outgoing transitions, failure link and the best (lowest)
+        # rule index among the keywords ending here or on its failure chain.
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._best: List[int] = [NO_MATCH]
+
+        for rule, (label, keywords) in enumerate(rules):
+            self.labels.append(label)
+            for keyword in keywords:
+                self._add(keyword, rule)
+        self._link()
+
+    def _add(self, keyword: str, rule: int) -> None:
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._best.append(NO_MATCH)
+            state = next_state
+        if self._best[state] == NO_MATCH or rule < self._best[state]:
+            self._best[state] = rule
+
+    def _link(self) -> None:
+        """Compute failure links breadth-first and fold outputs down them."""
+        goto, fail, best = self._goto, self._fail, self._best
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            fallback = best[fail[state]]
+            if fallback != NO_MATCH and (best[state] == NO_MATCH or fallback < best[state]):
+                best[state] = fallback
+            for char, child in goto[state].items():
+                link = fail[state]
+                while link and char not in goto[link]:
+                    link = fail[link]
+                fail[child] = goto[link].get(char, 0)
+                queue.append(child)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The compiled tables as plain lists and dicts, ready for JSON."""
+        return {'labels': self.labels, 'goto': self._goto, 'fail': self._fail, 'best': self._best}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'KeywordAutomaton':
+        """Rebuild an automaton from ``to_dict`` output without recompiling it.
+
+        Raises ValueError if the tables are malformed.
+        """
+        goto, fail, best = data['goto'], data['fail'], data['best']
+        states = len(goto)
+        if not states or len(fail) != states or len(best) != states:
+            raise ValueError("Automaton tables differ in length")
+        automaton = cls.__new__(cls)
+        automaton.labels = [str(label) for label in data['labels']]
+        automaton._goto = [{str(char): int(state) for char, state in transitions.items()}
+                           for transitions in goto]
+        automaton._fail = [int(state) for state in fail]
+        automaton._best = [int(rule) for rule in best]
+        targets = automaton._fail + [state for transitions in automaton._goto for state in transitions.values()]
+        if any(not 0 <= state < states for state in targets) or any(
+                not NO_MATCH <= rule < len(automaton.labels) for rule in automaton._best):
+            raise ValueError("Automaton tables point outside themselves")
+        return automaton
+
+    def __len__(self) -> int:
+        """Number of states in the automaton."""
+        return len(self._goto)
+
+    def match(self, text: str) -> int:
+        """Return the index of the highest-priority rule found in ``text``, or -1."""
+        goto, fail, best = self._goto, self._fail, self._best
+        found = best[0]
+        if found == 0:
+            return found
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            rule = best[state]
+            if rule != NO_MATCH and (found == NO_MATCH or rule < found):
+                if rule == 0:
+                    return rule
+                found = rule
+        return found
+
+    def label(self, text: str, default: Optional[str] = None) -> Optional[str]:
+        """Return the label of the highest-priority rule found in ``text``."""
+        rule = self.match(text)
+        return self.labels[rule] if rule != NO_MATCH else default
@@ -0,0 +1,260 @@
+import hashlib
+import inspect
+import sqlite3
+from typing import Dict, Iterable, List, Tuple
+
+import batch_scoring
+import normalize_company
+import similarity_index
+from normalize_company import (initial_clean, match_base_mapping, resolve_companies,
+                               should_exact_match)
+from profiling import stage
+from similarity_index import SimilarityIndex, group_similar_names
+
+DEFAULT_MAX_ENTRIES = 1_000_000
+
+
+def normalizer_version(threshold: int = 85) -> str:
+    """Fingerprint the normalization rules so cached results expire with them.
+
+    Any edit to normalize_company.py (mappings, cleaning patterns, fuzzy
+    thresholds), to the matching code it relies on (similarity_index.py,
+    batch_scoring.py) or to the grouping threshold produces a new version.
+    """
+    digest = hashlib.sha256()
+    for module in (normalize_company, similarity_index, batch_scoring):
+        digest.update(inspect.getsource(module).encode('utf-8'))
+    digest.update(f'threshold={threshold}'.encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+class NormalizationCache:
+    """SQLite cache of raw description -> (cleaned, normalized, company).
+
+    Entries are tagged with the normalizer version and dropped wholesale when
+    it changes.  Every lookup or store marks the entry as used by the current
+    run; when the cache is written to or closed while holding more than
+    ``max_entries`` rows, the least recently used ones are evicted.
+    """
+
+    def __init__(self, path: str, threshold: int = 85, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.version = normalizer_version(threshold)
+        # Callers sharing one cache across threads serialize their use of it
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS descriptions (
+                raw TEXT PRIMARY KEY,
+                cleaned TEXT NOT NULL,
+                normalized TEXT NOT NULL,
+                company TEXT NOT NULL,
+                last_used INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS descriptions_last_used ON descriptions (last_used);
+        """)
+
+        if self._get_meta('version') != self.version:
+            self.conn.execute("DELETE FROM descriptions")
+            self._set_meta('version', self.version)
+        # Runs are numbered rather than timestamped so LRU order is exact
+        self.run = int(self._get_meta('run') or 0) + 1
+        self._set_meta('run', str(self.run))
+        self.conn.commit()
+
+    def _get_meta(self, key: str):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM descriptions").fetchone()[0]
+
+    def lookup(self, descriptions: Iterable[str]) -> Dict[str, Tuple[str, str, str]]:
+        """Return cached ``(cleaned, normalized, company)`` for known descriptions."""
+        descriptions = list(descriptions)
+        found = {}
+        # Stay under SQLite's limit on bound parameters
+        for start in range(0, len(descriptions), 900):
+            chunk = descriptions[start:start + 900]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT raw, cleaned, normalized, company FROM descriptions WHERE raw IN ({placeholders})",
+                chunk,
+            )
+            for raw, cleaned, normalized, company in rows:
+                found[raw] = (cleaned, normalized, company)
+
+        self.conn.executemany("UPDATE descriptions SET last_used = ? WHERE raw = ?",
+                              ((self.run, raw) for raw in found))
+        self.conn.commit()
+        return found
+
+    def known_names(self) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """Return the cached cleaned -> normalized and normalized -> company mappings."""
+        cleaned_to_normalized = {}
+        normalized_to_company = {}
+        for cleaned, normalized, company in self.conn.execute(
+                "SELECT cleaned, normalized, company FROM descriptions"):
+            cleaned_to_normalized[cleaned] = normalized
+            normalized_to_company[normalized] = company
+        return cleaned_to_normalized, normalized_to_company
+
+    def store(self, entries: Dict[str, Tuple[str, str, str]]) -> None:
+        """Save ``raw -> (cleaned, normalized, company)`` and evict if over the cap."""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO descriptions (raw, cleaned, normalized, company, last_used) "
+            "VALUES (?, ?, ?, ?, ?)",
+            ((raw, cleaned, normalized, company, self.run)
+             for raw, (cleaned, normalized, company) in entries.items()),
+        )
+        self.evict()
+        self.conn.commit()
+
+    def evict(self) -> int:
+        """Drop the least recently used entries beyond ``max_entries``."""
+        excess = len(self) - self.max_entries
+        if excess <= 0:
+            return 0
+        self.conn.execute(
+            "DELETE FROM descriptions WHERE raw IN "
+            "(SELECT raw FROM descriptions ORDER BY last_used ASC LIMIT ?)",
+            (excess,),
+        )
+        return excess
+
+    def close(self) -> None:
+        self.evict()
+        self.conn.commit()
+        self.conn.close()
+
+
+def _attach_to_known(names: List[str], known: List[str], threshold: int) -> Dict[str, str]:
+    """Match each name to its best known name scoring above ``threshold``."""
+    attached = {}
+    if not names or not known:
+        return attached
+    index = SimilarityIndex(known, min_ratio=threshold + 1)
+    for name in names:
+        best = index.best_match(name)
+        if best is not None:
+            attached[name] = best
+    return attached
+
+
+def _group_new_names(names: List[str], threshold: int, workers: int) -> Dict[str, str]:
+    """Group names among themselves, mapping each to its group's first name."""
+    groups = group_similar_names(names, threshold=threshold, exact_match=should_exact_match,
+                                 workers=workers)
+    companies = {}
+    for main_name, variations in groups.items():
+        for variation in variations:
+            companies[variation] = variation if should_exact_match(variation) else main_name
+    return companies
+
+
+def _normalize_new(misses: List[str], known_cleaned: Dict[str, str], threshold: int,
+                   workers: int) -> Dict[str, str]:
+    """Map new raw descriptions to normalized names, reusing cached ones."""
+    cleaned = {raw: initial_clean(raw) for raw in misses}
+    normalized = {}
+    pending = []
+    for name in dict.fromkeys(cleaned.values()):
+        if name in known_cleaned:
+            normalized[name] = known_cleaned[name]
+        elif not name or should_exact_match(name):
+            normalized[name] = name
+        else:
+            value = match_base_mapping(name)
+            if value is not None:
+                normalized[name] = value
+            else:
+                pending.append(name)
+
+    candidates = [name for name in known_cleaned if name and not should_exact_match(name)]
+    attached = _attach_to_known(pending, candidates, threshold)
+    for name, match in attached.items():
+        normalized[name] = known_cleaned[match]
+
+    rest = [name for name in pending if name not in attached]
+    groups = group_similar_names(rest, threshold=threshold, workers=workers)
+    for group in groups.values():
+        canonical = min(group, key=len)
+        for variant in group:
+            normalized[variant] = canonical
+
+    return {raw: normalized[cleaned[raw]] for raw in misses}
+
+
+def _companies_for_new(names: List[str], known_companies: Dict[str, str], threshold: int,
+                       workers: int) -> Dict[str, str]:
+    """Map new normalized names to companies, reusing cached ones."""
+    companies = {}
+    pending = []
+    for name in names:
+        if name in known_companies:
+            companies[name] = known_companies[name]
+        elif should_exact_match(name):
+            companies[name] = name
+        else:
+            pending.append(name)
+
+    candidates = [name for name in known_companies if not should_exact_match(name)]
+    attached = _attach_to_known(pending, candidates, threshold)
+    for name, match in attached.items():
+        companies[name] = known_companies[match]
+
+    companies.update(_group_new_names([name for name in pending if name not in attached],
+                                      threshold, workers))
+    return companies
+
+
+def normalize_with_cache(descriptions: Iterable[str], cache: NormalizationCache,
+                         workers: int = 1, verbose: bool = True) -> Dict[str, Tuple[str, str]]:
+    """Resolve raw descriptions to ``(normalized, company)`` using the cache.
+
+    Cached descriptions are returned as-is.  With an empty cache the full
+    pipeline runs, so the first run matches an uncached one.  Otherwise new
+    descriptions only go through the fuzzy stages against what is new: a
+    cleaned name seen before reuses its normalized form, else it joins the
+    closest cached name above the threshold, and whatever is left is
+    grouped among itself.  The same happens from normalized name to
+    company, so previously assigned companies stay stable between runs.
+    """
+    descriptions = list(dict.fromkeys(descriptions))
+    threshold = cache.threshold
+    with stage('cache_lookup', rows=len(descriptions)) as record:
+        hits = cache.lookup(descriptions)
+        record['unique'] = len(hits)
+    misses = [desc for desc in descriptions if desc not in hits]
+    if verbose:
+        print(f"Normalization cache: {len(hits):,} of {len(descriptions):,} descriptions cached")
+
+    resolved = {raw: (normalized, company) for raw, (_, normalized, company) in hits.items()}
+    if not misses:
+        return resolved
+
+    known_cleaned, known_companies = cache.known_names()
+    if known_cleaned:
+        normalized = _normalize_new(misses, known_cleaned, threshold, workers)
+        companies = _companies_for_new(list(dict.fromkeys(normalized.values())),
+                                       known_companies, threshold, workers)
+    else:
+        full = resolve_companies(misses, workers=workers, threshold=threshold, verbose=verbose)
+        normalized = {raw: name for raw, (name, _) in full.items()}
+        companies = {name: company for name, company in full.values()}
+
+    entries = {}
+    for raw in misses:
+        name = normalized[raw]
+        entries[raw] = (initial_clean(raw), name, companies[name])
+        resolved[raw] = (name, companies[name])
+    cache.store(entries)
+    return resolved
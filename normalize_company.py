@@ -1,6 +1,10 @@
 import re
-from thefuzz import fuzz
-from typing import Dict, List, Set
+import numpy as np
+import pandas as pd
+from typing import Collection, Dict, List, Optional, Sequence, Tuple, Union
+from batch_scoring import best_match_index
+from similarity_index import SimilarityIndex, build_match_lookup, group_similar_names
+from profiling import stage
 
 def load_company_mappings() -> Dict[str, str]:
     """Define common company name variations and their normalized forms."""
@@ -25,137 +29,169 @@ def load_company_mappings() -> Dict[str, str]:
         "GOOGLE *": "GOOGLE",
     }
 
+EXACT_MATCH_KEYWORDS = ['ZELLE', 'INTERNET TRANSFER', 'TRANSFER TO']
+_EXACT_MATCH_PATTERN = re.compile('|'.join(re.escape(keyword) for keyword in EXACT_MATCH_KEYWORDS))
+
+# Patterns removed by initial_clean, in order. Each one is paired with a
+# substring it can't match without (None if there isn't one) and whether it
+# needs a digit, so most names skip most patterns without running the regex.
+# Removing text never adds characters, so a string without digits stays
+# without them; substrings are re-checked against the current result because
+# a removal can join two pieces into a new one.
+PATTERNS_TO_REMOVE = [
+    (r'\s+\d{6,}', None, True),
+    (r'#\d+', '#', True),
+    (r'F\d{4,}', 'F', True),
+    (r'\*[A-Z0-9]+', '*', False),
+    (r'\s+PMT\s*$', 'PMT', False),
+    (r'\s+RETRY\s+PYMT\s*$', 'PYMT', False),
+    (r'ACH\s+PMT\s*$', 'PMT', False),
+    (r'AUTO\s+PYMT\s*$', 'PYMT', False),
+    (r'\s+MOBILE\s+PMT\s*$', 'PMT', False),
+    (r'\s+ONLINE\s+PMT\s*$', 'PMT', False),
+    (r'\b\d{3}-\d{3}-\d{4}\b', '-', True),
+    (r'\b\d{1,3}\s*[A-Z\s]+ST[A-Z\s]*\b', 'ST', True),
+    (r'\s+\d{1,5}\s+[A-Z\s]+(?:STREET|ST|AVENUE|AVE|ROAD|RD|DRIVE|DR|LANE|LN|BLVD|PARKWAY|PKY|HWY)\b', None, True),
+    (r'(?<=\s)\d{5}(?:-\d{4})?(?=\s|$)', None, True),
+    (r'WWW\.[A-Z0-9.-]+\.[A-Z]{2,}', 'WWW.', False),
+    (r'\.COM/?[A-Z]*\s*$', '.COM', False),
+    (r',\s*[A-Z]{2},\s*US[A]?$', ',', False),
+    (r',\s*[A-Z]{2}\s*$', ',', False),
+]
+_COMPILED_PATTERNS = [(re.compile(pattern), required, digits)
+                      for pattern, required, digits in PATTERNS_TO_REMOVE]
+_DIGIT = re.compile(r'\d')
+
 def should_exact_match(description: str) -> bool:
     """Check if this description should only be matched exactly."""
-    keywords = ['ZELLE', 'INTERNET TRANSFER', 'TRANSFER TO']
-    return any(keyword in description.upper() for keyword in keywords)
+    return _EXACT_MATCH_PATTERN.search(description.upper()) is not None
 
 def initial_clean(name: str) -> str:
     """Initial cleaning of company names."""
     if not name:
         return ""
     
-    # If it's a transfer-type transaction, return it as-is
-    if should_exact_match(name):
-        return name.upper().strip()
-    
     result = name.upper().strip()
     
-    # Remove common patterns
-    patterns_to_remove = [
-        r'\s+\d{6,}',
-        r'#\d+',
-        r'F\d{4,}',
-        r'\*[A-Z0-9]+',
-        r'\s+PMT\s*$',
-        r'\s+RETRY\s+PYMT\s*$',
-        r'ACH\s+PMT\s*$',
-        r'AUTO\s+PYMT\s*$',
-        r'\s+MOBILE\s+PMT\s*$',
-        r'\s+ONLINE\s+PMT\s*$',
-        r'\b\d{3}-\d{3}-\d{4}\b',
-        r'\b\d{1,3}\s*[A-Z\s]+ST[A-Z\s]*\b',
-        r'\s+\d{1,5}\s+[A-Z\s]+(?:STREET|ST|AVENUE|AVE|ROAD|RD|DRIVE|DR|LANE|LN|BLVD|PARKWAY|PKY|HWY)\b',
-        r'(?<=\s)\d{5}(?:-\d{4})?(?=\s|$)',
-        r'WWW\.[A-Z0-9.-]+\.[A-Z]{2,}',
-        r'\.COM/?[A-Z]*\s*$',
-        r',\s*[A-Z]{2},\s*US[A]?$',
-        r',\s*[A-Z]{2}\s*$',
-    ]
+    # If it's a transfer-type transaction, return it as-is
+    if _EXACT_MATCH_PATTERN.search(result):
+        return result
     
-    for pattern in patterns_to_remove:
-        result = re.sub(pattern, '', result)
+    # Remove common patterns, skipping the ones that can't match
+    has_digit = _DIGIT.search(result) is not None
+    for pattern, required, digits in _COMPILED_PATTERNS:
+        if digits and not has_digit:
+            continue
+        if required is not None and required not in result:
+            continue
+        result = pattern.sub('', result)
     
     result = ' '.join(result.split())
     return result.strip('* ')
 
-def find_best_match(name: str, known_companies: Set[str], threshold: int = 85) -> str:
-    """Find the best matching company name using fuzzy matching."""
-    best_ratio = 0
-    best_match = name
-    
-    for known in known_companies:
-        ratio = fuzz.ratio(name, known)
-        if ratio > best_ratio and ratio >= threshold:
-            best_ratio = ratio
-            best_match = known
+def clean_descriptions(descriptions) -> pd.Series:
+    """Apply initial_clean to a whole column, cleaning each distinct value once."""
+    descriptions = pd.Series(descriptions)
+    codes, uniques = pd.factorize(descriptions, use_na_sentinel=False)
+    cleaned = np.array([initial_clean(name) for name in uniques], dtype=object)
+    return pd.Series(cleaned[codes], index=descriptions.index, name=descriptions.name)
+
+def match_base_mapping(name: str, base_mappings: Optional[Dict[str, str]] = None) -> Optional[str]:
+    """Return the predefined normalized form for a cleaned name, if it has one."""
+    if base_mappings is None:
+        base_mappings = load_company_mappings()
+    for key, value in base_mappings.items():
+        if name.startswith(key):
+            return value
+    return None
+
+def find_best_match(name: str, known_companies: Union[Collection[str], SimilarityIndex],
+                    threshold: int = 85) -> str:
+    """Find the best matching company name using fuzzy matching.
     
-    return best_match
+    ``known_companies`` can be a SimilarityIndex built once over the names
+    (see canonical_index), which answers without scanning all of them; its
+    own ``min_ratio`` is the threshold then.  A list or tuple is scored as
+    is; any other collection (a set) is copied into a list on every call,
+    so build an index when matching many names.
+    """
+    if isinstance(known_companies, SimilarityIndex):
+        best = known_companies.best_match(name)
+        return name if best is None else best
+    if not isinstance(known_companies, Sequence):
+        known_companies = list(known_companies)
+    best = best_match_index(name, known_companies, threshold)
+    return known_companies[best] if best >= 0 else name
 
-def build_company_groups(descriptions: List[str]) -> Dict[str, str]:
-    """Build groups of similar company names."""
-    cleaned_names = [initial_clean(desc) for desc in descriptions]
-    unique_companies = set(cleaned_names)
+def canonical_index(company_groups: Dict[str, str], threshold: int = 85) -> SimilarityIndex:
+    """Index the canonical names of ``company_groups`` for find_best_match lookups."""
+    return SimilarityIndex(set(company_groups.values()), min_ratio=threshold)
+
+def build_company_groups(descriptions: List[str], workers: int = 1) -> Dict[str, str]:
+    """Build groups of similar company names, scoring on ``workers`` processes."""
+    cleaned_names = clean_descriptions(descriptions).tolist()
+    return group_cleaned_names(list(set(cleaned_names)), workers)
+
+def group_cleaned_names(unique_companies: List[str], workers: int = 1) -> Dict[str, str]:
+    """Map distinct cleaned names to the canonical name of their fuzzy group."""
     mapping = {}
     processed = set()
     
-    base_mappings = {
-        "WM SUPERCENTER": "WALMART",
-        "WALMART.COM": "WALMART",
-        "WAL-MART": "WALMART",
-        "WALMART WALMART": "WALMART",
-        "WALMART 800": "WALMART",
-        "SAMSCLUB": "SAMS CLUB",
-        "HEB ONLINE": "HEB",
-        "DD DOORDASH": "DOORDASH",
-        "DOORDASH*": "DOORDASH",
-        "IC* INSTACART": "INSTACART",
-        "ATT*": "AT&T",
-        "AMEX": "AMERICAN EXPRESS",
-        "PP*": "PAYPAL",
-        "SQ *": "SQUARE",
-        "GRUBHUB*": "GRUBHUB",
-        "UBER   *": "UBER",
-        "APPLE.COM": "APPLE",
-        "GOOGLE *": "GOOGLE",
-    }
+    base_mappings = load_company_mappings()
     
-    for name in unique_companies:
-        if name in processed:
-            continue
+    # Only names that can still join a fuzzy group are indexed
+    index = build_match_lookup(
+        (name for name in unique_companies if name and not should_exact_match(name)),
+        min_ratio=86,
+        workers=workers,
+    )
+    
+    try:
+        for name in unique_companies:
+            if name in processed:
+                continue
             
-        if not name:
-            continue
+            if not name:
+                continue
             
-        # Transfer transactions get exact matching
-        if should_exact_match(name):
-            mapping[name] = name
-            processed.add(name)
-            continue
+            # Transfer transactions get exact matching
+            if should_exact_match(name):
+                mapping[name] = name
+                processed.add(name)
+                continue
         
-        # Check predefined mappings
-        found = False
-        for key, value in base_mappings.items():
-            if name.startswith(key):
+            # Check predefined mappings
+            value = match_base_mapping(name, base_mappings)
+            if value is not None:
                 mapping[name] = value
                 processed.add(name)
-                found = True
-                break
-        
-        if found:
-            continue
+                index.remove(name)
+                continue
             
-        # Find similar names using fuzzy matching
-        similar_group = []
-        for other in unique_companies:
-            if other not in processed and not should_exact_match(other) and fuzz.ratio(name, other) > 85:
-                similar_group.append(other)
+            # Find similar names using fuzzy matching (ratio > 85)
+            similar_group = [other for other, _ in index.matches(name)]
+            for other in similar_group:
                 processed.add(other)
+                index.remove(other)
         
-        if similar_group:
-            canonical = min(similar_group, key=len)
-            for variant in similar_group:
-                mapping[variant] = canonical
+            if similar_group:
+                canonical = min(similar_group, key=len)
+                for variant in similar_group:
+                    mapping[variant] = canonical
+    finally:
+        index.close()
     
     return mapping
 
-def normalize_company_with_fuzzy(name: str, company_groups: Dict[str, str]) -> str:
+def normalize_company_with_fuzzy(name: str, company_groups: Dict[str, str],
+                                 index: Optional[SimilarityIndex] = None) -> str:
     """
     Normalize company name using fuzzy matching and predefined groups.
     
     Args:
         name: Raw company name
         company_groups: Mapping of company name variants to canonical forms
+        index: canonical_index(company_groups), to reuse across calls (optional)
     
     Returns:
         Normalized company name
@@ -167,14 +203,72 @@ def normalize_company_with_fuzzy(name: str, company_groups: Dict[str, str]) -> s
         return company_groups[cleaned]
     
     # If no exact match, try to find the best match
-    return find_best_match(cleaned, set(company_groups.values()))
+    if index is None:
+        index = canonical_index(company_groups)
+    return find_best_match(cleaned, index)
+
+def group_similar_companies(companies: List[str], workers: int = 1,
+                            threshold: int = 85, verbose: bool = True) -> Dict[str, List[str]]:
+    """Group similar normalized names, preserving exact matches for transfers."""
+    return group_similar_names(companies, threshold=threshold, exact_match=should_exact_match,
+                               desc="Grouping similar companies" if verbose else None, workers=workers)
+
+def resolve_companies(descriptions: List[str], workers: int = 1,
+                      threshold: int = 85, verbose: bool = True) -> Dict[str, Tuple[str, str]]:
+    """Map each distinct raw description to its (normalized name, company).
+    
+    Same result as build_company_groups followed by normalize_company_with_fuzzy
+    on every description and group_similar_companies on the normalized names,
+    but each description is cleaned once, each distinct cleaned name is
+    resolved once against a canonical set built once, and the second grouping
+    only sees the canonical names.  ``verbose=False`` drops the progress
+    output, for callers embedding the analysis.
+    """
+    descriptions = list(dict.fromkeys(descriptions))
+    with stage('initial_clean', rows=len(descriptions)) as record:
+        cleaned = clean_descriptions(descriptions).tolist()
+        unique_names = list(set(cleaned))
+        record['unique'] = len(unique_names)
+    with stage('build_company_groups', rows=len(unique_names)):
+        company_groups = group_cleaned_names(unique_names, workers)
+    
+    # Only names left out of every group (empty ones) fall back to fuzzy matching
+    canonical = None
+    normalized_names = {}
+    for name in dict.fromkeys(cleaned):
+        if name in company_groups:
+            normalized_names[name] = company_groups[name]
+        else:
+            if canonical is None:
+                canonical = canonical_index(company_groups)
+            normalized_names[name] = find_best_match(name, canonical)
+    normalized = [normalized_names[name] for name in cleaned]
+    
+    # Canonical names of different groups can still be close enough to merge
+    canonical_names = list(dict.fromkeys(normalized))
+    with stage('group_similar_companies', rows=len(canonical_names)) as record:
+        groups = group_similar_companies(canonical_names, workers, threshold, verbose)
+        record['unique'] = len(groups)
+    
+    if verbose:
+        print("Creating company mappings...")
+    company_mapping = {}
+    for main_name, variations in groups.items():
+        for variation in variations:
+            if should_exact_match(variation):
+                company_mapping[variation] = variation
+            else:
+                company_mapping[variation] = main_name
+    
+    return {desc: (name, company_mapping[name]) for desc, name in zip(descriptions, normalized)}
 
 def create_normalizer(transactions: List[str]):
     """Create a normalizer function pre-loaded with transaction data."""
     company_groups = build_company_groups(transactions)
+    index = canonical_index(company_groups)
     
     def normalizer(name: str) -> str:
-        return normalize_company_with_fuzzy(name, company_groups)
+        return normalize_company_with_fuzzy(name, company_groups, index)
     
     return normalizer
 
@@ -0,0 +1,135 @@
+import cProfile
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# The profiler for the current run, if --profile was given.  Stages deep in
+# the pipeline report to it through stage() without it being passed around.
+_active = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far, in MiB."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def cpu_seconds() -> float:
+    """CPU time of this process plus worker processes that have finished."""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+class StageProfiler:
+    """Wall time, CPU time, peak RSS and row counts for each pipeline stage.
+
+    Stages can nest; each record keeps its depth so the summary can show
+    the hierarchy.  With ``cprofile_path`` every top-level stage also runs
+    under cProfile, and the stats of the slowest one are dumped there.
+    """
+
+    def __init__(self, cprofile_path: Optional[str] = None):
+        self.cprofile_path = cprofile_path
+        self.stages: List[Dict] = []
+        self._profiles: Dict[int, cProfile.Profile] = {}
+        self._depth = 0
+        self._wall = time.perf_counter()
+        self._cpu = cpu_seconds()
+
+    @contextmanager
+    def stage(self, name: str, rows: Optional[int] = None, unique: Optional[int] = None):
+        """Time the enclosed block; counts can also be filled in on the yielded record."""
+        record = {'stage': name, 'depth': self._depth, 'rows': rows, 'unique': unique}
+        position = len(self.stages)
+        self.stages.append(record)
+
+        profile = cProfile.Profile() if self.cprofile_path and self._depth == 0 else None
+        rss_before = peak_rss_mb()
+        self._depth += 1
+        wall, cpu = time.perf_counter(), cpu_seconds()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield record
+        finally:
+            if profile is not None:
+                profile.disable()
+                self._profiles[position] = profile
+            record['wall_s'] = round(time.perf_counter() - wall, 4)
+            record['cpu_s'] = round(cpu_seconds() - cpu, 4)
+            peak = peak_rss_mb()
+            if peak is not None:
+                record['peak_rss_mb'] = round(peak, 1)
+                record['rss_growth_mb'] = round(peak - rss_before, 1)
+            self._depth -= 1
+
+    def hottest(self) -> Optional[Dict]:
+        """The top-level stage with the most wall time."""
+        top = [record for record in self.stages if record['depth'] == 0 and 'wall_s' in record]
+        return max(top, key=lambda record: record['wall_s'], default=None)
+
+    def report(self) -> Dict:
+        hottest = self.hottest()
+        return {
+            'command': sys.argv,
+            'python': sys.version.split()[0],
+            'total_wall_s': round(time.perf_counter() - self._wall, 4),
+            'total_cpu_s': round(cpu_seconds() - self._cpu, 4),
+            'peak_rss_mb': None if peak_rss_mb() is None else round(peak_rss_mb(), 1),
+            'hottest_stage': hottest['stage'] if hottest else None,
+            'stages': self.stages,
+        }
+
+    def write(self, path: str) -> None:
+        """Write the JSON report, plus the cProfile dump of the hottest stage if asked for."""
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+        hottest = self.hottest()
+        if self.cprofile_path and hottest is not None:
+            self._profiles[self.stages.index(hottest)].dump_stats(self.cprofile_path)
+
+    def summary(self) -> str:
+        """Format the stages as a table, children indented under their parent."""
+        lines = [f"{'Stage':<32} {'Wall (s)':>9} {'CPU (s)':>9} {'Peak RSS (MiB)':>15} {'Rows':>11} {'Unique':>9}"]
+        for record in self.stages:
+            name = '  ' * record['depth'] + record['stage']
+            peak = record.get('peak_rss_mb')
+            peak = '-' if peak is None else f'{peak:,.1f}'
+            rows = '-' if record['rows'] is None else f"{record['rows']:,}"
+            unique = '-' if record['unique'] is None else f"{record['unique']:,}"
+            lines.append(f"{name:<32} {record.get('wall_s', 0):>9.3f} {record.get('cpu_s', 0):>9.3f} "
+                         f"{peak:>15} {rows:>11} {unique:>9}")
+        report = self.report()
+        lines.append(f"{'Total':<32} {report['total_wall_s']:>9.3f} {report['total_cpu_s']:>9.3f}")
+        return '\n'.join(lines)
+
+
+def start_profiling(cprofile_path: Optional[str] = None) -> StageProfiler:
+    """Make a new profiler the active one for stage()."""
+    global _active
+    _active = StageProfiler(cprofile_path)
+    return _active
+
+
+def stop_profiling() -> Optional[StageProfiler]:
+    global _active
+    profiler, _active = _active, None
+    return profiler
+
+
+def stage(name: str, rows: Optional[int] = None, unique: Optional[int] = None):
+    """Record a stage on the active profiler; does nothing when not profiling."""
+    if _active is None:
+        return nullcontext({})
+    return _active.stage(name, rows, unique)
@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+
+from columnar import as_categorical
+
+# Cadence name -> (shortest and longest interval in days, fewest charges, charges per year)
+CADENCES = {
+    'weekly': (6, 8, 4, 52),
+    'biweekly': (13, 15, 3, 26),
+    'monthly': (26, 35, 3, 12),
+    'quarterly': (84, 98, 3, 4),
+    'annual': (350, 380, 2, 1),
+}
+COLUMNS = ['Company', 'Category', 'Cadence', 'Typical_Amount', 'Charges', 'First_Charge',
+           'Last_Charge', 'Next_Expected', 'Annual_Cost', 'Active']
+
+
+def _recurring_series(company: np.ndarray, amounts: np.ndarray, days: np.ndarray, end: int,
+                      amount_tolerance: float, regularity: float, fewest: int = 0) -> pd.DataFrame:
+    """One pass of find_recurring: series of amounts within ``amount_tolerance`` of each other.
+
+    ``end`` is the last day of the whole dataset, which decides whether a series is still active.
+    """
+    # Series: runs of similar amounts within one company.  Sorting on one
+    # packed integer key is several times faster than np.lexsort.
+    cents = np.rint(amounts * 100).astype(np.int64)
+    order = np.argsort((company.astype(np.int64) << 40) | cents)
+    sorted_company, sorted_amounts = company[order], amounts[order]
+    breaks = np.ones(len(order), dtype=bool)
+    breaks[1:] = ((sorted_company[1:] != sorted_company[:-1])
+                  | (sorted_amounts[1:] > sorted_amounts[:-1] * (1 + amount_tolerance) + 0.005))
+    series = np.empty(len(order), dtype=np.int64)
+    series[order] = np.cumsum(breaks) - 1
+    count = np.bincount(series)
+
+    # Intervals between consecutive charges of the same series
+    order = np.argsort((series << 32) | (days - days.min()))
+    series, days, amounts, company = series[order], days[order], amounts[order], company[order]
+    same = series[1:] == series[:-1]
+    interval_series = series[1:][same]
+    intervals = np.diff(days)[same]
+    median_interval = pd.Series(intervals).groupby(interval_series).median().reindex(
+        np.arange(len(count))).to_numpy()
+
+    names = list(CADENCES)
+    low, high, min_charges, per_year = (np.array(values) for values in zip(*CADENCES.values()))
+    fits = (median_interval[:, None] >= low) & (median_interval[:, None] <= high)
+    cadence = np.where(fits.any(axis=1), fits.argmax(axis=1), -1)
+    cadence_low = np.where(cadence >= 0, low[cadence], 0)
+    cadence_high = np.where(cadence >= 0, high[cadence], -1)
+    in_window = ((intervals >= cadence_low[interval_series])
+                 & (intervals <= cadence_high[interval_series]))
+    regular = np.bincount(interval_series, weights=in_window, minlength=len(count))
+    fewest = np.maximum(np.where(cadence >= 0, min_charges[cadence], 0), fewest)
+    # Two equal charges a year apart are only telling if the company has little else
+    series_company = sorted_company[breaks]
+    telling = (count >= 3) | (2 * count >= np.bincount(company)[series_company])
+    kept = np.flatnonzero((cadence >= 0) & (count >= fewest) & telling
+                          & (regular >= regularity * (count - 1)))
+
+    first = np.flatnonzero(np.r_[True, ~same])[kept]
+    last = np.r_[np.flatnonzero(~same), len(series) - 1][kept]
+    typical = pd.Series(amounts).groupby(series).median().to_numpy()[kept]
+    return pd.DataFrame({
+        'company': company[first],
+        'row': order[last],
+        'Cadence': np.array(names)[cadence[kept]],
+        'Typical_Amount': typical,
+        'Charges': count[kept],
+        'First_Charge': days[first].astype('datetime64[D]'),
+        'Last_Charge': days[last].astype('datetime64[D]'),
+        'Next_Expected': (days[last] + np.rint(median_interval[kept]).astype(np.int64)).astype('datetime64[D]'),
+        'Annual_Cost': typical * per_year[cadence[kept]],
+        # Still charging if the next charge isn't overdue at the end of the data
+        'Active': days[last] + cadence_high[kept] >= end,
+    })
+
+
+def find_recurring(df: pd.DataFrame, amount_tolerance: float = 0.1,
+                   regularity: float = 0.75) -> pd.DataFrame:
+    """Find series of charges repeating on a weekly to annual cadence.
+
+    Withdrawals are sorted by company and amount and split into series of
+    equal amounts, so a subscription is picked out from other purchases at
+    the same company.  Each series is then sorted by date; it is recurring
+    when its median interval falls in a cadence's window and at least
+    ``regularity`` of its intervals do.  Companies with no fixed-price
+    series get a second pass that lets amounts drift by
+    ``amount_tolerance`` between charges, for bills that vary a little (and
+    needs at least three charges).  Everything is done with sorts and
+    per-series reductions over whole arrays, no per-row Python.  A series
+    is Active when its next charge is not yet overdue on the last date of
+    ``df``; withdrawals without a company are left out.
+    """
+    outflows = df[(df['Amount'] < 0) & df['Company'].notna()]
+    if outflows.empty:
+        return pd.DataFrame(columns=COLUMNS)
+    companies = as_categorical(outflows['Company'])
+    company = companies.cat.codes.to_numpy()
+    amounts = -outflows['Amount'].to_numpy(dtype=np.float64)
+    days = outflows['Date'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+    end = df['Date'].max().to_datetime64().astype('datetime64[D]').astype(np.int64)
+
+    exact = _recurring_series(company, amounts, days, end, 0.0, regularity)
+    rest = ~np.isin(company, exact['company'].to_numpy())
+    result = exact
+    if rest.any():
+        varying = _recurring_series(company[rest], amounts[rest], days[rest], end, amount_tolerance,
+                                    regularity, fewest=3)
+        varying['row'] = np.flatnonzero(rest)[varying['row'].to_numpy()]
+        result = pd.concat([exact, varying], ignore_index=True)
+
+    result.insert(0, 'Company', companies.cat.categories[result.pop('company').to_numpy()])
+    rows = result.pop('row').to_numpy()
+    result.insert(1, 'Category', outflows['Category'].to_numpy()[rows] if 'Category' in outflows.columns
+                  else None)
+    return result.sort_values('Annual_Cost', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def render_recurring(recurring: pd.DataFrame, output_format: str = 'text'):
+    """Render detected recurring payments as text, an HTML card or a JSON-ready list."""
+    if output_format == 'json':
+        return [
+            {
+                'company': row.Company,
+                'category': row.Category,
+                'cadence': row.Cadence,
+                'typical_amount': round(float(row.Typical_Amount), 2),
+                'charges': int(row.Charges),
+                'first_charge': row.First_Charge.strftime('%Y-%m-%d'),
+                'last_charge': row.Last_Charge.strftime('%Y-%m-%d'),
+                'next_expected': row.Next_Expected.strftime('%Y-%m-%d'),
+                'annual_cost': round(float(row.Annual_Cost), 2),
+                'active': bool(row.Active),
+            }
+            for row in recurring.itertuples(index=False)
+        ]
+
+    if recurring.empty:
+        message = "No recurring payments found."
+        if output_format == 'html':
+            from html_template import HTMLTemplate
+            return HTMLTemplate().create_card(f"<p>{message}</p>", "Recurring Payments")
+        return f"Recurring Payments:\n{message}"
+    active = recurring[recurring['Active']]
+    title = f"Recurring Payments ({len(active)} active, ${active['Annual_Cost'].sum():,.2f} per year)"
+    dates = {column: recurring[column].dt.strftime('%Y-%m-%d')
+             for column in ('Last_Charge', 'Next_Expected')}
+    if output_format == 'html':
+        from html_template import HTMLTemplate
+        template = HTMLTemplate()
+        headers = ['Company', 'Category', 'Cadence', 'Typical Amount', 'Charges', 'Last Charge',
+                   'Next Expected', 'Yearly Cost', 'Status']
+        rows = (
+            [company, category or '', cadence, f'${amount:,.2f}', str(charges), last, upcoming,
+             f'${yearly:,.2f}', 'Active' if is_active else 'Ended']
+            for company, category, cadence, amount, charges, last, upcoming, yearly, is_active in zip(
+                recurring['Company'], recurring['Category'], recurring['Cadence'],
+                recurring['Typical_Amount'], recurring['Charges'], dates['Last_Charge'],
+                dates['Next_Expected'], recurring['Annual_Cost'], recurring['Active'])
+        )
+        return template.create_card(
+            f'<div class="overflow-x-auto">{template.create_table(headers, rows)}</div>', title)
+
+    table = recurring.drop(columns=['First_Charge']).assign(**dates)
+    table['Active'] = np.where(table['Active'], 'Active', 'Ended')
+    return f"{title}:\n" + table.to_string(
+        index=False, float_format=lambda x: '${:,.2f}'.format(x))
@@ -0,0 +1,205 @@
+import json
+import os
+
+from anomalies import render_anomalies
+from forecast import render_budget, render_forecast
+from recurring import render_recurring
+from report_format import format_currency, format_text_table, top_rows
+from rollups import render_rollups
+# The HTML template and the flow modules are imported for the formats that use them
+
+# Companies given their own column in the per-period tables
+ROLLUP_COMPANIES = 10
+COMPANY_HEADERS = ['Company', 'Total Amount', 'Monthly Average', 'Yearly Average', 'Transaction Count']
+
+
+def company_spending(df):
+    """Total amount and transaction count per company."""
+    spending = df.groupby('Company', observed=True).agg({
+        'Amount': ['sum', 'count']
+    }).reset_index()
+    spending.columns = ['Company', 'Total_Amount', 'Transaction_Count']
+    return spending
+
+
+def render_report(spending, start_date, end_date, months, output_format='text',
+                  total_flows=None, category_flows=None, title='Transaction Analysis',
+                  sink=None, limit=40, rollups=None, recurring=None, anomalies=None,
+                  page_size=None, page_path=None, rules=None, verbose=True, forecast=None, budget=None):
+    """Render per-company totals, plus money and category flows for HTML.
+    
+    Only the ``limit`` largest companies are listed (all of them if None).
+    For HTML with ``page_path`` (page number -> file path), a list longer
+    than ``page_size`` is split: the report shows the first page and each
+    further page is written to its own document, linked from the others.
+    With a file-like ``sink`` the report is written there as it is rendered
+    and None is returned; HTML then never exists as one string.  ``rollups``
+    adds per-period tables for the categories and the first companies listed,
+    ``recurring`` a table of the payments found by find_recurring and
+    ``anomalies`` the charges flagged by find_anomalies, next to the money flows.
+    ``forecast`` adds the projections of forecast_spending and ``budget`` the
+    table of compare_budget.
+    ``rules`` are the category rules whose keywords the flow diagram shows
+    (the ones in use by default), and ``verbose=False`` prints nothing.
+    """
+    years = months / 12
+    
+    # Select the largest companies first, so only those get averaged and formatted
+    spending = top_rows(spending.assign(Total_Amount=spending['Total_Amount'].abs()), 'Total_Amount', limit)
+    spending = spending.assign(Monthly_Average=spending['Total_Amount'] / months,
+                               Yearly_Average=spending['Total_Amount'] / years)
+    rollup_companies = spending['Company'].head(ROLLUP_COMPANIES).tolist()
+    
+    from total_flows import render_total_flows
+    if output_format == 'html':
+        from html_template import HTMLTemplate
+        from flow_diagram import render_flow_diagram
+        template = HTMLTemplate()
+        
+        # Add date range information
+        date_range_info = template.create_card(
+            title="Analysis Period",
+            content=f"<p>Transactions from {start_date} to {end_date}</p>"
+        )
+        
+        # Create the spending table section, split into pages when there are many companies
+        table_title = (f"Top {limit} Companies by Transaction Volume" if limit is not None
+                       else "All Companies by Transaction Volume")
+        pages = 1
+        if page_path is not None and page_size and len(spending) > page_size:
+            pages = -(-len(spending) // page_size)
+            write_company_pages(template, spending, page_size, page_path, title, table_title, verbose)
+        shown = spending.head(page_size) if pages > 1 else spending
+        spending_table = template.iter_card(
+            template.iter_table(COMPANY_HEADERS, company_rows(shown)), title=table_title)
+        if pages > 1:
+            spending_table = [company_pager(template, 1, pages, page_path), *spending_table]
+        
+        # Get the flows analysis
+        deposits, withdrawals = total_flows
+        flows_section = render_total_flows(deposits, withdrawals, months, output_format)
+        
+        # Get the flow diagram
+        flow_diagram = render_flow_diagram(category_flows, output_format, rules)
+        
+        # Flagged charges go next to the money flows
+        anomalies_section = ("\n            " + render_anomalies(anomalies, 'html')
+                             if anomalies is not None else "")
+        
+        # Combine all sections
+        sections = [
+            f"""
+            <h1 class="text-2xl font-semibold text-center mb-6">{title}</h1>
+            {date_range_info}
+            """,
+            spending_table,
+            render_rollups(rollups, rollup_companies, 'html') if rollups is not None else "",
+            render_recurring(recurring, 'html') if recurring is not None else "",
+            render_forecast(forecast, 'html') if forecast is not None else "",
+            render_budget(budget, 'html') if budget is not None else "",
+            f"""
+            {flows_section}{anomalies_section}
+            {flow_diagram}
+        """,
+        ]
+        
+        if sink is not None:
+            template.write_document(sink, sections)
+            return None
+        return "".join(template.iter_document(sections))
+    elif output_format == 'json':
+        deposits, withdrawals = total_flows
+        categories = category_flows.sort_values('Total_Amount', ascending=False)
+        report = {
+            'title': title,
+            'start_date': start_date,
+            'end_date': end_date,
+            'months': round(months, 2),
+            # Built column by column; iterrows would box every row into a Series
+            'companies': [
+                {
+                    'company': company,
+                    'total_amount': round(total, 2),
+                    'monthly_average': round(monthly, 2),
+                    'yearly_average': round(yearly, 2),
+                    'transaction_count': count,
+                }
+                for company, total, monthly, yearly, count in zip(
+                    spending['Company'].tolist(), spending['Total_Amount'].tolist(),
+                    spending['Monthly_Average'].tolist(), spending['Yearly_Average'].tolist(),
+                    spending['Transaction_Count'].tolist())
+            ],
+            'total_flows': render_total_flows(deposits, withdrawals, months, 'json'),
+            'categories': [
+                {
+                    'category': category,
+                    'total_amount': round(total, 2),
+                    'transaction_count': count,
+                }
+                for category, total, count in zip(
+                    categories['Category'].tolist(), categories['Total_Amount'].tolist(),
+                    categories['Transaction_Count'].tolist())
+            ],
+        }
+        if rollups is not None:
+            report['rollups'] = render_rollups(rollups, rollup_companies, 'json')
+        if recurring is not None:
+            report['recurring'] = render_recurring(recurring, 'json')
+        if anomalies is not None:
+            report['anomalies'] = render_anomalies(anomalies, 'json')
+        if forecast is not None:
+            report['forecast'] = render_forecast(forecast, 'json')
+        if budget is not None:
+            report['budget'] = render_budget(budget, 'json')
+        # Compact, so the C encoder does the work; pipe through json.tool to read it
+        result = json.dumps(report, separators=(',', ':'))
+    else:
+        if verbose:
+            print(f"\nAnalysis Period: {start_date} to {end_date}\n")
+        result = format_text_table(spending, ['Total_Amount', 'Monthly_Average', 'Yearly_Average'])
+        if rollups is not None:
+            result += "\n\n" + render_rollups(rollups, rollup_companies)
+        if recurring is not None:
+            result += "\n\n" + render_recurring(recurring)
+        if anomalies is not None:
+            result += "\n\n" + render_anomalies(anomalies)
+        if forecast is not None:
+            result += "\n\n" + render_forecast(forecast)
+        if budget is not None:
+            result += "\n\n" + render_budget(budget)
+    
+    if sink is not None:
+        sink.write(result)
+        return None
+    return result
+
+
+def company_rows(spending):
+    """HTML table rows for per-company totals, with each amount column formatted in one pass."""
+    return zip(spending['Company'].tolist(), format_currency(spending['Total_Amount']),
+               format_currency(spending['Monthly_Average']), format_currency(spending['Yearly_Average']),
+               map(str, spending['Transaction_Count'].tolist()))
+
+
+def company_pager(template, page, pages, page_path):
+    """Links between the pages of the company list; the pages sit side by side."""
+    return template.create_pager(page, pages, lambda target: os.path.basename(page_path(target)))
+
+
+def write_company_pages(template, spending, page_size, page_path, title, table_title, verbose=True):
+    """Write pages 2 onwards of the company list as documents of their own."""
+    pages = -(-len(spending) // page_size)
+    for page in range(2, pages + 1):
+        rows = company_rows(spending.iloc[(page - 1) * page_size:page * page_size])
+        pager = company_pager(template, page, pages, page_path)
+        with open(page_path(page), 'w') as f:
+            template.write_document(f, [
+                f"""
+            <h1 class="text-2xl font-semibold text-center mb-6">{title}</h1>
+            {pager}""",
+                template.iter_card(template.iter_table(COMPANY_HEADERS, rows),
+                                   title=f"{table_title} (page {page} of {pages})"),
+                pager,
+            ], title)
+        if verbose:
+            print(f"Page {page} of {pages} written to {page_path(page)}")
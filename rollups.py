@@ -0,0 +1,136 @@
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Rollup granularities and their pandas period frequencies
+PERIODS = {'day': 'D', 'week': 'W', 'month': 'M', 'quarter': 'Q'}
+
+
+class Rollups:
+    """Per-period sums and counts for every Company and Category.
+
+    One pass over the rows groups them into (company, category, period)
+    cells, stored sparsely as parallel arrays, so five years of days across
+    thousands of merchants stays small.  Company and category views are
+    summed from the cells and only made dense for the keys asked for.
+    """
+
+    def __init__(self, df: pd.DataFrame, period: str = 'month'):
+        if period not in PERIODS:
+            raise ValueError(f"Unknown rollup period: {period}")
+        self.period = period
+
+        # Rows without a date, company or category would get code -1 below and be
+        # summed into another key's cell, so they are left out of every rollup
+        known = df['Date'].notna() & df['Company'].notna() & df['Category'].notna()
+        if not known.all():
+            df = df[known]
+
+        ordinals = df['Date'].dt.to_period(PERIODS[period]).array.asi8
+        first = ordinals.min()
+        self.periods = pd.period_range(pd.Period(ordinal=first, freq=PERIODS[period]),
+                                       periods=ordinals.max() - first + 1)
+        period_codes = ordinals - first
+
+        company_codes, self.companies = pd.factorize(df['Company'], sort=True)
+        category_codes, self.categories = pd.factorize(df['Category'], sort=True)
+        self.companies = pd.Index(self.companies)
+        self.categories = pd.Index(self.categories)
+
+        cells = ((company_codes.astype(np.int64) * len(self.categories) + category_codes)
+                 * len(self.periods) + period_codes)
+        cells, inverse = np.unique(cells, return_inverse=True)
+        amounts = df['Amount'].to_numpy(dtype=np.float64)
+        self.net = np.bincount(inverse, weights=amounts, minlength=len(cells))
+        self.spent = np.bincount(inverse, weights=np.where(amounts < 0, -amounts, 0.0), minlength=len(cells))
+        self.count = np.bincount(inverse, minlength=len(cells))
+        self.spent_count = np.bincount(inverse, weights=amounts < 0, minlength=len(cells)).astype(np.int64)
+
+        self.period_codes = cells % len(self.periods)
+        cells //= len(self.periods)
+        self.category_codes = cells % len(self.categories)
+        self.company_codes = cells // len(self.categories)
+
+    def __len__(self) -> int:
+        """Number of non-empty (company, category, period) cells."""
+        return len(self.net)
+
+    def _pivot(self, codes: np.ndarray, labels: pd.Index, values: np.ndarray,
+               keys: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Sum ``values`` into a periods x keys frame."""
+        if keys is None:
+            keys = labels
+        keys = pd.Index(list(keys))
+        positions = labels.get_indexer(keys)
+        lookup = np.full(len(labels), -1)
+        lookup[positions[positions >= 0]] = np.flatnonzero(positions >= 0)
+        columns = lookup[codes]
+        selected = columns >= 0
+        flat = self.period_codes[selected] * len(keys) + columns[selected]
+        dense = np.bincount(flat, weights=values[selected], minlength=len(self.periods) * len(keys))
+        return pd.DataFrame(dense.reshape(len(self.periods), len(keys)),
+                            index=self.periods.astype(str), columns=keys)
+
+    def companies_by_period(self, companies: Optional[Iterable[str]] = None,
+                            counts: bool = False, spent: bool = False) -> pd.DataFrame:
+        """Absolute net amount (or transaction count) per period for each company.
+
+        With ``spent`` only outflows are summed, as for categories.
+        """
+        if counts:
+            return self._pivot(self.company_codes, self.companies, self.count, companies).astype(np.int64)
+        if spent:
+            return self._pivot(self.company_codes, self.companies, self.spent, companies)
+        return self._pivot(self.company_codes, self.companies, self.net, companies).abs()
+
+    def categories_by_period(self, categories: Optional[Iterable[str]] = None,
+                             counts: bool = False) -> pd.DataFrame:
+        """Outflow (or outflow count) per period for each category, like the flow diagram."""
+        if counts:
+            return self._pivot(self.category_codes, self.categories, self.spent_count,
+                               categories).astype(np.int64)
+        return self._pivot(self.category_codes, self.categories, self.spent, categories)
+
+
+def _sorted_columns(frame: pd.DataFrame) -> pd.DataFrame:
+    return frame[frame.sum().sort_values(ascending=False).index]
+
+
+def rollup_sections(rollups: Rollups, companies: List[str]) -> Dict[str, pd.DataFrame]:
+    """The tables shown in reports: spending by category, then by the given companies."""
+    name = rollups.period.capitalize()
+    categories = _sorted_columns(rollups.categories_by_period())
+    return {
+        f"Spending by Category per {name}": categories.loc[:, categories.sum() > 0],
+        f"Top Companies per {name}": rollups.companies_by_period(companies),
+    }
+
+
+def render_rollups(rollups: Rollups, companies: List[str], output_format: str = 'text'):
+    """Render rollup tables as text, HTML cards or a JSON-ready dict."""
+    sections = rollup_sections(rollups, companies)
+    if output_format == 'json':
+        return {
+            'period': rollups.period,
+            'tables': {
+                title: {period: {key: round(float(value), 2) for key, value in row.items()}
+                        for period, row in table.iterrows()}
+                for title, table in sections.items()
+            },
+        }
+    if output_format == 'html':
+        from html_template import HTMLTemplate
+        template = HTMLTemplate()
+        cards = []
+        for title, table in sections.items():
+            headers = [rollups.period.capitalize()] + list(table.columns)
+            rows = ([period] + [f'${value:,.2f}' for value in values]
+                    for period, values in zip(table.index, table.to_numpy()))
+            cards.append(template.create_card(
+                f'<div class="overflow-x-auto">{template.create_table(headers, rows)}</div>', title))
+        return "".join(cards)
+    return "\n\n".join(
+        f"{title}:\n{table.to_string(float_format=lambda x: '${:,.2f}'.format(x))}"
+        for title, table in sections.items()
+    )
@@ -1,14 +1,25 @@
 import pandas as pd
-import numpy as np
-from thefuzz import fuzz
-from datetime import datetime
 import argparse
+from contextlib import nullcontext, redirect_stdout
+import glob
+import os
 import sys
-from tqdm import tqdm
-from normalize_company import normalize_company_with_fuzzy, build_company_groups, should_exact_match
-from total_flows import get_total_flows
-from flow_diagram import generate_flow_diagram
-from html_template import HTMLTemplate
+from itertools import repeat
+from normalize_company import resolve_companies
+from categorize import categorize_descriptions, use_category_rules
+from streaming import DescriptionTotals, read_transaction_chunks
+from incremental import AnalysisState
+from profiling import stage, start_profiling, stop_profiling
+from rollups import PERIODS, Rollups
+from recurring import find_recurring
+from anomalies import find_anomalies
+from forecast import METHODS, compare_budget, forecast_spending, load_budget
+from columnar import (INPUT_EXTENSIONS, as_categorical, columnar_format, distinct_values, is_analyzed,
+                      iter_ndjson, map_categories, read_transactions, require_pyarrow, write_analyzed)
+from normalization_cache import NormalizationCache, normalize_with_cache, DEFAULT_MAX_ENTRIES
+from report import company_spending, render_report
+# Process pools, progress bars and the HTML/JSON-only flow modules are
+# imported where they are used, so small text runs start faster
 
 def print_date_range(df):
     """Print the first and last dates in the transaction data."""
@@ -17,151 +28,481 @@ def print_date_range(df):
     print(f"\nTransaction Date Range: {start_date} to {end_date}")
     return start_date, end_date
 
-def group_similar_companies(companies):
-    groups = {}
-    processed = set()
+def analyze_transactions(df, output_format='text', workers=1, cache=None, save_analyzed=None, sink=None,
+                         rollup=None, recurring=False, anomalies=False, limit=40, page_size=None,
+                         page_path=None, forecast=None, forecast_method='smoothing', budget=None):
+    """Normalize, categorize and report on a frame of transactions.
     
-    for name in tqdm(companies, desc="Grouping similar companies"):
-        if name in processed:
-            continue
-            
-        if should_exact_match(name):
-            groups[name] = [name]
-            processed.add(name)
-            continue
-            
-        group = [name]
-        processed.add(name)
-        
-        for other in companies:
-            if other not in processed and not should_exact_match(other) and fuzz.ratio(name, other) > 85:
-                group.append(other)
-                processed.add(other)
-                
-        groups[name] = group
-    
-    return groups
-
-def analyze_transactions(df, output_format='text'):
+    ``output_format`` is 'text', 'html' or 'json' for a report, or 'ndjson'
+    for the transactions themselves, one JSON object per line with their
+    company and category.  ``limit``, ``page_size`` and ``page_path`` are
+    passed on to render_report.  ``forecast`` projects spending that many
+    months ahead and ``budget`` (category or company -> monthly amount) is
+    compared with the first projected month.
+    """
     print("Starting transaction analysis...")
     
     # Clean column names
     df.columns = df.columns.str.strip()
     
-    # Convert amount to numeric if not already
-    df['Amount'] = pd.to_numeric(df['Amount'])
-    
-    # Convert date to datetime
-    df['Date'] = pd.to_datetime(df['Date'])
+    # Columnar input already stores typed columns, so only parse when needed
+    with stage('parse', rows=len(df)):
+        if not pd.api.types.is_numeric_dtype(df['Amount']):
+            df['Amount'] = pd.to_numeric(df['Amount'])
+        if not pd.api.types.is_datetime64_any_dtype(df['Date']):
+            df['Date'] = pd.to_datetime(df['Date'])
 
     # Print date range before analysis
     start_date, end_date = print_date_range(df)
 
-    # Normalize company names
-    tqdm.pandas(desc="Normalizing company names")
-    company_groups = build_company_groups(df['Description'].tolist())
-    df['Normalized_Description'] = df['Description'].progress_apply(lambda x: normalize_company_with_fuzzy(x, company_groups))
-    
-    # Group similar company names, preserving exact matches for transfers
-    unique_companies = df['Normalized_Description'].unique()
-    company_groups = group_similar_companies(unique_companies)
-    
-    print("Creating company mappings...")
-    company_mapping = {}
-    for main_name, variations in company_groups.items():
-        for variation in variations:
-            if should_exact_match(variation):
-                company_mapping[variation] = variation
+    if is_analyzed(df):
+        print("Input is already normalized and categorized, skipping normalization")
+    else:
+        with stage('normalize', rows=len(df)) as record:
+            # Descriptions, names and companies are codes into tables of distinct
+            # strings, so all per-name work happens once per distinct value
+            df['Description'] = as_categorical(df['Description'])
+            descriptions = distinct_values(df['Description'])
+            if cache is not None:
+                # Reuse cached normalization, only running fuzzy matching on new descriptions
+                resolved = normalize_with_cache(descriptions, cache, workers=workers)
             else:
-                company_mapping[variation] = main_name
+                # Normalize company names, once per distinct description
+                resolved = resolve_companies(descriptions, workers=workers)
+            
+            df['Normalized_Description'] = map_categories(
+                df['Description'], {raw: names[0] for raw, names in resolved.items()}, 'Normalized_Description')
+            df['Company'] = map_categories(
+                df['Description'], {raw: names[1] for raw, names in resolved.items()}, 'Company')
+            record['unique'] = len(resolved)
     
-    df['Company'] = df['Normalized_Description'].map(company_mapping)
+    if save_analyzed:
+        with stage('save_analyzed', rows=len(df)):
+            if 'Category' not in df.columns:
+                df['Category'] = categorize_descriptions(df['Description'])
+            write_analyzed(df, save_analyzed)
+        print(f"Analyzed transactions written to {save_analyzed}")
     
-    print("Calculating final metrics...")
-    months = (df['Date'].max() - df['Date'].min()).days / 30.44
-    years = months / 12
+    if output_format == 'ndjson':
+        # One enriched row per transaction instead of a report
+        with stage('render', rows=len(df)):
+            if 'Category' not in df.columns:
+                df['Category'] = categorize_descriptions(df['Description'])
+            if sink is not None:
+                sink.writelines(iter_ndjson(df))
+                return None
+            return "".join(iter_ndjson(df))
     
-    spending = df.groupby('Company').agg({
-        'Amount': ['sum', 'count']
-    }).reset_index()
+    rollups = None
+    if rollup:
+        # Reuses the Company and Category columns rather than recomputing them
+        with stage('rollup', rows=len(df)) as record:
+            if 'Category' not in df.columns:
+                df['Category'] = categorize_descriptions(df['Description'])
+            rollups = Rollups(df, rollup)
+            record['unique'] = len(rollups)
     
-    spending.columns = ['Company', 'Total_Amount', 'Transaction_Count']
-    spending['Total_Amount'] = abs(spending['Total_Amount'])
-    spending['Monthly_Average'] = spending['Total_Amount'] / months
-    spending['Yearly_Average'] = spending['Total_Amount'] / years
+    recurring_payments = None
+    if recurring:
+        with stage('recurring', rows=len(df)) as record:
+            if 'Category' not in df.columns:
+                df['Category'] = categorize_descriptions(df['Description'])
+            recurring_payments = find_recurring(df)
+            record['unique'] = len(recurring_payments)
     
-    spending = spending.sort_values('Total_Amount', ascending=False).head(40)
+    flagged = None
+    if anomalies:
+        with stage('anomalies', rows=len(df)) as record:
+            flagged = find_anomalies(df)
+            record['unique'] = len(flagged)
     
-    print("Analysis complete!")
+    projections = comparison = None
+    if forecast or budget:
+        with stage('forecast', rows=len(df)) as record:
+            if 'Category' not in df.columns:
+                df['Category'] = categorize_descriptions(df['Description'])
+            projections = forecast_spending(df, forecast or 1, forecast_method, rollups)
+            record['unique'] = len(projections)
+            if budget:
+                comparison = compare_budget(projections, budget)
     
-    if output_format == 'html':
-        template = HTMLTemplate()
-        
-        # Add date range information
-        date_range_info = template.create_card(
-            title="Analysis Period",
-            content=f"<p>Transactions from {start_date} to {end_date}</p>"
-        )
-        
-        # Format the spending data for the table
-        headers = ['Company', 'Total Amount', 'Monthly Average', 'Yearly Average', 'Transaction Count']
-        rows = []
-        for _, row in spending.iterrows():
-            rows.append([
-                row['Company'],
-                f'${row["Total_Amount"]:,.2f}',
-                f'${row["Monthly_Average"]:,.2f}',
-                f'${row["Yearly_Average"]:,.2f}',
-                str(row["Transaction_Count"])
-            ])
-        
-        # Create the spending table section
-        spending_table = template.create_card(
-            title="Top 40 Companies by Transaction Volume",
-            content=template.create_table(headers, rows)
-        )
-        
-        # Get the flows analysis
-        flows_section = get_total_flows(df, output_format)
-        
-        # Get the flow diagram
-        flow_diagram = generate_flow_diagram(df, output_format)
+    print("Calculating final metrics...")
+    with stage('aggregate', rows=len(df)) as record:
+        months = (df['Date'].max() - df['Date'].min()).days / 30.44
+        spending = company_spending(df)
+        record['unique'] = len(spending)
         
-        # Combine all sections
-        content = f"""
-            <h1 class="text-2xl font-semibold text-center mb-6">Transaction Analysis</h1>
-            {date_range_info}
-            {spending_table}
-            {flows_section}
-            {flow_diagram}
-        """
+        total_flows = category_flows = None
+        if output_format in ('html', 'json'):
+            from total_flows import calculate_total_flows
+            from flow_diagram import calculate_category_flows
+            total_flows = calculate_total_flows(df)
+            category_flows = calculate_category_flows(df)
+    
+    print("Analysis complete!")
+    with stage('render', rows=len(spending)):
+        return render_report(spending, start_date, end_date, months, output_format,
+                             total_flows, category_flows, sink=sink, limit=limit, rollups=rollups,
+                             recurring=recurring_payments, anomalies=flagged, page_size=page_size,
+                             page_path=page_path, forecast=projections if forecast else None,
+                             budget=comparison)
+
+def analyze_transactions_streaming(path, output_format='text', chunksize=100000, workers=1, cache=None,
+                                   sink=None, **report_options):
+    """Analyze a CSV chunk by chunk, keeping only per-description totals in memory."""
+    from tqdm import tqdm
+    print("Starting streaming transaction analysis...")
+    
+    totals = DescriptionTotals()
+    with stage('load') as record:
+        for chunk in tqdm(read_transaction_chunks(path, chunksize), desc="Reading chunks", unit="chunk"):
+            totals.add(chunk)
+        record['rows'], record['unique'] = totals.rows, len(totals.totals)
+    
+    return report_from_totals(totals, output_format, workers, cache, sink, **report_options)
+
+def analyze_transactions_incremental(path, state, output_format='text', chunksize=100000, workers=1, cache=None,
+                                     sink=None, **report_options):
+    """Fold only rows newer than the saved watermark into the saved totals, then report."""
+    from tqdm import tqdm
+    print("Starting incremental transaction analysis...")
+    watermark = state.watermark
+    if watermark is not None:
+        print(f"Skipping transactions on or before {watermark.strftime('%Y-%m-%d')}")
+    
+    new = DescriptionTotals()
+    with stage('load') as record:
+        for chunk in tqdm(state.new_rows(read_transaction_chunks(path, chunksize)),
+                          desc="Reading chunks", unit="chunk"):
+            new.add(chunk)
+        record['rows'], record['unique'] = new.rows, len(new.totals)
+    print(f"New rows: {new.rows:,}")
+    with stage('update_state', rows=len(new.totals)) as record:
+        state.update(new)
+        totals = state.load()
+        record['unique'] = len(totals.totals)
+    if not totals.rows:
+        raise ValueError("No transactions to analyze")
+    return report_from_totals(totals, output_format, workers, cache, sink, **report_options)
+
+def analyze_accounts(paths, output_format='text', chunksize=100000, jobs=None, workers=1, cache=None,
+                     limit=40):
+    """Analyze several accounts' files with one shared company normalization.
+    
+    Each file is read into per-description totals on its own process, then
+    every distinct description across all accounts is normalized once and
+    the result is used for each account's report and for the merged one.
+    Returns the merged report and a dict of account name -> report.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from tqdm import tqdm
+    print(f"Starting analysis of {len(paths)} accounts...")
+    names = account_names(paths)
+    
+    with stage('load') as record:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            account_totals = list(tqdm(executor.map(read_account_totals, paths, repeat(chunksize)),
+                                       total=len(paths), desc="Reading accounts", unit="file"))
+        merged = DescriptionTotals()
+        for totals in account_totals:
+            merged.merge(totals)
+        record['rows'], record['unique'] = merged.rows, len(merged.totals)
+    if not merged.rows:
+        raise ValueError("No transactions to analyze")
+    
+    start_date = merged.start_date.strftime('%Y-%m-%d')
+    end_date = merged.end_date.strftime('%Y-%m-%d')
+    print(f"\nTransaction Date Range: {start_date} to {end_date}")
+    print(f"Rows: {merged.rows:,}, distinct descriptions: {len(merged.totals):,}")
+    
+    descriptions = merged.totals.index.tolist()
+    resolved = resolve_descriptions(descriptions, workers, cache)
+    categories = None
+    if output_format in ('html', 'json'):
+        categories = dict(zip(descriptions, categorize_descriptions(pd.Series(descriptions))))
+    
+    reports = {}
+    for name, totals in zip(names, account_totals):
+        if not totals.rows:
+            print(f"No transactions for {name}, skipping")
+            continue
+        reports[name] = render_totals(totals, resolved, output_format, categories,
+                                      title=f"Transaction Analysis: {name}", limit=limit)
+    merged_report = render_totals(merged, resolved, output_format, categories,
+                                  title="Transaction Analysis: All Accounts", limit=limit)
+    return merged_report, reports
+
+def read_account_totals(path, chunksize=100000):
+    """Per-description totals of one file, run on a pool process by analyze_accounts."""
+    totals = DescriptionTotals()
+    for chunk in read_transaction_chunks(path, chunksize):
+        totals.add(chunk)
+    return totals
+
+def account_names(paths):
+    """Name each account after its file, adding the parent directory when names clash."""
+    stems = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+    clashes = {stem for stem in stems if stems.count(stem) > 1}
+    names = []
+    for path, stem in zip(paths, stems):
+        if stem in clashes:
+            stem = f"{os.path.basename(os.path.dirname(os.path.abspath(path)))}/{stem}"
+        while stem in names:
+            stem += "'"
+        names.append(stem)
+    return names
+
+def expand_input_files(patterns):
+    """Expand directories and glob patterns into a list of transaction files."""
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            files.extend(sorted(
+                os.path.join(pattern, name) for name in os.listdir(pattern)
+                if name.lower().endswith(INPUT_EXTENSIONS)
+            ))
+        elif glob.has_magic(pattern):
+            files.extend(sorted(glob.glob(pattern)))
+        else:
+            files.append(pattern)
+    return list(dict.fromkeys(files))
+
+def report_from_totals(totals, output_format='text', workers=1, cache=None, sink=None, **report_options):
+    """Resolve companies for the distinct descriptions in ``totals`` and render the report.
+    
+    ``report_options`` (``limit``, ``page_size``, ``page_path``) go to render_report.
+    """
+    start_date = totals.start_date.strftime('%Y-%m-%d')
+    end_date = totals.end_date.strftime('%Y-%m-%d')
+    print(f"\nTransaction Date Range: {start_date} to {end_date}")
+    print(f"Rows: {totals.rows:,}, distinct descriptions: {len(totals.totals):,}")
+    
+    resolved = resolve_descriptions(totals.totals.index.tolist(), workers, cache)
+    return render_totals(totals, resolved, output_format, sink=sink, **report_options)
+
+def resolve_descriptions(descriptions, workers=1, cache=None):
+    """Map distinct raw descriptions to (normalized name, company), through the cache if given."""
+    with stage('normalize', rows=len(descriptions), unique=len(descriptions)):
+        if cache is not None:
+            return normalize_with_cache(descriptions, cache, workers=workers)
+        return resolve_companies(descriptions, workers=workers)
+
+def render_totals(totals, resolved, output_format='text', categories=None, title='Transaction Analysis',
+                  sink=None, **report_options):
+    """Render the report for per-description totals, given each description's company."""
+    start_date = totals.start_date.strftime('%Y-%m-%d')
+    end_date = totals.end_date.strftime('%Y-%m-%d')
+    descriptions = totals.totals.index.tolist()
+    
+    print("Calculating final metrics...")
+    with stage('aggregate', rows=len(descriptions)) as record:
+        spending = totals.company_spending({raw: resolved[raw][1] for raw in descriptions})
+        record['unique'] = len(spending)
         
-        return template.render(content)
-    else:
-        print(f"\nAnalysis Period: {start_date} to {end_date}\n")
-        return spending.to_string(float_format=lambda x: '${:,.2f}'.format(x) if isinstance(x, float) else x)
+        total_flows = category_flows = None
+        if output_format in ('html', 'json'):
+            total_flows = totals.total_flows()
+            if categories is None:
+                categories = dict(zip(descriptions, categorize_descriptions(pd.Series(descriptions))))
+            category_flows = totals.category_flows(categories)
+    
+    print("Analysis complete!")
+    with stage('render', rows=len(spending)):
+        return render_report(spending, start_date, end_date, totals.months, output_format,
+                             total_flows, category_flows, title, sink, **report_options)
+
+def write_account_reports(reports, output=None):
+    """Write each account's report next to ``output`` as <stem>-<account><ext>, or print it."""
+    for name, report in reports.items():
+        if output:
+            stem, extension = os.path.splitext(output)
+            path = f"{stem}-{name.replace('/', '-')}{extension}"
+            with open(path, 'w') as f:
+                f.write(report)
+            print(f"Results for {name} written to {path}")
+        else:
+            print(f"\n=== {name} ===")
+            print(report)
+    if not output:
+        print("\n=== All Accounts ===")
+
+def top_count(value):
+    """Parse --top: a positive number of companies, or 'all' (None)."""
+    if value.lower() == 'all':
+        return None
+    try:
+        count = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a number or 'all', not {value!r}") from None
+    if count < 1:
+        raise argparse.ArgumentTypeError('must list at least one company')
+    return count
 
 def main():
     parser = argparse.ArgumentParser(description='Analyze transaction data')
-    parser.add_argument('file', help='CSV file containing transaction data')
-    parser.add_argument('--format', choices=['text', 'html'], default='text',
-                      help='Output format (default: text)')
+    parser.add_argument('files', nargs='+', metavar='file',
+                      help='CSV, Parquet or Arrow files of transactions, or globs/directories of them; '
+                           'several files are analyzed as separate accounts plus a merged report')
+    parser.add_argument('--format', choices=['text', 'html', 'json', 'ndjson'], default='text',
+                      help='Output format (default: text); ndjson writes one analyzed transaction per line')
     parser.add_argument('--output', help='Output file (optional)')
+    parser.add_argument('--top', type=top_count, default=40, metavar='N|all',
+                      help='Companies to list, largest first, or all of them (default: 40)')
+    parser.add_argument('--page-size', type=int, default=1000, metavar='N',
+                      help='With --format html and --output, companies per page; the rest of the list '
+                           'goes to <output>-page2.html and so on (default: 1,000, 0 for one page)')
+    parser.add_argument('--workers', type=int, default=1,
+                      help='Processes to use for fuzzy name matching (default: 1)')
+    parser.add_argument('--rollup', choices=list(PERIODS),
+                      help='Add per-period spending tables for categories and top companies (optional)')
+    parser.add_argument('--recurring', action='store_true',
+                      help='Detect subscriptions and other recurring payments')
+    parser.add_argument('--anomalies', action='store_true',
+                      help='Flag possible duplicate charges and unusually large ones')
+    parser.add_argument('--forecast', type=int, metavar='MONTHS',
+                      help='Project spending per category and company this many months ahead (optional)')
+    parser.add_argument('--forecast-method', choices=list(METHODS), default='smoothing',
+                      help='Damped exponential smoothing or a linear trend (default: smoothing)')
+    parser.add_argument('--budget',
+                      help='JSON, YAML or CSV file of monthly budgets per category or company to '
+                           'compare with the projected month (optional)')
+    parser.add_argument('--jobs', type=int,
+                      help='Processes reading account files in parallel (default: one per CPU)')
+    parser.add_argument('--chunksize', type=int,
+                      help='Stream the CSV in chunks of this many rows to bound memory (optional)')
+    parser.add_argument('--save-analyzed',
+                      help='Parquet/Arrow file to save the normalized, categorized transactions to (optional)')
+    parser.add_argument('--state',
+                      help='SQLite file of running totals; only rows after its last date are added (optional)')
+    parser.add_argument('--rules',
+                      help='JSON, YAML or CSV file of category keyword rules to use instead of the built-in ones (optional)')
+    parser.add_argument('--cache', help='SQLite file to cache merchant normalization across runs (optional)')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_ENTRIES,
+                      help=f'Maximum cached descriptions before evicting (default: {DEFAULT_MAX_ENTRIES:,})')
+    
+    parser.add_argument('--profile', metavar='JSON',
+                      help='Write wall/CPU time, peak RSS and row counts per stage to this JSON file (optional)')
+    parser.add_argument('--cprofile', metavar='PSTATS',
+                      help='With --profile, dump cProfile stats of the slowest stage here (adds overhead)')
     
     args = parser.parse_args()
+    files = expand_input_files(args.files)
+    if not files:
+        parser.error('no input files found')
+    if len(files) > 1 and (args.state or args.save_analyzed):
+        parser.error('--state and --save-analyzed take a single input file')
+    for option, value in (('--rollup', args.rollup), ('--recurring', args.recurring),
+                          ('--anomalies', args.anomalies), ('--forecast', args.forecast),
+                          ('--budget', args.budget)):
+        if value and (len(files) > 1 or args.state or args.chunksize):
+            parser.error(f'{option} needs the dated rows, so it only works on a single file without '
+                         '--chunksize or --state')
+    if args.format == 'ndjson':
+        if len(files) > 1 or args.state or args.chunksize:
+            parser.error('--format ndjson writes the analyzed rows, so it only works on a single file '
+                         'without --chunksize or --state')
+        if args.rollup or args.recurring or args.anomalies or args.forecast or args.budget:
+            parser.error('--format ndjson writes rows, not a report; drop --rollup, --recurring, '
+                         '--anomalies, --forecast and --budget')
+    if args.format == 'json' and len(files) > 1 and not args.output:
+        parser.error('--format json with several files needs --output (one JSON file per account)')
+    if args.page_size < 0:
+        parser.error('--page-size must be 0 or more')
+    if args.forecast is not None and args.forecast < 1:
+        parser.error('--forecast must be at least 1 month')
+    args.file = files[0]
+    if args.cprofile and not args.profile:
+        parser.error('--cprofile needs --profile')
+    if args.profile:
+        start_profiling(args.cprofile)
+    if args.rules:
+        try:
+            use_category_rules(args.rules)
+        except (OSError, ValueError, ImportError) as error:
+            parser.error(f'--rules: {error}')
+    budget = None
+    if args.budget:
+        try:
+            budget = load_budget(args.budget)
+        except (OSError, ValueError, ImportError) as error:
+            parser.error(f'--budget: {error}')
+    if args.save_analyzed:
+        if columnar_format(args.save_analyzed) is None:
+            parser.error('--save-analyzed needs a .parquet or .arrow/.feather file')
+        require_pyarrow()
     
-    print(f"Reading data from {args.file}...")
-    df = pd.read_csv(args.file)
-    print("Columns found:", df.columns.tolist())
+    # JSON on stdout has to stay parseable, so progress messages go to stderr
+    out = sys.stdout
+    machine_readable = args.format in ('json', 'ndjson') and not args.output
+    with redirect_stdout(sys.stderr) if machine_readable else nullcontext():
+        # Incremental runs keep normalization next to the totals so companies stay stable
+        cache_path = args.cache or args.state
+        cache = NormalizationCache(cache_path, max_entries=args.cache_size) if cache_path else None
+        state = AnalysisState(args.state) if args.state else None
+        # A single report is written straight to the output file as it is rendered
+        sink = open(args.output, 'w') if args.output and len(files) == 1 else None
+        if args.format == 'ndjson' and sink is None:
+            sink = out  # rows are streamed to stdout as they are serialized
+        report_options = {'limit': args.top}
+        if args.format == 'html' and sink is not None:
+            stem, extension = os.path.splitext(args.output)
+            report_options.update(page_size=args.page_size, page_path=lambda page: (
+                args.output if page == 1 else f"{stem}-page{page}{extension}"))
+        try:
+            if len(files) > 1:
+                result, account_reports = analyze_accounts(files, args.format, args.chunksize or 100000,
+                                                           jobs=args.jobs, workers=args.workers, cache=cache,
+                                                           limit=args.top)
+            elif state is not None:
+                print(f"Updating {args.state} from {args.file}...")
+                result = analyze_transactions_incremental(args.file, state, args.format,
+                                                          args.chunksize or 100000,
+                                                          workers=args.workers, cache=cache, sink=sink,
+                                                          **report_options)
+            elif args.chunksize:
+                print(f"Streaming data from {args.file} in chunks of {args.chunksize:,} rows...")
+                result = analyze_transactions_streaming(args.file, args.format, args.chunksize,
+                                                        workers=args.workers, cache=cache, sink=sink,
+                                                        **report_options)
+            else:
+                print(f"Reading data from {args.file}...")
+                with stage('load') as record:
+                    df = read_transactions(args.file)
+                    record['rows'] = len(df)
+                print("Columns found:", df.columns.tolist())
+                result = analyze_transactions(df, args.format, workers=args.workers, cache=cache,
+                                              save_analyzed=args.save_analyzed, sink=sink,
+                                              rollup=args.rollup, recurring=args.recurring,
+                                              anomalies=args.anomalies, forecast=args.forecast,
+                                              forecast_method=args.forecast_method, budget=budget,
+                                              **report_options)
+        finally:
+            if sink is not None and sink is not out:
+                sink.close()
+            if state is not None:
+                state.close()
+            if cache is not None:
+                cache.close()
     
-    result = analyze_transactions(df, args.format)
+        if len(files) > 1:
+            write_account_reports(account_reports, args.output)
+        if sink is not None:
+            if sink is not out:
+                print(f"Results written to {args.output}")
+        elif args.output:
+            with open(args.output, 'w') as f:
+                f.write(result)
+            print(f"Results written to {args.output}")
+        else:
+            print(result, file=out)
     
-    if args.output:
-        with open(args.output, 'w') as f:
-            f.write(result)
-        print(f"Results written to {args.output}")
-    else:
-        print(result)
+        profiler = stop_profiling()
+        if profiler is not None:
+            profiler.write(args.profile)
+            print(f"\n{profiler.summary()}")
+            print(f"Profile written to {args.profile}")
+            if args.cprofile:
+                print(f"cProfile stats for '{profiler.hottest()['stage']}' written to {args.cprofile}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,240 @@
+import argparse
+import asyncio
+import http.client
+import io
+import os
+import socket
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from categorize import get_category_automaton, use_category_rules
+from html_template import HTMLTemplate
+from normalization_cache import NormalizationCache
+from script import analyze_transactions
+
+FORMATS = {
+    'text': 'text/plain; charset=utf-8',
+    'html': 'text/html; charset=utf-8',
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+DEFAULT_PORT = 8765
+DEFAULT_MAX_UPLOAD_MB = 256
+
+# Per worker process: the normalization cache shared by every request it serves
+_cache = None
+
+
+def _warm_worker(cache_path: Optional[str], rules_path: Optional[str] = None) -> None:
+    """Load everything an analysis needs once, when the worker process starts.
+
+    Only code and rules are warmed.  Without ``cache_path`` no company names
+    are kept between requests, so each report depends on its upload alone.
+    """
+    global _cache
+    if cache_path:
+        _cache = NormalizationCache(cache_path)
+    # Edits to the rule file are picked up by each analysis, without a restart
+    use_category_rules(rules_path)
+    get_category_automaton()
+    HTMLTemplate()
+    # A tiny run pulls in the rest (lazy pandas/numpy paths, rapidfuzz, templates)
+    sample = pd.DataFrame({
+        'Date': ['2024-01-01', '2024-02-01'],
+        'Amount': [-12.5, 100.0],
+        'Description': ['WALMART #1', 'PAYROLL DEPOSIT'],
+    })
+    with redirect_stdout(io.StringIO()):
+        analyze_transactions(sample, 'html')
+
+
+def analyze_upload(body: bytes, output_format: str) -> str:
+    """Analyze an uploaded CSV on a worker process and return the report."""
+    df = pd.read_csv(io.BytesIO(body))
+    missing = {'Date', 'Amount', 'Description'} - set(df.columns.str.strip())
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(sorted(missing))}")
+    with redirect_stdout(io.StringIO()):
+        return analyze_transactions(df, output_format, cache=_cache)
+
+
+class AnalysisServer:
+    """Minimal HTTP/1.1 front end on asyncio, analyses run on a process pool.
+
+    ``POST /analyze?format=text|html|json|ndjson`` takes a transactions CSV as the
+    request body and returns the report; ``GET /health`` answers when the
+    server is up.  Each connection carries one request.
+    """
+
+    def __init__(self, workers: int = 2, cache_path: Optional[str] = None,
+                 max_upload_mb: int = DEFAULT_MAX_UPLOAD_MB, rules_path: Optional[str] = None):
+        self.max_upload = max_upload_mb * 1024 * 1024
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_warm_worker,
+                                        initargs=(cache_path, rules_path))
+        # Start every worker now so the first requests don't pay for it
+        for future in [self.pool.submit(os.getpid) for _ in range(workers)]:
+            future.result()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            status, content_type, body = await self._respond(reader)
+        except Exception as error:  # never let one request take the server down
+            status, content_type, body = 500, FORMATS['text'], str(error).encode('utf-8')
+        header = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                  f"Content-Type: {content_type}\r\n"
+                  f"Content-Length: {len(body)}\r\n"
+                  "Connection: close\r\n\r\n")
+        writer.write(header.encode('latin-1') + body)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _respond(self, reader: asyncio.StreamReader) -> Tuple[int, str, bytes]:
+        request_line = (await reader.readline()).decode('latin-1').split()
+        if len(request_line) != 3:
+            return 400, FORMATS['text'], b'Malformed request line'
+        method, target, _ = request_line
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        url = urlsplit(target)
+        if url.path == '/health':
+            return 200, FORMATS['json'], b'{"status": "ok"}'
+        if url.path != '/analyze':
+            return 404, FORMATS['text'], b'Not found'
+        if method != 'POST':
+            return 405, FORMATS['text'], b'Use POST with the CSV as the body'
+
+        length = headers.get('content-length', '0')
+        if not length.isdecimal():
+            return 400, FORMATS['text'], b'Invalid Content-Length'
+        length = int(length)
+        if length > self.max_upload:
+            return 413, FORMATS['text'], b'Upload too large'
+        # Read the upload before any other rejection, so the client isn't cut off mid-send
+        body = await reader.readexactly(length)
+        output_format = parse_qs(url.query).get('format', ['text'])[0]
+        if output_format not in FORMATS:
+            return 400, FORMATS['text'], f"Unknown format: {output_format}".encode('utf-8')
+
+        loop = asyncio.get_running_loop()
+        try:
+            report = await loop.run_in_executor(self.pool, analyze_upload, body, output_format)
+        except (ValueError, KeyError, pd.errors.ParserError) as error:
+            return 400, FORMATS['text'], str(error).encode('utf-8')
+        return 200, FORMATS[output_format], report.encode('utf-8')
+
+    async def serve(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT,
+                    socket_path: Optional[str] = None) -> None:
+        if socket_path:
+            server = await asyncio.start_unix_server(self.handle, path=socket_path)
+            print(f"Serving on unix socket {socket_path}")
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+            print(f"Serving on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+    def close(self) -> None:
+        self.pool.shutdown()
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection over a Unix socket, for the stand-in client."""
+
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        super().__init__('localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+def request_report(path: str, output_format: str = 'text', host: str = '127.0.0.1',
+                   port: int = DEFAULT_PORT, socket_path: Optional[str] = None,
+                   timeout: Optional[float] = None) -> Tuple[int, str]:
+    """Upload a CSV to a running server and return (status, report)."""
+    if socket_path:
+        connection = UnixHTTPConnection(socket_path, timeout=timeout)
+    else:
+        connection = http.client.HTTPConnection(host, port, timeout=timeout)
+    with open(path, 'rb') as f:
+        body = f.read()
+    try:
+        try:
+            connection.request('POST', f'/analyze?format={output_format}', body=body,
+                               headers={'Content-Type': 'text/csv'})
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # refused before the whole upload was sent (413); the answer is still there
+        response = connection.getresponse()
+        return response.status, response.read().decode('utf-8')
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve transaction analyses over HTTP')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', help='Run the analysis server')
+    serve.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    serve.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port (default: {DEFAULT_PORT})')
+    serve.add_argument('--socket', help='Listen on this Unix socket instead of TCP (optional)')
+    serve.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                       help='Processes running analyses (default: one per CPU)')
+    serve.add_argument('--cache', help='SQLite normalization cache shared by the workers (optional)')
+    serve.add_argument('--rules', help='JSON, YAML or CSV category rules, reloaded when edited (optional)')
+    serve.add_argument('--max-upload-mb', type=int, default=DEFAULT_MAX_UPLOAD_MB,
+                       help=f'Largest accepted upload in MiB (default: {DEFAULT_MAX_UPLOAD_MB})')
+
+    client = commands.add_parser('client', help='Send a CSV to a running server')
+    client.add_argument('file', help='CSV file containing transaction data')
+    client.add_argument('--format', choices=list(FORMATS), default='text',
+                        help='Report format, or ndjson for the analyzed rows (default: text)')
+    client.add_argument('--host', default='127.0.0.1', help='Server address (default: 127.0.0.1)')
+    client.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port (default: {DEFAULT_PORT})')
+    client.add_argument('--socket', help='Connect to this Unix socket instead of TCP (optional)')
+    client.add_argument('--output', help='Output file (optional)')
+
+    args = parser.parse_args()
+    if args.command == 'serve':
+        if args.rules:
+            # Fail here rather than in every worker's initializer
+            try:
+                use_category_rules(args.rules)
+            except (OSError, ValueError, ImportError) as error:
+                parser.error(f'--rules: {error}')
+        server = AnalysisServer(args.workers, args.cache, args.max_upload_mb, args.rules)
+        try:
+            asyncio.run(server.serve(args.host, args.port, args.socket))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+    else:
+        status, report = request_report(args.file, args.format, args.host, args.port, args.socket)
+        if status != 200:
+            raise SystemExit(f"Server returned {status}: {report}")
+        if args.output:
+            with open(args.output, 'w') as f:
+                f.write(report)
+            print(f"Results written to {args.output}")
+        else:
+            print(report)
+
+if __name__ == "__main__":
+    main()
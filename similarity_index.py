@@ -0,0 +1,400 @@
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Tuple
+from batch_scoring import ratio_scores
+
+# Fewer names than this are grouped in well under a second, so they get no
+# progress bar (and tqdm is not even imported)
+PROGRESS_MIN_NAMES = 1000
+
+# fuzz.ratio is 200 * LCS / (len(a) + len(b)), rounded to an int. The index
+# filters on that formula before any real scoring happens, so a pair can only
+# be skipped when it provably cannot reach the requested ratio.
+
+
+def _bigram_tokens(name: str) -> List[Tuple[str, int]]:
+    """Split a name into bigrams, numbering repeats so they stay distinct."""
+    seen = {}
+    tokens = []
+    for i in range(len(name) - 1):
+        gram = name[i:i + 2]
+        occurrence = seen.get(gram, 0)
+        seen[gram] = occurrence + 1
+        tokens.append((gram, occurrence))
+    return tokens
+
+
+_HISTOGRAM_SIZE = 64
+
+# Below this many names a best_match scan over all of them beats the filters
+_SCAN_LIMIT = 2000
+
+
+def _histogram(name: str) -> np.ndarray:
+    """Count characters into a fixed number of buckets.
+
+    Folding characters together can only raise the shared count, so the
+    bucketed overlap is still an upper bound on the common subsequence.
+    """
+    counts = np.zeros(_HISTOGRAM_SIZE, dtype=np.int32)
+    for char in name:
+        counts[ord(char) % _HISTOGRAM_SIZE] += 1
+    return counts
+
+
+class SimilarityIndex:
+    """Candidate index for fuzz.ratio lookups above a fixed threshold.
+
+    Names are blocked by length (two strings whose lengths are too far apart
+    can never reach the threshold) and by a bigram prefix filter: every pair
+    scoring at least ``min_ratio`` shares a guaranteed number of bigrams, so
+    it is enough to index the rarest few bigrams of each name.  Very short
+    names, where no overlap can be guaranteed, fall back to a scan of the
+    short names in the length window.  Candidates are then pruned with a
+    character-count bound on the longest common subsequence before scoring.
+    """
+
+    def __init__(self, names: Iterable[str] = (), min_ratio: int = 86):
+        self.min_ratio = min_ratio
+        # Filter one point below the requested ratio so that rounding in
+        # fuzz.ratio can never push a real match outside the bounds.
+        self._bound = max(min_ratio - 1, 1)
+        self._names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._postings: Dict[Tuple[str, int], List[int]] = {}
+        self._short: Dict[int, List[int]] = {}
+        self._arrays: Dict[object, np.ndarray] = {}
+        self._present: Optional[List[str]] = None
+        self._size = 0
+
+        names = list(dict.fromkeys(names))
+        capacity = max(len(names), 16)
+        self._lengths = np.zeros(capacity, dtype=np.int64)
+        self._active = np.zeros(capacity, dtype=bool)
+        self._histograms = np.zeros((capacity, _HISTOGRAM_SIZE), dtype=np.int32)
+
+        self._frequency: Dict[Tuple[str, int], int] = {}
+        for name in names:
+            for token in _bigram_tokens(name):
+                self._frequency[token] = self._frequency.get(token, 0) + 1
+
+        for name in names:
+            self.add(name)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, name: str) -> bool:
+        idx = self._ids.get(name)
+        return idx is not None and bool(self._active[idx])
+
+    def _length_window(self, length: int) -> Tuple[int, int]:
+        """Return the range of lengths that can still reach the threshold."""
+        bound = self._bound
+        low = -(-length * bound // (200 - bound))
+        high = length * (200 - bound) // bound
+        return low, high
+
+    def _prefix(self, name: str) -> Tuple[List[Tuple[str, int]], bool]:
+        """Return the bigrams that must be indexed/probed for ``name``.
+
+        The second value is True when no bigram overlap can be guaranteed,
+        in which case the name is treated as "short".
+        """
+        tokens = _bigram_tokens(name)
+        low, high = self._length_window(len(name))
+        # Along a longest common subsequence of length L, each character of
+        # ``name`` outside it breaks at most two of its bigrams and each
+        # character of the other name outside it splits at most one more, so
+        # at least 3L - len(name) - len(other) - 1 bigrams are shared.
+        required_overlap = min(
+            3 * -(-self._bound * (len(name) + length) // 200) - len(name) - length - 1
+            for length in range(low, high + 1)
+        )
+        if required_overlap < 1:
+            return tokens, True
+
+        frequency = self._frequency
+        tokens.sort(key=lambda token: (frequency.get(token, 0), token))
+        return tokens[:len(tokens) - required_overlap + 1], False
+
+    def _grow(self) -> None:
+        """Double the capacity of the per-name arrays."""
+        capacity = len(self._lengths) * 2
+        self._lengths = np.resize(self._lengths, capacity)
+        active = np.zeros(capacity, dtype=bool)
+        active[:len(self._active)] = self._active
+        self._active = active
+        histograms = np.zeros((capacity, _HISTOGRAM_SIZE), dtype=np.int32)
+        histograms[:len(self._histograms)] = self._histograms
+        self._histograms = histograms
+
+    def _posting_array(self, key, ids: List[int]) -> np.ndarray:
+        """Return a cached array copy of a posting list."""
+        array = self._arrays.get(key)
+        if array is None or len(array) != len(ids):
+            array = np.array(ids, dtype=np.int64)
+            self._arrays[key] = array
+        return array
+
+    def add(self, name: str) -> None:
+        """Add a name to the index (re-activating it if it was removed)."""
+        idx = self._ids.get(name)
+        if idx is not None:
+            if not self._active[idx]:
+                self._active[idx] = True
+                self._size += 1
+                self._present = None
+            return
+
+        idx = len(self._names)
+        if idx == len(self._lengths):
+            self._grow()
+        self._names.append(name)
+        self._ids[name] = idx
+        self._lengths[idx] = len(name)
+        self._histograms[idx] = _histogram(name)
+        self._active[idx] = True
+        self._size += 1
+        self._present = None
+
+        prefix, short = self._prefix(name)
+        for token in prefix:
+            self._postings.setdefault(token, []).append(idx)
+        if short:
+            self._short.setdefault(len(name), []).append(idx)
+
+    def remove(self, name: str) -> None:
+        """Remove a name from the index; unknown names are ignored."""
+        idx = self._ids.get(name)
+        if idx is not None and self._active[idx]:
+            self._active[idx] = False
+            self._size -= 1
+            self._present = None
+
+    def candidates(self, name: str, start: int = 0) -> List[str]:
+        """Return indexed names that might score at least ``min_ratio``.
+
+        Candidates are returned in insertion order and are a superset of the
+        real matches; callers still have to score them.  Names inserted
+        before position ``start`` are skipped.
+        """
+        low, high = self._length_window(len(name))
+        prefix, short = self._prefix(name)
+
+        arrays = []
+        for token in prefix:
+            ids = self._postings.get(token)
+            if ids:
+                arrays.append(self._posting_array(token, ids))
+        if short:
+            for length in range(low, high + 1):
+                ids = self._short.get(length)
+                if ids:
+                    arrays.append(self._posting_array(length, ids))
+        if not arrays:
+            return []
+
+        # Dedupe by marking hits on a scratch mask rather than sorting
+        hits = np.zeros(len(self._names), dtype=bool)
+        for array in arrays:
+            hits[array] = True
+        hits &= self._active[:len(hits)]
+        hits[:start] = False
+        ids = np.flatnonzero(hits)
+        lengths = self._lengths[ids]
+        ids = ids[(lengths >= low) & (lengths <= high)]
+        if not len(ids):
+            return []
+
+        # The LCS can't be longer than the characters the two names share.
+        overlap = np.minimum(self._histograms[ids], _histogram(name)).sum(axis=1)
+        ids = ids[200 * overlap >= self._bound * (len(name) + self._lengths[ids])]
+
+        names = self._names
+        return [names[idx] for idx in ids]
+
+    def matches(self, name: str, start: int = 0) -> List[Tuple[str, int]]:
+        """Return ``(other, ratio)`` for every indexed name at or above ``min_ratio``."""
+        candidates = self.candidates(name, start)
+        scores = ratio_scores(name, candidates)
+        return [
+            (other, int(ratio)) for other, ratio in zip(candidates, scores)
+            if ratio >= self.min_ratio
+        ]
+
+    def close(self) -> None:
+        """Nothing to release; lets callers close whatever build_match_lookup returned."""
+
+    def best_match(self, name: str) -> Optional[str]:
+        """Return the indexed name scoring highest against ``name``, if any reaches ``min_ratio``.
+
+        Ties go to the earliest inserted name, so the answer is the same as a
+        linear scan over the indexed names in insertion order.
+        """
+        if self._size <= _SCAN_LIMIT:
+            if self._present is None:
+                names = self._names
+                self._present = [names[idx] for idx in np.flatnonzero(self._active[:len(names)])]
+            candidates = self._present
+        else:
+            candidates = self.candidates(name)
+        scores = ratio_scores(name, candidates)
+        if not len(scores):
+            return None
+        best = int(np.argmax(scores))
+        return candidates[best] if scores[best] >= self.min_ratio else None
+
+
+_worker_index: Optional[SimilarityIndex] = None
+
+
+def _init_match_worker(names: List[str], min_ratio: int, active) -> None:
+    global _worker_index
+    _worker_index = SimilarityIndex(names, min_ratio=min_ratio)
+    # Share the parent's removals instead of tracking our own
+    _worker_index._active = np.frombuffer(active, dtype=bool)
+
+
+def _match_positions(positions: List[int]) -> List[List[Tuple[str, int]]]:
+    names = _worker_index._names
+    return [_worker_index.matches(names[position], position) for position in positions]
+
+
+class ParallelMatcher:
+    """SimilarityIndex lookups computed ahead of time on a process pool.
+
+    Callers walk the names in insertion order, asking for the matches of
+    each name that is still present and removing the ones they claim, just
+    as they would with a SimilarityIndex.  When a name's matches are needed
+    the matcher also looks up the next ``batch_size`` present names, spread
+    over ``workers`` processes.  Workers see the caller's removals through a
+    shared mask and only look at names after the one queried (earlier names
+    have all been visited by then); anything removed while a batch was
+    waiting to be used is filtered out on the way back, so the results are
+    identical to the serial index.
+    """
+
+    def __init__(self, names: Iterable[str], min_ratio: int = 86, workers: int = 2,
+                 batch_size: int = 64):
+        # Only imported once a pool is actually wanted
+        import ctypes
+        from concurrent.futures import ProcessPoolExecutor
+        from multiprocessing.sharedctypes import RawArray
+        self._names = list(dict.fromkeys(names))
+        self._positions = {name: position for position, name in enumerate(self._names)}
+        self._shared = RawArray(ctypes.c_bool, max(len(self._names), 1))
+        self._active = np.frombuffer(self._shared, dtype=bool)
+        self._active[:len(self._names)] = True
+        self._size = len(self._names)
+        self._workers = workers
+        self._batch_size = batch_size * workers
+        self._results: Dict[str, List[Tuple[str, int]]] = {}
+        self._pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_match_worker,
+                                         initargs=(self._names, min_ratio, self._shared))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, name: str) -> bool:
+        position = self._positions.get(name)
+        return position is not None and bool(self._active[position])
+
+    def remove(self, name: str) -> None:
+        position = self._positions.get(name)
+        if position is not None and self._active[position]:
+            self._active[position] = False
+            self._size -= 1
+
+    def close(self) -> None:
+        """Shut down the worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self) -> 'ParallelMatcher':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _run_ahead(self, position: int) -> None:
+        """Look up ``position`` and the next present names in parallel."""
+        ahead = np.flatnonzero(self._active[position + 1:len(self._names)])
+        positions = [position] + (ahead[:self._batch_size - 1] + position + 1).tolist()
+        chunk_size = -(-len(positions) // self._workers)
+        chunks = [positions[i:i + chunk_size] for i in range(0, len(positions), chunk_size)]
+
+        for chunk, results in zip(chunks, self._pool.map(_match_positions, chunks)):
+            for chunk_position, result in zip(chunk, results):
+                self._results[self._names[chunk_position]] = result
+
+        if positions[-1] == len(self._names) - 1:
+            self.close()
+
+    def matches(self, name: str) -> List[Tuple[str, int]]:
+        """Return ``(other, ratio)`` for every present name at or above ``min_ratio``."""
+        if name not in self._results:
+            position = self._positions.get(name)
+            if position is None:
+                return []
+            self._run_ahead(position)
+
+        active = self._active
+        positions = self._positions
+        return [match for match in self._results.pop(name) if active[positions[match[0]]]]
+
+
+def build_match_lookup(names: Iterable[str], min_ratio: int = 86, workers: int = 1):
+    """Return a SimilarityIndex, or a ParallelMatcher when ``workers`` > 1.
+
+    Both support ``matches``/``remove``/``in`` for callers that visit names in
+    insertion order, and return identical matches.  Call ``close`` when done,
+    so a matcher's worker processes are shut down.
+    """
+    if workers > 1:
+        return ParallelMatcher(names, min_ratio=min_ratio, workers=workers)
+    return SimilarityIndex(names, min_ratio=min_ratio)
+
+
+def group_similar_names(names: Iterable[str], threshold: int = 85, exact_match=None,
+                        desc: Optional[str] = None, workers: int = 1) -> Dict[str, List[str]]:
+    """Greedily group names whose fuzz.ratio exceeds ``threshold``.
+
+    Produces the same groups as comparing every name against every other:
+    names are visited in order, each unclaimed name starts a group and
+    claims every unclaimed name scoring above the threshold.  Names for
+    which ``exact_match`` returns True always form their own group.
+    With ``workers`` > 1 the scoring is spread over a process pool.
+    """
+    names = list(names)
+    if exact_match is None:
+        exact = set()
+    else:
+        exact = {name for name in names if exact_match(name)}
+    index = build_match_lookup((name for name in names if name not in exact),
+                               min_ratio=threshold + 1, workers=workers)
+
+    iterator = names
+    if desc and len(names) >= PROGRESS_MIN_NAMES:
+        from tqdm import tqdm
+        iterator = tqdm(names, desc=desc)
+
+    groups = {}
+    try:
+        for name in iterator:
+            if name in exact:
+                groups[name] = [name]
+                continue
+            if name not in index:
+                continue
+
+            index.remove(name)
+            group = [name]
+            for other, _ in index.matches(name):
+                group.append(other)
+                index.remove(other)
+            groups[name] = group
+    finally:
+        index.close()
+
+    return groups
@@ -0,0 +1,112 @@
+import pandas as pd
+from columnar import columnar_format, iter_columnar_chunks
+from typing import Dict, Iterator, Optional, Tuple
+
+# Only these columns are needed for the analysis; everything else in the
+# export is skipped while parsing.
+TRANSACTION_COLUMNS = ['Date', 'Amount', 'Description']
+TRANSACTION_DTYPES = {'Amount': 'float64', 'Description': 'str'}
+
+
+def read_transaction_chunks(path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Yield the Date/Amount/Description columns of a file in parsed chunks.
+
+    CSV column names are matched after stripping whitespace, like
+    analyze_transactions does for in-memory frames.  Parquet and Arrow
+    files are read in record batches and keep their stored dtypes.
+    """
+    if columnar_format(path) is not None:
+        for chunk in iter_columnar_chunks(path, TRANSACTION_COLUMNS, chunksize):
+            if not pd.api.types.is_datetime64_any_dtype(chunk['Date']):
+                chunk['Date'] = pd.to_datetime(chunk['Date'])
+            yield chunk
+        return
+
+    header = pd.read_csv(path, nrows=0).columns
+    names = {column.strip(): column for column in header}
+    missing = [column for column in TRANSACTION_COLUMNS if column not in names]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+    dtypes = {names[column]: dtype for column, dtype in TRANSACTION_DTYPES.items()}
+    usecols = [names[column] for column in TRANSACTION_COLUMNS]
+    for chunk in pd.read_csv(path, usecols=usecols, dtype=dtypes, chunksize=chunksize):
+        chunk.columns = chunk.columns.str.strip()
+        chunk['Date'] = pd.to_datetime(chunk['Date'])
+        yield chunk
+
+
+class DescriptionTotals:
+    """Running per-description totals over chunks of transactions.
+
+    Company and Category are both functions of the raw description, so every
+    figure in the report can be rebuilt from these totals once the distinct
+    descriptions are known.  Memory grows with the number of distinct
+    descriptions, not with the number of rows.
+    """
+
+    COLUMNS = ['Total_Amount', 'Transaction_Count', 'Deposits', 'Withdrawals', 'Withdrawal_Count']
+
+    def __init__(self):
+        self.totals = pd.DataFrame(columns=self.COLUMNS, index=pd.Index([], name='Description'))
+        self.start_date: Optional[pd.Timestamp] = None
+        self.end_date: Optional[pd.Timestamp] = None
+        self.rows = 0
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        """Fold a chunk of Date/Amount/Description rows into the totals."""
+        if chunk.empty:
+            return
+        amounts = chunk['Amount']
+        frame = pd.DataFrame({
+            'Description': chunk['Description'],
+            'Total_Amount': amounts,
+            'Transaction_Count': 1,
+            'Deposits': amounts.where(amounts > 0, 0.0),
+            'Withdrawals': amounts.where(amounts < 0, 0.0),
+            'Withdrawal_Count': (amounts < 0).astype('int64'),
+        })
+        self._fold(frame.groupby('Description', sort=False).sum(),
+                   chunk['Date'].min(), chunk['Date'].max(), len(chunk))
+
+    def merge(self, other: 'DescriptionTotals') -> None:
+        """Fold another set of totals into these ones."""
+        if other.rows:
+            self._fold(other.totals, other.start_date, other.end_date, other.rows)
+
+    def _fold(self, partial: pd.DataFrame, start: pd.Timestamp, end: pd.Timestamp, rows: int) -> None:
+        if self.totals.empty:
+            self.totals = partial
+        else:
+            # sort=False keeps descriptions in order of first appearance
+            self.totals = pd.concat([self.totals, partial]).groupby(level=0, sort=False).sum()
+
+        self.start_date = start if self.start_date is None else min(self.start_date, start)
+        self.end_date = end if self.end_date is None else max(self.end_date, end)
+        self.rows += rows
+
+    @property
+    def months(self) -> float:
+        return (self.end_date - self.start_date).days / 30.44
+
+    def total_flows(self) -> Tuple[float, float]:
+        """Return total deposits and withdrawals, like calculate_total_flows."""
+        return self.totals['Deposits'].sum(), abs(self.totals['Withdrawals'].sum())
+
+    def company_spending(self, companies: Dict[str, str]) -> pd.DataFrame:
+        """Total amount and count per company, given description -> company."""
+        totals = self.totals[['Total_Amount', 'Transaction_Count']]
+        spending = totals.groupby(totals.index.map(companies)).sum()
+        spending.index.name = 'Company'
+        return spending.reset_index()
+
+    def category_flows(self, categories: Dict[str, str]) -> pd.DataFrame:
+        """Outflow total and count per category, like calculate_category_flows."""
+        outflows = self.totals[self.totals['Withdrawal_Count'] > 0]
+        flows = outflows[['Withdrawals', 'Withdrawal_Count']].groupby(
+            outflows.index.map(categories)).sum()
+        flows.index.name = 'Category'
+        flows = flows.reset_index()
+        flows.columns = ['Category', 'Total_Amount', 'Transaction_Count']
+        flows['Total_Amount'] = abs(flows['Total_Amount'])
+        return flows
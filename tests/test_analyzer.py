@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from analyzer import Analyzer
+from benchmark import generate_transactions
+
+THREADS = 8
+
+
+def _frames():
+    return [generate_transactions(1500, seed=seed) for seed in range(4)]
+
+
+def _summary(analyzer, result):
+    """The parts of a result that corruption would show up in, as plain values."""
+    return (
+        result.start_date, result.end_date, result.total_flows,
+        result.transactions[['Normalized_Description', 'Company', 'Category']].astype(object).values.tolist(),
+        result.spending.values.tolist(),
+        result.category_flows.values.tolist(),
+        result.recurring.values.tolist(),
+        result.anomalies.values.tolist(),
+        analyzer.render(result, 'json'),
+    )
+
+
+def _analyze(analyzer, df):
+    return _summary(analyzer, analyzer.analyze(df, rollup='month', recurring=True, anomalies=True,
+                                               forecast=2))
+
+
+def test_concurrent_analyses_match_serial_ones():
+    frames = _frames()
+    originals = [df.copy() for df in frames]
+    expected = [_analyze(Analyzer(), df) for df in frames]
+
+    analyzer = Analyzer()
+    jobs = [frames[i % len(frames)] for i in range(THREADS * 3)]
+    with ThreadPoolExecutor(THREADS) as pool:
+        results = list(pool.map(lambda df: _analyze(analyzer, df), jobs))
+
+    for i, result in enumerate(results):
+        assert result == expected[i % len(frames)]
+    for df, original in zip(frames, originals):
+        pd.testing.assert_frame_equal(df, original)
+
+
+def test_concurrent_analyses_share_a_cache(tmp_path):
+    frames = _frames()
+    analyzer = Analyzer(cache_path=str(tmp_path / 'cache.sqlite'))
+    try:
+        # Every thread misses the empty cache on the same frame at once
+        with ThreadPoolExecutor(THREADS) as pool:
+            first = list(pool.map(lambda df: _analyze(analyzer, df), [frames[0]] * THREADS))
+        uncached = _analyze(Analyzer(), frames[0])
+        assert all(result == uncached for result in first)
+
+        # Later frames build on what is cached, so compare with the same cache used serially
+        expected = [_analyze(analyzer, df) for df in frames]
+        jobs = [frames[i % len(frames)] for i in range(THREADS * 2)]
+        with ThreadPoolExecutor(THREADS) as pool:
+            results = list(pool.map(lambda df: _analyze(analyzer, df), jobs))
+    finally:
+        analyzer.close()
+
+    for i, result in enumerate(results):
+        assert result == expected[i % len(frames)]
@@ -0,0 +1,53 @@
+import pandas as pd
+
+from anomalies import find_anomalies
+
+
+def _transactions(rows):
+    frame = pd.DataFrame(rows, columns=['Date', 'Amount', 'Company'])
+    frame['Date'] = pd.to_datetime(frame['Date'])
+    frame['Description'] = frame['Company'].fillna('') + ' PURCHASE'
+    return frame
+
+
+def _weekly(company, amounts, start='2024-01-01'):
+    dates = pd.date_range(start, periods=len(amounts), freq='7D')
+    return [(date, -amount, company) for date, amount in zip(dates, amounts)]
+
+
+def test_identical_charges_within_a_few_days_are_duplicates():
+    anomalies = find_anomalies(_transactions([
+        ('2024-03-01', -42.50, 'GYM'),
+        ('2024-03-02', -42.50, 'GYM'),
+        ('2024-03-20', -42.50, 'GYM'),
+        ('2024-03-02', -42.50, 'CAFE'),
+        ('2024-03-03', -42.51, 'CAFE'),
+    ]))
+    assert anomalies[['Company', 'Kind']].values.tolist() == [['GYM', 'duplicate']]
+    assert anomalies['Date'].tolist() == [pd.Timestamp('2024-03-02')]
+    assert anomalies['Detail'].tolist() == ['1 day after an identical charge on 2024-03-01']
+
+
+def test_charges_far_above_the_usual_amounts_are_unusual():
+    usual = [10.0, 11.0, 9.5, 10.5, 12.0, 9.0, 10.0, 11.5, 10.0, 9.75, 10.25, 11.0]
+    rows = _weekly('DELI', usual + [100.0]) + _weekly('BAKERY', usual + [18.0])
+    anomalies = find_anomalies(_transactions(rows))
+    assert anomalies[['Company', 'Charge', 'Kind']].values.tolist() == [['DELI', 100.0, 'unusual']]
+    assert anomalies['Detail'].str.startswith('usually under $').all()
+
+    # 2.5 times the usual amount clears min_ratio and the default threshold, not a looser one
+    bakery = _transactions(_weekly('BAKERY', usual + [25.0]))
+    assert find_anomalies(bakery)['Kind'].tolist() == ['unusual']
+    assert find_anomalies(bakery, sigmas=50.0).empty
+    # Too little history to judge
+    assert find_anomalies(_transactions(_weekly('DELI', usual[:5] + [100.0]))).empty
+
+
+def test_withdrawals_without_a_company_or_date_are_skipped():
+    rows = _weekly('DELI', [10.0] * 12 + [100.0]) + [
+        ('2024-02-01', -12.0, None),
+        ('2024-02-02', -12.0, None),
+        (None, -7.0, 'DELI'),
+    ]
+    anomalies = find_anomalies(_transactions(rows))
+    assert anomalies[['Company', 'Kind']].values.tolist() == [['DELI', 'unusual']]
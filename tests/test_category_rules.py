@@ -0,0 +1,63 @@
+import json
+import os
+
+import pytest
+
+from benchmark import generate_category_table, generate_descriptions
+from category_rules import CategoryRules, RuleFile, parse_rules
+
+
+def _write_rules(directory, table):
+    path = os.path.join(directory, 'rules.json')
+    with open(path, 'w') as f:
+        json.dump(table, f)
+    return path
+
+
+def _cache_files(cache_dir):
+    return [os.path.join(cache_dir, name) for name in os.listdir(cache_dir)]
+
+
+def test_cached_rules_label_like_compiled_rules(tmp_path):
+    table = generate_category_table(300)
+    path = _write_rules(tmp_path, table)
+    cache_dir = str(tmp_path / 'cache')
+    compiled = RuleFile(path, cache_dir).rules
+
+    (cache_file,) = _cache_files(cache_dir)
+    assert cache_file.endswith('.json')
+    cached = RuleFile(path, cache_dir).rules
+    assert cached is not compiled
+    assert cached.rules == compiled.rules
+    assert cached.tooltips == compiled.tooltips
+    for description in generate_descriptions(2000, 500):
+        assert cached.label(description.upper()) == compiled.label(description.upper())
+
+
+@pytest.mark.parametrize('content', [
+    'not json',
+    '[1, 2, 3]',
+    '{"rules": [["FOOD", ["PIZZA"]]], "automaton": {"labels": ["FOOD"], "goto": [{"P": 7}],'
+    ' "fail": [0], "best": [-1]}}',
+    '{"rules": [["FOOD", ["PIZZA"]]], "automaton": {"labels": ["OTHER"], "goto": [{}],'
+    ' "fail": [0], "best": [-1]}}',
+])
+def test_bad_cache_files_are_recompiled(tmp_path, content):
+    path = _write_rules(tmp_path, {'FOOD': ['pizza'], 'COFFEE': ['starbucks']})
+    cache_dir = str(tmp_path / 'cache')
+    RuleFile(path, cache_dir)
+    (cache_file,) = _cache_files(cache_dir)
+    with open(cache_file, 'w') as f:
+        f.write(content)
+
+    rules = RuleFile(path, cache_dir).rules
+    assert rules.rules == parse_rules(json.dumps({'FOOD': ['pizza'], 'COFFEE': ['starbucks']}), 'json')
+    assert rules.label('DOMINOS PIZZA') == 'FOOD'
+    assert rules.label('STARBUCKS 123') == 'COFFEE'
+
+
+def test_round_trip_through_plain_data():
+    rules = CategoryRules([('FOOD', ['PIZZA', 'DELI']), ('COFFEE', ['STARBUCKS'])])
+    rebuilt = CategoryRules.from_dict(json.loads(json.dumps(rules.to_dict())))
+    assert rebuilt.rules == rules.rules
+    assert rebuilt.label('STARBUCKS DELI') == rules.label('STARBUCKS DELI') == 'FOOD'
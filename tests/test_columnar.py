@@ -0,0 +1,38 @@
+import io
+import json
+from contextlib import redirect_stdout
+
+import pandas as pd
+import pytest
+
+import script
+from benchmark import generate_transactions
+from columnar import ANALYZED_COLUMNS, is_analyzed, read_transactions
+
+
+def _fail(*args, **kwargs):
+    raise AssertionError("analyzed input was normalized or categorized again")
+
+
+@pytest.mark.parametrize('extension', ['parquet', 'arrow'])
+def test_saved_analysis_is_read_back_typed_and_not_redone(tmp_path, monkeypatch, extension):
+    csv_path = tmp_path / 'transactions.csv'
+    generate_transactions(2000, seed=4).to_csv(csv_path, index=False)
+    saved = str(tmp_path / f'analyzed.{extension}')
+    with redirect_stdout(io.StringIO()):
+        expected = script.analyze_transactions(read_transactions(str(csv_path)), 'json', save_analyzed=saved)
+
+    df = read_transactions(saved)
+    assert list(df.columns) == ANALYZED_COLUMNS
+    assert is_analyzed(df)
+    assert pd.api.types.is_datetime64_any_dtype(df['Date'])
+    assert df['Amount'].dtype == 'float64'
+    for column in ('Description', 'Normalized_Description', 'Company', 'Category'):
+        assert isinstance(df[column].dtype, pd.CategoricalDtype), column
+
+    monkeypatch.setattr(script, 'resolve_companies', _fail)
+    monkeypatch.setattr(script, 'categorize_descriptions', _fail)
+    with redirect_stdout(io.StringIO()) as log:
+        report = script.analyze_transactions(df, 'json')
+    assert "skipping normalization" in log.getvalue()
+    assert json.loads(report) == json.loads(expected)
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecast import (_full_months, compare_budget, forecast_months, forecast_spending, smoothing_forecast,
+                      trend_forecast)
+
+
+@pytest.mark.parametrize('method', [smoothing_forecast, trend_forecast])
+def test_constant_series_stay_flat(method):
+    history = np.tile([[40.0, 0.0, 125.5]], (12, 1))
+    np.testing.assert_allclose(method(history, 3), np.tile([[40.0, 0.0, 125.5]], (3, 1)))
+
+
+def test_trend_forecast_extends_a_line():
+    history = np.column_stack([10.0 + 5.0 * np.arange(12), 100.0 - 2.0 * np.arange(12)])
+    np.testing.assert_allclose(trend_forecast(history, 2), [[70.0, 76.0], [75.0, 74.0]])
+
+
+def test_smoothing_forecast_follows_a_trend_with_damping():
+    history = (10.0 + 5.0 * np.arange(24))[:, None]
+    projected = smoothing_forecast(history, 3)[:, 0]
+    # Rising from the last value of 125, each month by less than the trend's 5 and less than the month before
+    steps = np.diff(np.r_[history[-1], projected])
+    assert np.all(steps > 0) and np.all(steps < 5.0)
+    assert np.all(np.diff(steps) < 0)
+
+
+def test_partial_first_and_last_months_are_not_fitted():
+    periods = pd.period_range('2024-01', '2024-06', freq='M')
+    assert _full_months(periods, pd.Timestamp('2024-01-15'), pd.Timestamp('2024-06-10')) == slice(1, 5)
+    assert _full_months(periods, pd.Timestamp('2024-01-01'), pd.Timestamp('2024-06-30 14:00')) == slice(0, 6)
+    # Too few full months left: fit on everything
+    short = pd.period_range('2024-01', '2024-02', freq='M')
+    assert _full_months(short, pd.Timestamp('2024-01-15'), pd.Timestamp('2024-02-10')) == slice(0, 2)
+
+
+def test_compare_budget_matches_categories_then_companies():
+    forecast = pd.DataFrame({
+        'Kind': ['category', 'category', 'company'],
+        'Name': ['Shopping', 'Food & Dining', 'WALMART'],
+        'Average': [300.0, 200.0, 80.0],
+        'Last_Month': [320.0, 210.0, 90.0],
+        '2024-07': [310.0, 190.0, 85.0],
+        '2024-08': [305.0, 195.0, 86.0],
+    })
+    assert forecast_months(forecast) == ['2024-07', '2024-08']
+    comparison = compare_budget(forecast, {'Shopping': 250.0, 'WALMART': 100.0, 'Travel': 50.0})
+    assert comparison.to_dict('list') == {
+        'Name': ['Shopping', 'WALMART', 'Travel'],
+        'Budget': [250.0, 100.0, 50.0],
+        'Average': [300.0, 80.0, 0.0],
+        'Last_Month': [320.0, 90.0, 0.0],
+        'Projected': [310.0, 85.0, 0.0],
+        'Remaining': [-60.0, 15.0, 50.0],
+        'Status': ['Over', 'Under', 'Under'],
+    }
+
+
+def test_forecast_leaves_out_rows_without_a_company():
+    rows = [('2024-0%d-05' % month, 2000.0, 'PAYROLL DEPOSIT ACME') for month in range(1, 5)]
+    rows += [('2024-0%d-10' % month, -10.0, 'TARGET 1234') for month in range(1, 5)]
+    rows += [('2024-02-15', -12.0, None)]
+    df = pd.DataFrame(rows, columns=['Date', 'Amount', 'Company']).assign(Category='Shopping')
+    df['Date'] = pd.to_datetime(df['Date'])
+    forecast = forecast_spending(df, 2, 'trend')
+    assert forecast[['Kind', 'Name', 'Average']].values.tolist() == [
+        ['category', 'Shopping', 10.0],
+        ['company', 'TARGET 1234', 10.0],
+    ]
@@ -0,0 +1,77 @@
+import io
+import json
+from contextlib import redirect_stdout
+
+import pandas as pd
+import pytest
+
+from benchmark import generate_transactions
+from incremental import AnalysisState
+from script import analyze_transactions_incremental, analyze_transactions_streaming
+from streaming import DescriptionTotals, read_transaction_chunks
+
+
+@pytest.fixture(scope='module')
+def history():
+    df = generate_transactions(3000, seed=7)
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df.sort_values('Date', kind='stable').reset_index(drop=True)
+
+
+def _write(directory, name, df):
+    path = directory / name
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def test_rows_on_or_before_the_watermark_are_skipped(tmp_path):
+    state = AnalysisState(str(tmp_path / 'state.sqlite'))
+    assert state.watermark is None
+    first = pd.DataFrame({'Date': pd.to_datetime(['2024-01-01', '2024-01-05']), 'Amount': [-5.0, -7.0],
+                          'Description': ['CAFE', 'DELI']})
+    totals = DescriptionTotals()
+    totals.add(first)
+    state.update(totals)
+    assert state.watermark == pd.Timestamp('2024-01-05')
+
+    chunk = pd.DataFrame({'Date': pd.to_datetime(['2024-01-04', '2024-01-05', '2024-01-06']),
+                          'Amount': [-1.0, -2.0, -3.0], 'Description': ['OLD', 'SAME DAY', 'NEW']})
+    (kept,) = state.new_rows([chunk])
+    assert kept['Description'].tolist() == ['NEW']
+    state.close()
+
+
+def test_state_survives_closing_and_reopening(tmp_path, history):
+    path = _write(tmp_path, 'history.csv', history)
+    expected = DescriptionTotals()
+    for chunk in read_transaction_chunks(path, 500):
+        expected.add(chunk)
+
+    state = AnalysisState(str(tmp_path / 'state.sqlite'))
+    state.update(expected)
+    state.close()
+
+    reopened = AnalysisState(str(tmp_path / 'state.sqlite'))
+    loaded = reopened.load()
+    reopened.close()
+    pd.testing.assert_frame_equal(loaded.totals, expected.totals, check_dtype=False)
+    assert (loaded.rows, loaded.start_date, loaded.end_date) == (expected.rows, expected.start_date,
+                                                                 expected.end_date)
+
+
+def test_new_days_are_added_to_the_saved_totals(tmp_path, history):
+    cutoff = history['Date'].iloc[len(history) // 2].normalize()
+    older = _write(tmp_path, 'older.csv', history[history['Date'] <= cutoff])
+    # The later export repeats the older days, which must not be counted twice
+    everything = _write(tmp_path, 'everything.csv', history)
+    state_path = str(tmp_path / 'state.sqlite')
+
+    with redirect_stdout(io.StringIO()):
+        for path in (older, everything):
+            state = AnalysisState(state_path)
+            try:
+                report = analyze_transactions_incremental(path, state, 'json', chunksize=400)
+            finally:
+                state.close()
+        expected = analyze_transactions_streaming(everything, 'json', chunksize=400)
+    assert json.loads(report) == json.loads(expected)
@@ -0,0 +1,48 @@
+import pytest
+
+import baseline_normalization as baseline
+from benchmark import generate_transactions
+from normalize_company import resolve_companies
+
+DESCRIPTIONS = [
+    "WALMART.COM 8009256278 702 SW 8TH ST BENTONVILLE, AR, US",
+    "WALMART 800 BENTONVILLE",
+    "WALMART WALMART.COM",
+    "WAL-MART #2637",
+    "WM SUPERCENTER #1129",
+    "SAMSCLUB #4711",
+    "DD DOORDASH CHIPOTLE",
+    "DOORDASH*MCDONALDS",
+    "ZELLE TO SMITH JOHN",
+    "ZELLE FROM SMITH JOHN",
+    "INTERNET TRANSFER TO CHECKING 1234",
+    "NETFLIX.COM",
+    "NETFLIX COM",
+    "SPOTIFY USA",
+    "SPOTIFY US",
+    "AMZN MKTP US*2K3L45",
+    "AMZN MKTP US*9Z8Y76",
+    "TARGET T-1234 AUSTIN TX",
+    "TARGET 00012345 AUSTIN TX",
+    "",
+]
+
+
+def _row_order_descriptions(seed: int, rows: int = 3000):
+    """Distinct descriptions of a generated export, in order of first appearance."""
+    df = generate_transactions(rows, seed=seed)
+    return list(dict.fromkeys(df['Description'].tolist()))
+
+
+@pytest.mark.parametrize('descriptions', [
+    DESCRIPTIONS,
+    _row_order_descriptions(seed=0),
+    _row_order_descriptions(seed=1),
+], ids=['hand-written', 'generated-0', 'generated-1'])
+def test_resolve_companies_matches_original_pipeline(descriptions):
+    assert resolve_companies(descriptions, verbose=False) == baseline.resolve_companies(descriptions)
+
+
+def test_parallel_matching_matches_original_pipeline():
+    descriptions = _row_order_descriptions(seed=2)
+    assert resolve_companies(descriptions, workers=2, verbose=False) == baseline.resolve_companies(descriptions)
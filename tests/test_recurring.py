@@ -0,0 +1,25 @@
+import pandas as pd
+
+from recurring import find_recurring
+
+MONTHLY = list(pd.date_range('2024-01-05', periods=6, freq='MS') + pd.Timedelta(days=4))
+
+
+def _transactions(rows):
+    return pd.DataFrame(rows, columns=['Date', 'Amount', 'Company']).assign(Category='Entertainment')
+
+
+def test_active_is_measured_against_the_last_date_of_the_data():
+    charges = [(date, -9.99, 'NETFLIX') for date in MONTHLY]
+    recent = find_recurring(_transactions(charges))
+    assert recent['Active'].tolist() == [True]
+
+    # A deposit months after the last charge shows the subscription has lapsed
+    lapsed = find_recurring(_transactions(charges + [(pd.Timestamp('2024-12-31'), 2500.0, 'PAYROLL')]))
+    assert lapsed['Active'].tolist() == [False]
+
+
+def test_withdrawals_without_a_company_are_not_a_series():
+    rows = [(date, -9.99, 'NETFLIX') for date in MONTHLY] + [(date, -5.0, None) for date in MONTHLY]
+    recurring = find_recurring(_transactions(rows))
+    assert recurring['Company'].tolist() == ['NETFLIX']
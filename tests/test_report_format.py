@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from report_format import format_currency, format_text_table, top_rows
+
+
+def _currency(value):
+    """The float_format text reports were rendered with before format_text_table."""
+    return '${:,.2f}'.format(value)
+
+
+def _spending(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    # Few distinct totals, so many companies tie
+    totals = rng.choice([5.0, 12.5, 99.99, 250.0, 1234.56, 1e6 + 0.005], rows)
+    return pd.DataFrame({
+        'Company': [f'COMPANY {i}' + ' X' * int(rng.integers(0, 8)) for i in range(rows)],
+        'Total_Amount': totals * rng.choice([-1.0, 1.0], rows),
+        'Transaction_Count': rng.integers(1, 5000, rows),
+    })
+
+
+@pytest.mark.parametrize('rows, limit', [(10, 3), (500, 40), (5000, 40), (5000, 1), (50, 50), (50, None)])
+def test_top_rows_order_matches_pandas_with_ties(rows, limit):
+    # Plain sort_values is an unstable quicksort past a few rows, so ties are compared
+    # against the orders pandas does define: nlargest(keep='first') and a stable sort
+    spending = _spending(rows).assign(Total_Amount=lambda frame: frame['Total_Amount'].abs())
+    chosen = top_rows(spending, 'Total_Amount', limit)
+    count = rows if limit is None else limit
+    pd.testing.assert_frame_equal(chosen, spending.nlargest(count, 'Total_Amount', keep='first'))
+    pd.testing.assert_frame_equal(
+        chosen, spending.sort_values('Total_Amount', ascending=False, kind='stable').head(count))
+
+
+def test_text_table_matches_to_string():
+    spending = _spending(300, seed=3)
+    spending['Monthly_Average'] = spending['Total_Amount'] / 7.3
+    spending['Yearly_Average'] = spending['Monthly_Average'] * 12
+    shown = top_rows(spending.assign(Total_Amount=spending['Total_Amount'].abs()), 'Total_Amount', 120)
+    currency = ['Total_Amount', 'Monthly_Average', 'Yearly_Average']
+    assert format_text_table(shown, currency) == shown.to_string(float_format=_currency)
+    assert format_text_table(shown.head(1), currency) == shown.head(1).to_string(float_format=_currency)
+    empty = shown.iloc[:0]
+    assert format_text_table(empty, currency) == empty.to_string(float_format=_currency)
+
+
+def test_currency_matches_the_float_format():
+    values = [0.0, -0.004, 0.005, 1234.5, -98765.4321, 1e9 + 0.125]
+    assert format_currency(np.array(values)) == [_currency(value) for value in values]
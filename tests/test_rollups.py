@@ -0,0 +1,32 @@
+import io
+
+import pandas as pd
+
+from analyzer import Analyzer
+from rollups import Rollups
+
+CSV = """Date,Amount,Description
+2024-01-05,2000,PAYROLL DEPOSIT ACME
+2024-01-10,-10,TARGET 1234
+2024-01-15,-12,
+2024-02-05,2000,PAYROLL DEPOSIT ACME
+2024-02-10,-10,TARGET 1234
+,-7,TARGET 1234
+"""
+
+
+def _analyzed():
+    return Analyzer().analyze(pd.read_csv(io.StringIO(CSV)), rollup='month').transactions
+
+
+def test_rows_without_a_company_or_date_are_left_out():
+    rollups = Rollups(_analyzed(), 'month')
+    companies = rollups.companies_by_period()
+    assert list(companies.index) == ['2024-01', '2024-02']
+    assert companies.to_dict() == {
+        'PAYROLL DEPOSIT ACME': {'2024-01': 2000.0, '2024-02': 2000.0},
+        'TARGET 1234': {'2024-01': 10.0, '2024-02': 10.0},
+    }
+    assert rollups.categories_by_period().sum(axis=1).tolist() == [10.0, 10.0]
+    assert rollups.companies_by_period(counts=True).to_numpy().sum() == 4
+
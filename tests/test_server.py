@@ -0,0 +1,123 @@
+import asyncio
+import io
+import json
+import socket
+import threading
+import time
+from contextlib import redirect_stdout
+
+import pandas as pd
+import pytest
+
+from benchmark import generate_transactions
+from script import analyze_transactions
+from server import AnalysisServer, UnixHTTPConnection, request_report
+
+
+@pytest.fixture(scope='module')
+def server(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('server')
+    socket_path = str(directory / 'analyzer.sock')
+    analysis_server = AnalysisServer(workers=1)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    serving = asyncio.run_coroutine_threadsafe(analysis_server.serve(socket_path=socket_path), loop)
+    deadline = time.monotonic() + 30
+    while not (directory / 'analyzer.sock').exists():
+        assert time.monotonic() < deadline and not serving.done(), "server did not start"
+        time.sleep(0.05)
+    try:
+        yield analysis_server, socket_path, directory
+    finally:
+        asyncio.run_coroutine_threadsafe(_cancel_tasks(), loop).result(10)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(10)
+        loop.close()
+        analysis_server.close()
+
+
+async def _cancel_tasks():
+    """Stop serve_forever and any connection handlers still running."""
+    tasks = asyncio.all_tasks() - {asyncio.current_task()}
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _write_csv(directory, name, df):
+    path = str(directory / name)
+    df.to_csv(path, index=False)
+    return path
+
+
+def _request(socket_path, method, target):
+    connection = UnixHTTPConnection(socket_path, timeout=60)
+    try:
+        connection.request(method, target)
+        response = connection.getresponse()
+        return response.status, response.read().decode('utf-8')
+    finally:
+        connection.close()
+
+
+def _raw_status(socket_path, request):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(60)
+        client.connect(socket_path)
+        client.sendall(request)
+        return int(client.recv(4096).split(b' ', 2)[1])
+
+
+@pytest.mark.parametrize('output_format', ['json', 'text'])
+def test_reports_match_the_command_line(server, output_format):
+    _, socket_path, directory = server
+    df = generate_transactions(2000, seed=5)
+    path = _write_csv(directory, f'upload_{output_format}.csv', df)
+    with redirect_stdout(io.StringIO()):
+        expected = analyze_transactions(pd.read_csv(path), output_format)
+
+    # Twice, so the second answer can't lean on names kept from the first
+    for _ in range(2):
+        status, report = request_report(path, output_format, socket_path=socket_path, timeout=120)
+        assert status == 200
+        if output_format == 'json':
+            assert json.loads(report) == json.loads(expected)
+        else:
+            assert report == expected
+
+
+def test_uploads_do_not_share_company_names(server):
+    _, socket_path, directory = server
+    first = _write_csv(directory, 'first.csv', generate_transactions(1500, seed=1))
+    second = _write_csv(directory, 'second.csv', generate_transactions(1500, seed=2))
+    with redirect_stdout(io.StringIO()):
+        expected = json.loads(analyze_transactions(pd.read_csv(second), 'json'))
+
+    assert request_report(first, 'json', socket_path=socket_path, timeout=120)[0] == 200
+    status, report = request_report(second, 'json', socket_path=socket_path, timeout=120)
+    assert status == 200
+    assert json.loads(report) == expected
+
+
+def test_status_codes(server):
+    analysis_server, socket_path, directory = server
+    assert _request(socket_path, 'GET', '/health') == (200, '{"status": "ok"}')
+    assert _request(socket_path, 'GET', '/nowhere')[0] == 404
+    assert _request(socket_path, 'GET', '/analyze')[0] == 405
+
+    good = _write_csv(directory, 'good.csv', generate_transactions(50, seed=3))
+    assert request_report(good, 'xml', socket_path=socket_path)[0] == 400
+    missing = _write_csv(directory, 'missing.csv', pd.DataFrame({'Date': ['2024-01-01'], 'Amount': [-5]}))
+    status, report = request_report(missing, 'json', socket_path=socket_path)
+    assert (status, report) == (400, 'Missing required columns: Description')
+    for length in (b'abc', b'-5', b'1e3'):
+        request = b'POST /analyze HTTP/1.1\r\nContent-Length: ' + length + b'\r\n\r\n'
+        assert _raw_status(socket_path, request) == 400
+
+    limit = analysis_server.max_upload
+    analysis_server.max_upload = 1024
+    try:
+        assert request_report(good, 'json', socket_path=socket_path)[0] == 413
+    finally:
+        analysis_server.max_upload = limit
@@ -0,0 +1,28 @@
+import io
+import json
+from contextlib import redirect_stdout
+
+import pytest
+
+from benchmark import generate_transactions
+from columnar import read_transactions
+from script import analyze_transactions, analyze_transactions_streaming
+
+
+@pytest.fixture(scope='module')
+def transactions_csv(tmp_path_factory):
+    path = tmp_path_factory.mktemp('streaming') / 'transactions.csv'
+    generate_transactions(3000, seed=11).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize('output_format', ['text', 'json', 'html'])
+def test_chunked_report_matches_the_in_memory_one(transactions_csv, output_format):
+    with redirect_stdout(io.StringIO()):
+        expected = analyze_transactions(read_transactions(transactions_csv), output_format)
+        # Chunks that split the file unevenly, with descriptions spanning several of them
+        streamed = analyze_transactions_streaming(transactions_csv, output_format, chunksize=701)
+    if output_format == 'json':
+        assert json.loads(streamed) == json.loads(expected)
+    else:
+        assert streamed == expected
@@ -1,17 +1,36 @@
 from datetime import datetime, timedelta
 import pandas as pd
-from html_template import HTMLTemplate
+from profiling import stage
+
+def calculate_total_flows(df):
+    """Return total deposits and withdrawals (as a positive amount)."""
+    with stage('total_flows', rows=len(df)):
+        deposits = df[df['Amount'] > 0]['Amount'].sum()
+        withdrawals = abs(df[df['Amount'] < 0]['Amount'].sum())
+    return deposits, withdrawals
 
 def get_total_flows(df, output_format='text'):
-    """Calculate and display total money flows with monthly and yearly averages."""
+    """Calculate total money flows and render them with monthly and yearly averages."""
     months = (df['Date'].max() - df['Date'].min()).days / 30.44
-    years = months / 12
+    deposits, withdrawals = calculate_total_flows(df)
+    return render_total_flows(deposits, withdrawals, months, output_format)
+
+def render_total_flows(deposits, withdrawals, months, output_format='text'):
+    """Render precomputed money flows with monthly and yearly averages.
     
-    deposits = df[df['Amount'] > 0]['Amount'].sum()
-    withdrawals = abs(df[df['Amount'] < 0]['Amount'].sum())
+    Returns text, an HTML card or (for 'json') a dict of plain floats.
+    """
+    years = months / 12
     net = deposits - withdrawals
     
+    if output_format == 'json':
+        return {
+            'deposits': round(float(deposits), 2),
+            'withdrawals': round(float(withdrawals), 2),
+            'net': round(float(net), 2),
+        }
     if output_format == 'html':
+        from html_template import HTMLTemplate
         template = HTMLTemplate()
         
         # Format rows with proper currency formatting
@@ -38,12 +57,13 @@ def get_total_flows(df, output_format='text'):
         
         return content
     else:
-        # Text output remains unchanged
-        print("\nTotal Flows:")
-        print(f"                   Total      Monthly Avg    Yearly Avg")
-        print(f"Deposits:     ${deposits:,.2f}   ${deposits/months:,.2f}   ${deposits/years:,.2f}")
-        print(f"Withdrawals:  ${withdrawals:,.2f}   ${withdrawals/months:,.2f}   ${withdrawals/years:,.2f}")
-        print(f"Net Flow:     ${net:,.2f}   ${net/months:,.2f}   ${net/years:,.2f}")
+        return "\n".join([
+            "\nTotal Flows:",
+            f"                   Total      Monthly Avg    Yearly Avg",
+            f"Deposits:     ${deposits:,.2f}   ${deposits/months:,.2f}   ${deposits/years:,.2f}",
+            f"Withdrawals:  ${withdrawals:,.2f}   ${withdrawals/months:,.2f}   ${withdrawals/years:,.2f}",
+            f"Net Flow:     ${net:,.2f}   ${net/months:,.2f}   ${net/years:,.2f}",
+        ])
 
 def create_test_data(days=30):
     """Create a test DataFrame spanning the specified number of days."""
@@ -69,7 +89,7 @@ def test_total_flows():
         'Date': [datetime(2024, 1, 1), datetime(2024, 1, 31)],
         'Amount': [100, -50]
     })
-    get_total_flows(df)
+    print(get_total_flows(df))
     
     # Test 2: Zero sums test
     print("\nTest 2: Zero sums test")
@@ -77,7 +97,7 @@ def test_total_flows():
         'Date': [datetime(2024, 1, 1), datetime(2024, 1, 31)],
         'Amount': [100, -100]
     })
-    get_total_flows(df)
+    print(get_total_flows(df))
     
     # Test 3: HTML output test
     print("\nTest 3: HTML output test")
@@ -89,7 +109,7 @@ def test_total_flows():
     # Test 4: Longer period test
     print("\nTest 4: Three-month period test")
     df = create_test_data(90)
-    get_total_flows(df)
+    print(get_total_flows(df))
 
 if __name__ == "__main__":
     test_total_flows()